@@ -11,6 +11,7 @@ urlpatterns = [
     # Tienda Online y Ecommerce
     path('tienda/', views.tienda, name='tienda'),
     path('producto/<int:producto_id>/', views.producto_detalle, name='producto_detalle'),
+    path('tienda/disponibilidad/', views.disponibilidad, name='disponibilidad'),
 
     # Carrito de Compras
     path('carrito/', views.ver_carrito, name='carrito'),
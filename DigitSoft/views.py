@@ -4,6 +4,10 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 import json
 from administrador.models import Producto, Marca
+from administrador.busqueda import buscar_productos
+from administrador.facetas import seleccion_desde, aplicar_facetas, calcular_facetas
+from administrador.cache_catalogo import cache_catalogo
+from administrador import almacen_carrito, dinero, reservas
 
 def home(request):
     """Vista para la página principal"""
@@ -13,6 +17,7 @@ def home(request):
     }
     return render(request, 'DigitSoft/home.html', context)
 
+@cache_catalogo
 def pagina_principal(request):
     """Vista para la página principal pública con ecommerce digital"""
     # Obtener productos destacados y activos
@@ -36,40 +41,36 @@ def pagina_principal(request):
     }
     return render(request, 'DigitSoft/pagina_principal.html', context)
 
+@cache_catalogo
 def tienda(request):
     """Vista para la tienda online con carrito de compras"""
     # Obtener parámetros de filtrado
-    categoria_filter = request.GET.get('categoria', '')
-    marca_filter = request.GET.get('marca', '')
+    seleccion = seleccion_desde(request.GET)
     search_query = request.GET.get('search', '')
 
     # Obtener productos activos
     productos = Producto.objects.filter(activo=True, stock_actual__gt=0).select_related('marca')
-
-    # Aplicar filtros
-    if categoria_filter:
-        productos = productos.filter(categoria=categoria_filter)
-    if marca_filter:
-        productos = productos.filter(marca__id=marca_filter)
     if search_query:
-        productos = productos.filter(nombre__icontains=search_query)
+        productos = buscar_productos(productos, search_query)
 
-    # Obtener marcas y categorías para los filtros
-    marcas = Marca.objects.filter(activa=True)
-    categorias = Producto.objects.filter(activo=True).values('categoria').distinct()
+    # Conteos de categorías, marcas y precios sobre la búsqueda; luego los filtros elegidos
+    facetas = calcular_facetas(productos, seleccion)
+    productos = aplicar_facetas(productos, seleccion)
 
     context = {
         'page_title': 'Tienda - Digit Soft',
         'meta_description': 'Tienda online de productos y servicios digitales',
         'productos': productos,
-        'marcas': marcas,
-        'categorias': categorias,
-        'categoria_selected': categoria_filter,
-        'marca_selected': marca_filter,
+        'facetas': facetas,
+        'total_productos': facetas['total'],
+        'categoria_selected': seleccion.get('categoria', ''),
+        'marca_selected': request.GET.get('marca', ''),
+        'precio_selected': seleccion.get('precio', ''),
         'search_query': search_query,
     }
     return render(request, 'DigitSoft/tienda.html', context)
 
+@cache_catalogo
 def producto_detalle(request, producto_id):
     """Vista para ver el detalle de un producto"""
     producto = get_object_or_404(Producto, id=producto_id, activo=True)
@@ -90,42 +91,28 @@ def agregar_al_carrito(request):
     """API para agregar productos al carrito"""
     try:
         data = json.loads(request.body)
-        producto_id = data.get('producto_id')
+        producto_id = int(data.get('producto_id'))
         cantidad = int(data.get('cantidad', 1))
 
         producto = get_object_or_404(Producto, id=producto_id, activo=True)
 
-        # Obtener o crear el carrito en la sesión
-        carrito = request.session.get('carrito', {})
-
-        # Agregar o actualizar producto en el carrito
-        producto_key = str(producto_id)
-        if producto_key in carrito:
-            carrito[producto_key]['cantidad'] += cantidad
-        else:
-            carrito[producto_key] = {
-                'id': producto.id,
-                'nombre': producto.nombre,
-                'precio': float(producto.precio_venta),
-                'cantidad': cantidad,
-                'imagen': producto.imagen.url if producto.imagen else None,
-            }
-
-        # Verificar stock
-        if carrito[producto_key]['cantidad'] > producto.stock_actual:
-            carrito[producto_key]['cantidad'] = producto.stock_actual
-
-        request.session['carrito'] = carrito
-        request.session.modified = True
+        # Solo se modifica la línea del producto; la sesión guarda únicamente el id del carrito
+        carrito_id = almacen_carrito.carrito_id(request, crear=True)
+        almacen = almacen_carrito.almacen()
+        nueva_cantidad = almacen.sumar(carrito_id, producto_id, cantidad)
 
-        # Calcular total de items
-        total_items = sum(item['cantidad'] for item in carrito.values())
+        # La línea aparta su stock: no puede pasar de lo que quede sin reservar por otros carritos
+        reservada = reservas.reservar(carrito_id, producto.pk, nueva_cantidad)
+        if reservada < nueva_cantidad:
+            nueva_cantidad = reservada
+            almacen.fijar(carrito_id, producto_id, nueva_cantidad)
+        almacen_carrito.registrar_cambio(carrito_id)
 
         return JsonResponse({
             'success': True,
             'message': 'Producto agregado al carrito',
-            'total_items': total_items,
-            'carrito': carrito
+            'linea': {'producto_id': producto_id, 'cantidad': nueva_cantidad},
+            'total_items': almacen.total_items(carrito_id),
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
@@ -135,29 +122,29 @@ def actualizar_carrito(request):
     """API para actualizar la cantidad de un producto en el carrito"""
     try:
         data = json.loads(request.body)
-        producto_id = str(data.get('producto_id'))
+        producto_id = int(data.get('producto_id'))
         cantidad = int(data.get('cantidad', 1))
 
-        carrito = request.session.get('carrito', {})
-
-        if producto_id in carrito:
-            if cantidad <= 0:
-                del carrito[producto_id]
-            else:
-                carrito[producto_id]['cantidad'] = cantidad
+        carrito_id = almacen_carrito.carrito_id(request)
+        almacen = almacen_carrito.almacen()
+        lineas = almacen.lineas(carrito_id) if carrito_id else {}
+        total_items = sum(lineas.values())
 
-        request.session['carrito'] = carrito
-        request.session.modified = True
-
-        # Calcular totales
-        total_items = sum(item['cantidad'] for item in carrito.values())
-        subtotal = sum(item['precio'] * item['cantidad'] for item in carrito.values())
+        # Solo se cambian líneas que ya están en el carrito, y no se aparta stock de productos inactivos
+        if producto_id not in lineas:
+            cantidad = 0
+        elif cantidad > 0 and not Producto.objects.filter(pk=producto_id, activo=True).exists():
+            cantidad = lineas[producto_id]
+        else:
+            cantidad = reservas.reservar(carrito_id, producto_id, cantidad)
+            almacen.fijar(carrito_id, producto_id, cantidad)
+            almacen_carrito.registrar_cambio(carrito_id)
+            total_items = almacen.total_items(carrito_id)
 
         return JsonResponse({
             'success': True,
+            'linea': {'producto_id': producto_id, 'cantidad': max(cantidad, 0)},
             'total_items': total_items,
-            'subtotal': subtotal,
-            'carrito': carrito
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
@@ -167,63 +154,62 @@ def eliminar_del_carrito(request):
     """API para eliminar un producto del carrito"""
     try:
         data = json.loads(request.body)
-        producto_id = str(data.get('producto_id'))
-
-        carrito = request.session.get('carrito', {})
-
-        if producto_id in carrito:
-            del carrito[producto_id]
-
-        request.session['carrito'] = carrito
-        request.session.modified = True
+        producto_id = int(data.get('producto_id'))
 
-        total_items = sum(item['cantidad'] for item in carrito.values())
+        carrito_id = almacen_carrito.carrito_id(request)
+        almacen = almacen_carrito.almacen()
+        total_items = 0
+        if carrito_id:
+            almacen.quitar(carrito_id, producto_id)
+            reservas.liberar(carrito_id, [producto_id])
+            almacen_carrito.registrar_cambio(carrito_id)
+            total_items = almacen.total_items(carrito_id)
 
         return JsonResponse({
             'success': True,
             'message': 'Producto eliminado del carrito',
+            'linea': {'producto_id': producto_id, 'cantidad': 0},
             'total_items': total_items,
-            'carrito': carrito
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+def disponibilidad(request):
+    """API con las unidades disponibles (sin reservar) de los productos ?ids=1,2,3"""
+    ids = [int(valor) for valor in request.GET.get('ids', '').split(',') if valor.strip().isdigit()][:100]
+    productos = Producto.objects.filter(pk__in=ids, activo=True).values_list('pk', 'stock_actual', 'stock_reservado')
+    return JsonResponse({
+        'disponibilidad': {str(pk): max(actual - reservado, 0) for pk, actual, reservado in productos}
+    })
+
+def _totales(carrito):
+    """Subtotal, IVA y total del carrito de detalle_carrito (en centavos, ver administrador.dinero)"""
+    lineas = carrito.values()
+    return dinero.totales([item['precio_centavos'] for item in lineas], [item['cantidad'] for item in lineas])
+
 def ver_carrito(request):
     """Vista para ver el carrito de compras"""
-    carrito = request.session.get('carrito', {})
-
-    # Calcular totales
-    subtotal = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-    iva = subtotal * 0.19  # 19% IVA
-    total = subtotal + iva
+    carrito = almacen_carrito.detalle_carrito(almacen_carrito.carrito_id(request))
 
     context = {
         'page_title': 'Carrito de Compras - Digit Soft',
         'carrito': carrito,
-        'subtotal': subtotal,
-        'iva': iva,
-        'total': total,
+        'iva_porcentaje': dinero.porcentaje_iva(),
+        **_totales(carrito),
     }
     return render(request, 'DigitSoft/carrito.html', context)
 
 def checkout(request):
     """Vista para el proceso de checkout"""
-    carrito = request.session.get('carrito', {})
+    carrito = almacen_carrito.detalle_carrito(almacen_carrito.carrito_id(request))
 
     if not carrito:
         return redirect('main:tienda')
 
-    # Calcular totales
-    subtotal = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-    iva = subtotal * 0.19
-    total = subtotal + iva
-
     context = {
         'page_title': 'Finalizar Compra - Digit Soft',
         'carrito': carrito,
-        'subtotal': subtotal,
-        'iva': iva,
-        'total': total,
+        **_totales(carrito),
     }
     return render(request, 'DigitSoft/checkout.html', context)
 
@@ -76,6 +76,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'administrador.cache_catalogo.contexto',
             ],
         },
     },
@@ -91,6 +92,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Las transacciones toman el bloqueo de escritura al iniciar, así las compras
+        # concurrentes esperan su turno en vez de fallar con "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Base de pruebas en archivo: con la de memoria compartida los hilos de las pruebas de
+        # concurrencia fallan con "table is locked" en vez de esperar como en producción
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -156,3 +168,69 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 LOGIN_URL = '/autenticacion/login/'
 LOGIN_REDIRECT_URL = '/administrador/dashboard/'
 LOGOUT_REDIRECT_URL = '/autenticacion/login/'
+
+# Numeración de documentos: tamaño del bloque que cada worker reserva por prefijo
+# (p. ej. {'G': 50, 'PRD': 20}). Las facturas siempre se numeran de una en una.
+SECUENCIAS_TAMANO_BLOQUE = {}
+
+# Reportes en segundo plano: minutos que un archivo con rango abierto (que incluye hoy)
+# se reutiliza antes de volver a generarlo
+REPORTES_VIGENCIA_MINUTOS = 15
+
+# Minutos sin latido tras los cuales un reporte en proceso se da por abandonado (worker caído)
+# y otro worker lo puede retomar
+REPORTES_LATIDO_EXPIRA_MINUTOS = 10
+
+# Segundos que los contadores de los dashboards permanecen en caché; las escrituras en
+# clientes, productos, órdenes, ventas, equipos y técnicos los invalidan antes
+DASHBOARD_CACHE_SEGUNDOS = 60
+
+# Segundos que se reutiliza el total (estimado) de filas de cada listado paginado
+PAGINACION_CACHE_TOTAL_SEGUNDOS = 300
+
+# Segundos que cada proceso usa su copia en memoria de la configuración general antes de releerla
+CONFIGURACION_VIGENCIA_SEGUNDOS = 5
+
+# Antigüedad máxima (segundos) del índice de autocompletado en memoria de cada proceso;
+# al vencer se reconstruye en segundo plano
+SUGERENCIAS_RECONSTRUIR_SEGUNDOS = 600
+
+# Cada cuántos segundos el índice de autocompletado aplica los cambios guardados por otros procesos
+SUGERENCIAS_SINCRONIZAR_SEGUNDOS = 5
+
+# Vigencia (segundos) de los conteos de facetas de la tienda
+FACETAS_CACHE_SEGUNDOS = 60
+
+# Vigencia (segundos) de las páginas y fragmentos guardados del catálogo público
+CATALOGO_CACHE_SEGUNDOS = 300
+
+# Segundos que cada proceso reutiliza su lectura de las versiones de caché (catálogo, facetas
+# y métricas) guardadas en la base de datos; un cambio en otro proceso se ve a más tardar en ese plazo
+VERSIONES_CACHE_VIGENCIA_SEGUNDOS = 2
+
+# Cachés. En producción conviene un backend compartido (Redis o Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Carritos de la tienda pública: almacén de líneas (la tabla lineas_carrito, compartida por todos
+# los procesos; AlmacenCache solo con Redis o Memcached), caché de sus marcas de carga y
+# sincronización, y segundos sin uso antes de descartarlos (ver limpiar_carritos)
+CARRITO_ALMACEN = 'administrador.almacen_carrito.AlmacenBaseDatos'
+CARRITO_CACHE = 'default'
+CARRITO_VIGENCIA_SEGUNDOS = 30 * 24 * 3600
+
+# Intervalo mínimo (segundos) entre escrituras en la tabla de carritos mientras un cliente
+# modifica el suyo; al iniciar o cerrar sesión y al comprar se sincroniza siempre
+CARRITO_SINCRONIZAR_SEGUNDOS = 60
+
+# Carritos guardados: días sin cambios hasta que vencen (EXPIRADO) y horas sin cambios para
+# considerarlos abandonados (ABANDONADO). Los marca el comando limpiar_carritos.
+CARRITO_EXPIRACION_DIAS = 7
+CARRITO_ABANDONO_HORAS = 24
+
+# Minutos que una línea de carrito aparta su stock desde el último cambio; las vencidas las
+# libera el comando liberar_reservas (programarlo cada pocos minutos)
+RESERVA_STOCK_MINUTOS = 30
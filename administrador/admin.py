@@ -3,7 +3,9 @@ from django.utils.html import format_html
 from .models import (
     Administrador, Cliente, Tecnico, Marca, Proveedor, Producto,
     Equipo, ServicioTecnico, OrdenServicio, Compra, Carrito,
-    Venta, Garantia, Factura, LogActividad, ConfiguracionGeneral
+    Venta, Garantia, Factura, LogActividad, ConfiguracionGeneral,
+    SecuenciaDocumento, ReporteJob, VentaResumenDiario, ReservaStock,
+    ReabastecimientoSugerido, MovimientoInventario, SaldoInventario
 )
 
 # ========== ADMINISTRADOR ========== #
@@ -438,6 +440,67 @@ class CarritoAdmin(admin.ModelAdmin):
     get_cliente.admin_order_field = 'cliente__nombres'
 
 
+# ========== RESERVAS DE STOCK ========== #
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ['carrito', 'producto', 'cantidad', 'fecha_creacion', 'fecha_expiracion']
+    search_fields = ['carrito', 'producto__nombre', 'producto__codigo_producto']
+    # Solo lectura: las reservas las mantiene reservas.py junto con Producto.stock_reservado
+    readonly_fields = ['carrito', 'producto', 'cantidad', 'fecha_creacion', 'fecha_expiracion']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReabastecimientoSugerido)
+class ReabastecimientoSugeridoAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'proveedor', 'cantidad_sugerida', 'stock_detectado', 'estado', 'compra', 'fecha_creacion']
+    list_filter = ['estado', 'proveedor']
+    search_fields = ['producto__nombre', 'producto__codigo_producto']
+    # La cola la llenan las ventas (reabastecimiento.py); aquí solo se revisa o se descarta
+    readonly_fields = ['producto', 'proveedor', 'stock_detectado', 'compra', 'fecha_creacion', 'fecha_actualizacion']
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ========== KARDEX DE INVENTARIO ========== #
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'producto', 'tipo', 'cantidad', 'motivo', 'venta', 'compra', 'orden_servicio']
+    list_filter = ['tipo', 'fecha']
+    search_fields = ['producto__nombre', 'producto__codigo_producto', 'motivo']
+    list_select_related = ['producto', 'venta', 'compra', 'orden_servicio']
+    date_hierarchy = 'fecha'
+
+    # El kardex solo crece: los movimientos los registra kardex.py junto con el cambio de stock
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SaldoInventario)
+class SaldoInventarioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'producto', 'stock']
+    list_filter = ['fecha']
+    search_fields = ['producto__nombre', 'producto__codigo_producto']
+    list_select_related = ['producto']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ========== VENTAS ========== #
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
@@ -622,6 +685,33 @@ class ConfiguracionGeneralAdmin(admin.ModelAdmin):
     preview_logo.short_description = 'Vista Previa del Logo'
 
 
+# ========== SECUENCIAS DE NUMERACIÓN ========== #
+@admin.register(SecuenciaDocumento)
+class SecuenciaDocumentoAdmin(admin.ModelAdmin):
+    list_display = ['prefijo', 'periodo', 'ultimo_valor']
+    list_filter = ['prefijo']
+    search_fields = ['prefijo', 'periodo']
+    readonly_fields = ['ultimo_valor']
+
+
+# ========== REPORTES EN SEGUNDO PLANO ========== #
+@admin.register(ReporteJob)
+class ReporteJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'fecha_inicio', 'fecha_fin', 'estado', 'solicitado_por', 'fecha_solicitud', 'fecha_finalizacion']
+    list_filter = ['tipo', 'estado']
+    readonly_fields = ['fecha_solicitud', 'fecha_inicio_proceso', 'fecha_finalizacion']
+    date_hierarchy = 'fecha_solicitud'
+
+
+# ========== RESUMEN DIARIO DE VENTAS ========== #
+@admin.register(VentaResumenDiario)
+class VentaResumenDiarioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'estado', 'metodo_pago', 'cantidad_ventas', 'total', 'impuestos', 'descuento']
+    list_filter = ['estado', 'metodo_pago']
+    date_hierarchy = 'fecha'
+    readonly_fields = ['fecha', 'estado', 'metodo_pago', 'cantidad_ventas', 'total', 'impuestos', 'descuento']
+
+
 # Personalizar el sitio de administración
 admin.site.site_header = "Digit Soft - Panel de Administración"
 admin.site.site_title = "Digit Soft Admin"
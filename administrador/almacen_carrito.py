@@ -0,0 +1,467 @@
+"""
+Módulo Almacén de Carritos - Digit Soft
+Carritos de la tienda en un almacén compartido (tabla LineaCarrito o caché clave-valor): la
+sesión solo guarda el id del carrito, cada línea se modifica por separado (incrementos
+atómicos) y los carritos de clientes se copian por lotes a Carrito/ItemCarrito
+"""
+import abc
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+CLAVE_SESION = 'carrito_id'
+
+# Carritos que todavía estén en el formato anterior (diccionario completo en la sesión)
+CLAVE_SESION_ANTERIOR = 'carrito'
+
+
+class AlmacenCarrito(abc.ABC):
+    """
+    Interfaz de los almacenes de carritos. Un carrito es un conjunto de líneas
+    producto_id -> cantidad; nombre, precio e imagen se leen del producto al mostrarlo.
+    """
+
+    @abc.abstractmethod
+    def lineas(self, carrito_id):
+        """Todas las líneas del carrito como {producto_id: cantidad}"""
+
+    @abc.abstractmethod
+    def sumar(self, carrito_id, producto_id, cantidad):
+        """Suma (o resta) unidades a una línea y retorna la cantidad resultante"""
+
+    @abc.abstractmethod
+    def fijar(self, carrito_id, producto_id, cantidad):
+        """Reemplaza la cantidad de una línea; con 0 o menos la elimina"""
+
+    @abc.abstractmethod
+    def quitar(self, carrito_id, producto_id):
+        """Elimina una línea"""
+
+    @abc.abstractmethod
+    def vaciar(self, carrito_id):
+        """Elimina todas las líneas del carrito"""
+
+    def total_items(self, carrito_id):
+        return sum(self.lineas(carrito_id).values())
+
+    def purgar(self, vigencia):
+        """
+        Elimina los carritos sin cambios desde hace `vigencia` segundos y retorna cuántos
+        eliminó. Los almacenes con vencimiento propio (cachés) no necesitan hacer nada.
+        """
+        return 0
+
+
+class AlmacenMemoria(AlmacenCarrito):
+    """Diccionarios en la memoria del proceso: para pruebas y despliegues de un solo proceso"""
+
+    def __init__(self):
+        self._carritos = {}
+        self._lock = threading.Lock()
+
+    def lineas(self, carrito_id):
+        with self._lock:
+            return dict(self._carritos.get(carrito_id, {}))
+
+    def sumar(self, carrito_id, producto_id, cantidad):
+        with self._lock:
+            lineas = self._carritos.setdefault(carrito_id, {})
+            nueva = lineas.get(producto_id, 0) + cantidad
+            if nueva > 0:
+                lineas[producto_id] = nueva
+            else:
+                lineas.pop(producto_id, None)
+            return max(nueva, 0)
+
+    def fijar(self, carrito_id, producto_id, cantidad):
+        with self._lock:
+            lineas = self._carritos.setdefault(carrito_id, {})
+            if cantidad > 0:
+                lineas[producto_id] = cantidad
+            else:
+                lineas.pop(producto_id, None)
+
+    def quitar(self, carrito_id, producto_id):
+        self.fijar(carrito_id, producto_id, 0)
+
+    def vaciar(self, carrito_id):
+        with self._lock:
+            self._carritos.pop(carrito_id, None)
+
+
+class AlmacenBaseDatos(AlmacenCarrito):
+    """
+    Almacén sobre la tabla LineaCarrito: compartido por todos los procesos y duradero ante
+    reinicios. Cada cambio es un UPDATE con F() sobre la fila de la línea; la primera unidad
+    la inserta y, si otra petición la insertó primero, se reintenta como UPDATE.
+    """
+
+    def _lineas(self, carrito_id, producto_id=None):
+        from .models import LineaCarrito
+
+        lineas = LineaCarrito.objects.filter(carrito=carrito_id)
+        return lineas if producto_id is None else lineas.filter(producto_id=producto_id)
+
+    def lineas(self, carrito_id):
+        return dict(self._lineas(carrito_id).filter(cantidad__gt=0).values_list('producto_id', 'cantidad'))
+
+    def _escribir(self, carrito_id, producto_id, cantidad, sumar):
+        """UPDATE de la línea (sumando o reemplazando) o INSERT si no existe; retorna la cantidad final"""
+        from .models import LineaCarrito
+
+        linea = self._lineas(carrito_id, producto_id)
+        valor = F('cantidad') + cantidad if sumar else cantidad
+        with transaction.atomic():
+            if not linea.update(cantidad=valor, fecha_actualizacion=timezone.now()):
+                if cantidad <= 0:
+                    return 0
+                try:
+                    with transaction.atomic():
+                        LineaCarrito.objects.create(carrito=carrito_id, producto_id=producto_id, cantidad=cantidad)
+                    return cantidad
+                except IntegrityError:
+                    linea.update(cantidad=valor, fecha_actualizacion=timezone.now())
+            nueva = linea.values_list('cantidad', flat=True).first() or 0
+            if nueva <= 0:
+                linea.delete()
+                return 0
+            return nueva
+
+    def sumar(self, carrito_id, producto_id, cantidad):
+        return self._escribir(carrito_id, producto_id, cantidad, sumar=True)
+
+    def fijar(self, carrito_id, producto_id, cantidad):
+        if cantidad <= 0:
+            self.quitar(carrito_id, producto_id)
+            return
+        self._escribir(carrito_id, producto_id, cantidad, sumar=False)
+
+    def quitar(self, carrito_id, producto_id):
+        self._lineas(carrito_id, producto_id).delete()
+
+    def vaciar(self, carrito_id):
+        self._lineas(carrito_id).delete()
+
+    def total_items(self, carrito_id):
+        return self._lineas(carrito_id).filter(cantidad__gt=0).aggregate(total=Sum('cantidad'))['total'] or 0
+
+    def purgar(self, vigencia, lote=1000):
+        from .models import LineaCarrito
+
+        limite = timezone.now() - timedelta(seconds=vigencia)
+        vencidos = (
+            LineaCarrito.objects.values('carrito').annotate(ultima=Max('fecha_actualizacion'))
+            .filter(ultima__lt=limite).values_list('carrito', flat=True)
+        )
+        purgados = 0
+        while True:
+            carritos = list(vencidos[:lote])
+            if not carritos:
+                return purgados
+            LineaCarrito.objects.filter(carrito__in=carritos, fecha_actualizacion__lt=limite).delete()
+            purgados += len(carritos)
+
+
+class AlmacenCache(AlmacenCarrito):
+    """
+    Almacén sobre una caché de Django con add/incr atómicos entre procesos (Redis o Memcached;
+    DatabaseCache y LocMemCache no lo son). Una clave por línea, modificada con add/incr, y un
+    índice de productos repartido en posiciones: cada línea nueva toma la siguiente posición
+    con incr y la escribe en su propia clave, así que nunca se reescribe una lista compartida.
+    Las posiciones de líneas quitadas quedan huérfanas hasta vaciar el carrito o que venza.
+    """
+
+    def __init__(self, alias=None, vigencia=None):
+        self.cache = caches[alias or getattr(settings, 'CARRITO_CACHE', 'default')]
+        self.vigencia = vigencia or getattr(settings, 'CARRITO_VIGENCIA_SEGUNDOS', 30 * 24 * 3600)
+
+    def _clave_posiciones(self, carrito_id):
+        return f'carrito:{carrito_id}:posiciones'
+
+    def _clave_posicion(self, carrito_id, posicion):
+        return f'carrito:{carrito_id}:posicion:{posicion}'
+
+    def _clave_linea(self, carrito_id, producto_id):
+        return f'carrito:{carrito_id}:{producto_id}'
+
+    def _indice(self, carrito_id):
+        total = self.cache.get(self._clave_posiciones(carrito_id)) or 0
+        claves = [self._clave_posicion(carrito_id, posicion) for posicion in range(1, total + 1)]
+        return set(self.cache.get_many(claves).values()) if claves else set()
+
+    def _registrar(self, carrito_id, producto_id):
+        """Agrega el producto al índice (solo lo llama quien creó la línea con add)"""
+        clave = self._clave_posiciones(carrito_id)
+        self.cache.add(clave, 0, self.vigencia)
+        try:
+            posicion = self.cache.incr(clave)
+        except ValueError:
+            # El contador venció entre add e incr
+            self.cache.add(clave, 0, self.vigencia)
+            posicion = self.cache.incr(clave)
+        self.cache.touch(clave, self.vigencia)
+        self.cache.set(self._clave_posicion(carrito_id, posicion), producto_id, self.vigencia)
+
+    def lineas(self, carrito_id):
+        indice = self._indice(carrito_id)
+        if not indice:
+            return {}
+        claves = {self._clave_linea(carrito_id, producto_id): producto_id for producto_id in indice}
+        valores = self.cache.get_many(list(claves))
+        return {claves[clave]: cantidad for clave, cantidad in valores.items() if cantidad > 0}
+
+    def sumar(self, carrito_id, producto_id, cantidad):
+        clave = self._clave_linea(carrito_id, producto_id)
+        if cantidad > 0 and self.cache.add(clave, cantidad, self.vigencia):
+            self._registrar(carrito_id, producto_id)
+            return cantidad
+        try:
+            nueva = self.cache.incr(clave, cantidad)
+        except ValueError:
+            # La línea no existe (o venció entre add e incr)
+            if cantidad <= 0:
+                return 0
+            return self.sumar(carrito_id, producto_id, cantidad)
+        if nueva <= 0:
+            self.quitar(carrito_id, producto_id)
+            return 0
+        self.cache.touch(clave, self.vigencia)
+        return nueva
+
+    def fijar(self, carrito_id, producto_id, cantidad):
+        if cantidad <= 0:
+            self.quitar(carrito_id, producto_id)
+            return
+        clave = self._clave_linea(carrito_id, producto_id)
+        if self.cache.add(clave, cantidad, self.vigencia):
+            self._registrar(carrito_id, producto_id)
+        else:
+            self.cache.set(clave, cantidad, self.vigencia)
+
+    def quitar(self, carrito_id, producto_id):
+        self.cache.delete(self._clave_linea(carrito_id, producto_id))
+
+    def vaciar(self, carrito_id):
+        total = self.cache.get(self._clave_posiciones(carrito_id)) or 0
+        claves = [self._clave_linea(carrito_id, producto_id) for producto_id in self._indice(carrito_id)]
+        claves += [self._clave_posicion(carrito_id, posicion) for posicion in range(1, total + 1)]
+        self.cache.delete_many(claves + [self._clave_posiciones(carrito_id)])
+
+
+_almacen = {}
+
+
+def almacen():
+    """Almacén configurado en CARRITO_ALMACEN (una instancia por proceso)"""
+    ruta = getattr(settings, 'CARRITO_ALMACEN', 'administrador.almacen_carrito.AlmacenBaseDatos')
+    if ruta not in _almacen:
+        _almacen[ruta] = import_string(ruta)()
+    return _almacen[ruta]
+
+
+# ========== CARRITO DE LA SESIÓN ========== #
+
+def carrito_id(request, crear=False):
+    """
+    Id del carrito de la sesión; con `crear` se asigna uno si no existe. Un carrito guardado
+    con el formato anterior (diccionario en la sesión) se pasa al almacén la primera vez.
+    """
+    identificador = request.session.get(CLAVE_SESION)
+    anterior = request.session.pop(CLAVE_SESION_ANTERIOR, None)
+    if identificador is None and (crear or anterior):
+        identificador = uuid.uuid4().hex
+        request.session[CLAVE_SESION] = identificador
+    if anterior:
+        for producto_id, linea in anterior.items():
+            almacen().sumar(identificador, int(producto_id), int(linea.get('cantidad', 0)))
+    if _cliente_de(identificador) is not None:
+        # Si el almacén perdió el carrito del cliente, se recupera de la base de datos
+        _cargar(identificador)
+    return identificador
+
+
+def detalle_carrito(identificador):
+    """
+    Líneas del carrito con los datos actuales de cada producto, en una consulta:
+    {producto_id (str): {'id', 'nombre', 'precio', 'precio_centavos', 'cantidad', 'imagen'}}
+    """
+    from .dinero import a_decimal, en_centavos
+    from .models import Producto
+
+    lineas = almacen().lineas(identificador) if identificador else {}
+    if not lineas:
+        return {}
+
+    productos = Producto.objects.filter(pk__in=lineas, activo=True).only(
+        'id', 'nombre', 'imagen'
+    ).annotate(precio_centavos=en_centavos('precio_venta'))
+    return {
+        str(producto.pk): {
+            'id': producto.pk,
+            'nombre': producto.nombre,
+            'precio': a_decimal(producto.precio_centavos),
+            'precio_centavos': producto.precio_centavos,
+            'cantidad': lineas[producto.pk],
+            'imagen': producto.imagen.url if producto.imagen else None,
+        }
+        for producto in productos
+    }
+
+
+# ========== PERSISTENCIA EN Carrito / ItemCarrito ========== #
+#
+# El carrito de un cliente vive en el almacén con el id "cliente-<pk>"; la tabla de carritos
+# es su copia duradera y se actualiza por lotes (write-behind): como mucho una vez cada
+# CARRITO_SINCRONIZAR_SEGUNDOS mientras se modifica, y siempre al iniciar o cerrar sesión,
+# al ver el carrito del panel y antes de la compra.
+
+PREFIJO_CLIENTE = 'cliente-'
+
+
+def _marcas():
+    return caches[getattr(settings, 'CARRITO_CACHE', 'default')]
+
+
+def _vigencia():
+    return getattr(settings, 'CARRITO_VIGENCIA_SEGUNDOS', 30 * 24 * 3600)
+
+
+def _cliente_de(identificador):
+    if identificador and identificador.startswith(PREFIJO_CLIENTE):
+        return int(identificador[len(PREFIJO_CLIENTE):])
+    return None
+
+
+def _cargar(identificador):
+    """
+    Trae al almacén, una sola vez por carrito guardado, las líneas de los carritos del cliente
+    que todavía no se cargaron (Carrito.cargado_en_almacen). La marca duradera es esa columna;
+    la de la caché solo ahorra la consulta. Solo se agregan las líneas que el almacén no tiene:
+    una cantidad que el cliente ya redujo o una línea que quitó no vuelven desde la copia guardada.
+    """
+    from .models import Carrito, ItemCarrito
+
+    marca = f'carrito:{identificador}:cargado'
+    if _marcas().get(marca):
+        return
+    pendientes = Carrito.objects.filter(
+        cliente_id=_cliente_de(identificador), estado__in=['ACTIVO', 'ABANDONADO'], cargado_en_almacen=False
+    ).values_list('pk', flat=True)
+    # El UPDATE condicional decide qué proceso carga cada carrito
+    cargados = [
+        carrito_id for carrito_id in pendientes
+        if Carrito.objects.filter(pk=carrito_id, cargado_en_almacen=False).update(cargado_en_almacen=True)
+    ]
+    if cargados:
+        actuales = almacen().lineas(identificador)
+        for producto_id, cantidad in ItemCarrito.objects.filter(carrito_id__in=cargados).values_list(
+            'producto_id', 'cantidad'
+        ):
+            if producto_id not in actuales:
+                almacen().fijar(identificador, producto_id, cantidad)
+                actuales[producto_id] = cantidad
+    _marcas().set(marca, True, _vigencia())
+
+
+def carrito_de_cliente(cliente):
+    """Id en el almacén del carrito del cliente, con las líneas guardadas ya cargadas"""
+    identificador = f'{PREFIJO_CLIENTE}{cliente.pk}'
+    _cargar(identificador)
+    return identificador
+
+
+def _intervalo():
+    return getattr(settings, 'CARRITO_SINCRONIZAR_SEGUNDOS', 60)
+
+
+def registrar_cambio(identificador):
+    """Después de modificar un carrito: se sincroniza si pasó el intervalo desde la última vez"""
+    if _cliente_de(identificador) is None:
+        return
+    if _marcas().add(f'carrito:{identificador}:sincronizado', True, _intervalo()):
+        sincronizar(identificador)
+
+
+def sincronizar(identificador):
+    """
+    Escribe en Carrito/ItemCarrito las diferencias con el almacén en un lote (altas, cambios
+    y bajas, ver Carrito.actualizar_lineas). Si el cliente no tiene un carrito activo pero sí
+    uno abandonado, este se recupera. Retorna el Carrito activo del cliente o None.
+    """
+    from .models import Carrito
+
+    cliente_id = _cliente_de(identificador)
+    if cliente_id is None:
+        return None
+    _cargar(identificador)
+    lineas = almacen().lineas(identificador)
+    _marcas().set(f'carrito:{identificador}:sincronizado', True, _intervalo())
+
+    with transaction.atomic():
+        carritos = Carrito.objects.select_for_update().filter(cliente_id=cliente_id)
+        carrito = carritos.filter(estado='ACTIVO').first()
+        if carrito is None:
+            if not lineas:
+                return None
+            carrito = carritos.filter(estado='ABANDONADO').order_by('-fecha_actualizacion').first()
+            if carrito is None:
+                # Sus líneas salen del almacén: no hay nada que cargar de vuelta
+                carrito = Carrito.objects.create(
+                    cliente_id=cliente_id, codigo_sesion=identificador, cargado_en_almacen=True
+                )
+            else:
+                carrito.estado = 'ACTIVO'
+                carrito.fecha_expiracion = carrito.calcular_expiracion()
+                carrito.save(update_fields=['estado', 'fecha_expiracion', 'fecha_actualizacion'])
+
+        carrito.actualizar_lineas(lineas, eliminar_faltantes=True)
+    return carrito
+
+
+def descartar(identificador):
+    """
+    Vacía el carrito del almacén (p. ej. ya convertido en venta o vencido), libera sus
+    reservas de stock y olvida su estado de carga
+    """
+    from .reservas import liberar
+
+    almacen().vaciar(identificador)
+    liberar(identificador)
+    _marcas().delete_many([f'carrito:{identificador}:cargado', f'carrito:{identificador}:sincronizado'])
+
+
+def al_iniciar_sesion(request, user):
+    """
+    Une el carrito anónimo de la sesión con el del cliente y deja la sesión apuntando a este.
+    Las cantidades de un mismo producto se suman, igual que sus reservas de stock.
+    """
+    from .models import Cliente
+
+    cliente = Cliente.objects.filter(user=user).first()
+    if cliente is None:
+        return
+    anonimo = carrito_id(request)
+    destino = carrito_de_cliente(cliente)
+    if anonimo and anonimo != destino:
+        from .reservas import transferir
+
+        for producto_id, cantidad in almacen().lineas(anonimo).items():
+            almacen().sumar(destino, producto_id, cantidad)
+        almacen().vaciar(anonimo)
+        transferir(anonimo, destino)
+    request.session[CLAVE_SESION] = destino
+    sincronizar(destino)
+
+
+def al_cerrar_sesion(request, user):
+    identificador = request.session.get(CLAVE_SESION) if hasattr(request, 'session') else None
+    if _cliente_de(identificador) is not None:
+        sincronizar(identificador)
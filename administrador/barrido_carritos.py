@@ -0,0 +1,73 @@
+"""
+Módulo de Barrido de Carritos - Digit Soft
+Pasa a ABANDONADO los carritos activos sin cambios recientes y a EXPIRADO los vencidos, en
+lotes de UPDATE que recorren el índice (estado, fecha_expiracion)
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Carrito
+from . import almacen_carrito
+
+
+def _limite_abandono(ahora, inactividad):
+    """
+    fecha_expiracion se aplaza con cada cambio (Carrito.calcular_expiracion), así que un
+    carrito sin cambios desde hace `inactividad` es uno que vence antes de este límite
+    """
+    vigencia = timedelta(days=getattr(settings, 'CARRITO_EXPIRACION_DIAS', 7))
+    return ahora + vigencia - inactividad
+
+
+def _liberar(cliente_ids):
+    """Descarta la copia en el almacén y las reservas de stock de los carritos vencidos"""
+    for cliente_id in cliente_ids:
+        almacen_carrito.descartar(f'{almacen_carrito.PREFIJO_CLIENTE}{cliente_id}')
+
+
+def _marcar(carritos, estado, lote, ahora, liberar=False):
+    """Cambia el estado de `carritos` de a `lote` filas por transacción; retorna cuántos cambió"""
+    marcados = 0
+    while True:
+        with transaction.atomic():
+            # Las filas bloqueadas (p. ej. un carrito que se está comprando) se dejan para el próximo lote
+            filas = list(
+                carritos.select_for_update(skip_locked=True)
+                .order_by('fecha_expiracion')
+                .values_list('pk', 'cliente_id')[:lote]
+            )
+            if not filas:
+                return marcados
+            marcados += Carrito.objects.filter(pk__in=[pk for pk, _ in filas]).update(
+                estado=estado, fecha_actualizacion=ahora
+            )
+            if liberar:
+                cliente_ids = {cliente_id for _, cliente_id in filas}
+                transaction.on_commit(lambda cliente_ids=cliente_ids: _liberar(cliente_ids))
+
+
+def barrer_carritos(lote=1000, inactividad=None, ahora=None, simular=False):
+    """
+    Marca los carritos con items sin cambios desde hace `inactividad` (CARRITO_ABANDONO_HORAS
+    por defecto) como ABANDONADO y los activos o abandonados ya vencidos como EXPIRADO.
+    Con `simular` solo cuenta. Retorna {'ABANDONADO': n, 'EXPIRADO': n}.
+    """
+    ahora = ahora or timezone.now()
+    if inactividad is None:
+        inactividad = timedelta(hours=getattr(settings, 'CARRITO_ABANDONO_HORAS', 24))
+
+    vencidos = Carrito.objects.filter(estado__in=['ACTIVO', 'ABANDONADO'], fecha_expiracion__lte=ahora)
+    inactivos = Carrito.objects.filter(
+        estado='ACTIVO', fecha_expiracion__gt=ahora,
+        fecha_expiracion__lte=_limite_abandono(ahora, inactividad), total_items__gt=0
+    )
+    if simular:
+        return {'ABANDONADO': inactivos.count(), 'EXPIRADO': vencidos.count()}
+
+    return {
+        'EXPIRADO': _marcar(vencidos, 'EXPIRADO', lote, ahora, liberar=True),
+        'ABANDONADO': _marcar(inactivos, 'ABANDONADO', lote, ahora),
+    }
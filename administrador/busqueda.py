@@ -0,0 +1,207 @@
+"""
+Módulo de Búsqueda - Digit Soft
+Índice de texto completo de productos para la tienda (FTS5 en SQLite, tsvector en PostgreSQL)
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat, StrIndex
+
+
+TABLA_BUSQUEDA = 'productos_busqueda'
+
+# Columnas del índice, en orden, con su peso en la relevancia
+COLUMNAS_BUSQUEDA = (
+    ('nombre', 10.0),
+    ('codigo_producto', 8.0),
+    ('palabras_clave', 5.0),
+    ('marca', 4.0),
+    ('descripcion', 1.0),
+    ('especificaciones', 1.0),
+)
+
+# Pesos de tsvector (A-D) equivalentes para PostgreSQL
+PESOS_POSTGRES = {'nombre': 'A', 'codigo_producto': 'A', 'palabras_clave': 'B', 'marca': 'B',
+                  'descripcion': 'D', 'especificaciones': 'D'}
+
+# Máximo de productos que retorna una búsqueda, ordenados por relevancia
+LIMITE_RESULTADOS = 500
+
+_indices_disponibles = set()
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Cámara Sony' -> 'camara sony'"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _terminos(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+# ========== ESTRUCTURA DEL ÍNDICE ========== #
+
+def crear_indice(conexion):
+    """Crea la tabla del índice según el motor; retorna False si el motor no lo soporta"""
+    columnas = [columna for columna, _ in COLUMNAS_BUSQUEDA]
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA} USING fts5("
+                f"{', '.join(columnas)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+            )
+        elif conexion.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLA_BUSQUEDA} ("
+                f"producto_id bigint PRIMARY KEY REFERENCES productos (id) ON DELETE CASCADE, "
+                f"documento tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLA_BUSQUEDA}_documento_idx "
+                f"ON {TABLA_BUSQUEDA} USING GIN (documento)"
+            )
+        else:
+            return False
+    return True
+
+
+def eliminar_indice(conexion):
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_BUSQUEDA}')
+    _indices_disponibles.discard(conexion.alias)
+
+
+def indice_disponible(conexion=connection):
+    if conexion.alias not in _indices_disponibles:
+        if TABLA_BUSQUEDA not in conexion.introspection.table_names():
+            return False
+        _indices_disponibles.add(conexion.alias)
+    return True
+
+
+# ========== SINCRONIZACIÓN ========== #
+
+def _guardar_filas(conexion, filas):
+    """Escribe en el índice filas (id, nombre, codigo, palabras_clave, marca, descripcion, especificaciones)"""
+    filas = [(fila[0], *[normalizar(valor) for valor in fila[1:]]) for fila in filas]
+    if not filas:
+        return
+
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            columnas = ', '.join(columna for columna, _ in COLUMNAS_BUSQUEDA)
+            marcadores = ', '.join(['%s'] * (len(COLUMNAS_BUSQUEDA) + 1))
+            cursor.executemany(f'DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = %s', [(fila[0],) for fila in filas])
+            cursor.executemany(
+                f'INSERT INTO {TABLA_BUSQUEDA} (rowid, {columnas}) VALUES ({marcadores})', filas
+            )
+        else:
+            documento = ' || '.join(
+                f"setweight(to_tsvector('spanish', %s), '{PESOS_POSTGRES[columna]}')"
+                for columna, _ in COLUMNAS_BUSQUEDA
+            )
+            cursor.executemany(
+                f'INSERT INTO {TABLA_BUSQUEDA} (producto_id, documento) VALUES (%s, {documento}) '
+                f'ON CONFLICT (producto_id) DO UPDATE SET documento = EXCLUDED.documento',
+                filas
+            )
+
+
+def _valores_indexables(productos):
+    return productos.values_list(
+        'id', 'nombre', 'codigo_producto', 'palabras_clave', 'marca__nombre',
+        'descripcion', 'especificaciones'
+    )
+
+
+def indexar_productos(productos, conexion=connection):
+    """Agrega o actualiza en el índice los productos del queryset"""
+    if indice_disponible(conexion):
+        _guardar_filas(conexion, _valores_indexables(productos))
+
+
+def quitar_producto(producto_id, conexion=connection):
+    if not indice_disponible(conexion):
+        return
+    columna_id = 'rowid' if conexion.vendor == 'sqlite' else 'producto_id'
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_BUSQUEDA} WHERE {columna_id} = %s', [producto_id])
+
+
+def reconstruir_indice(productos, conexion=connection, tamano_lote=2000):
+    """Vacía el índice y lo vuelve a llenar por lotes; retorna la cantidad de productos indexados"""
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_BUSQUEDA}')
+
+    total = 0
+    lote = []
+    for fila in _valores_indexables(productos.order_by()).iterator(chunk_size=tamano_lote):
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            _guardar_filas(conexion, lote)
+            total += len(lote)
+            lote = []
+    _guardar_filas(conexion, lote)
+    return total + len(lote)
+
+
+# ========== CONSULTAS ========== #
+
+def _ids_por_relevancia(terminos, limite):
+    """
+    Ids de productos que contienen todos los términos, del más relevante al menos.
+    El último término se busca como prefijo porque suele estar a medio escribir.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            consulta = ' AND '.join(
+                [f'"{termino}"' for termino in terminos[:-1]] + [f'"{terminos[-1]}"*']
+            )
+            pesos = ', '.join(str(peso) for _, peso in COLUMNAS_BUSQUEDA)
+            # Se ordena por bm25 antes del LIMIT: cortar primero dejaría fuera a los más relevantes
+            cursor.execute(
+                f'SELECT rowid FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH %s '
+                f'ORDER BY bm25({TABLA_BUSQUEDA}, {pesos}) LIMIT %s',
+                [consulta, limite]
+            )
+        else:
+            consulta = ' & '.join(terminos[:-1] + [f'{terminos[-1]}:*'])
+            cursor.execute(
+                f"SELECT producto_id FROM {TABLA_BUSQUEDA}, to_tsquery('spanish', %s) AS consulta "
+                f"WHERE documento @@ consulta ORDER BY ts_rank(documento, consulta) DESC LIMIT %s",
+                [consulta, limite]
+            )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_productos(productos, texto, limite=LIMITE_RESULTADOS):
+    """
+    Filtra el queryset de productos por el texto buscado y lo ordena por relevancia.
+
+    Busca en nombre, código, palabras clave, marca, descripción y especificaciones, sin
+    distinguir tildes ni mayúsculas; la última palabra puede estar incompleta ("portat" -> "portátil").
+    Sin índice de texto completo (otros motores) se usa una búsqueda con LIKE.
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return productos
+
+    if not indice_disponible():
+        return productos.filter(
+            Q(nombre__icontains=texto) |
+            Q(descripcion__icontains=texto) |
+            Q(codigo_producto__icontains=texto)
+        )
+
+    ids = _ids_por_relevancia(terminos, limite)
+    if not ids:
+        return productos.none()
+
+    # Posición de cada id dentro de ",12,7,31," = su lugar en el ranking. Una sola expresión
+    # en vez de un CASE con cientos de WHEN, que es costoso de construir y de compilar.
+    ranking = Value(',' + ','.join(str(producto_id) for producto_id in ids) + ',')
+    posicion = StrIndex(ranking, Concat(Value(','), Cast('pk', CharField()), Value(',')))
+    return productos.filter(pk__in=ids).order_by(posicion)
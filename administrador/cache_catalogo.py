@@ -0,0 +1,122 @@
+"""
+Módulo de Caché del Catálogo - Digit Soft
+Caché de las páginas públicas de la tienda para visitantes anónimos y validación
+condicional (ETag / Last-Modified) para que navegadores y proxies revaliden sin descargar
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .versiones import nueva_version, version
+
+
+VERSION_CATALOGO = 'catalogo'
+
+# Las páginas guardadas llevan este texto en lugar del token CSRF; al servirlas se
+# reemplaza por el token del visitante, así nadie recibe el token de otro
+MARCADOR_CSRF = 'csrf-catalogo-pendiente'
+
+
+def _segundos():
+    return getattr(settings, 'CATALOGO_CACHE_SEGUNDOS', 300)
+
+
+def version_catalogo():
+    """Sello del catálogo, compartido por todos los procesos (ver versiones.py)"""
+    return version(VERSION_CATALOGO)
+
+
+def invalidar_catalogo():
+    """
+    Cualquier cambio en productos, marcas o stock descarta las páginas, fragmentos y conteos
+    de facetas guardados (todos llevan la versión del catálogo en su clave)
+    """
+    nueva_version(VERSION_CATALOGO)
+
+
+def ultima_modificacion(version):
+    """
+    Instante (segundos epoch) del último cambio del catálogo: la mayor fecha_actualizacion
+    de productos y marcas, o la última invalidación si es posterior (una eliminación no
+    deja fecha en la tabla).
+    """
+    from .models import Producto, Marca
+
+    clave = f'administrador:catalogo:modificacion:{version}'
+    instante = cache.get(clave)
+    if instante is None:
+        fechas = [
+            modelo.objects.aggregate(ultima=Max('fecha_actualizacion'))['ultima']
+            for modelo in (Producto, Marca)
+        ]
+        instante = max(
+            [int(fecha.timestamp()) for fecha in fechas if fecha is not None] + [version // 10**9]
+        )
+        cache.set(clave, instante, _segundos())
+    return instante
+
+
+def contexto(request):
+    """
+    Procesador de contexto: versión del catálogo para las claves de los fragmentos
+    ({% cache %}) y, si la página se va a guardar, el marcador en lugar del token CSRF.
+    """
+    version = getattr(request, 'catalogo_version', None)
+    if version is None:
+        return {}
+    datos = {'catalogo_version': version, 'catalogo_cache_segundos': _segundos()}
+    if getattr(request, 'catalogo_guardar_pagina', False):
+        datos['csrf_token'] = MARCADOR_CSRF
+    return datos
+
+
+def _con_token(respuesta, request):
+    contenido = respuesta.content
+    if MARCADOR_CSRF.encode() in contenido:
+        respuesta.content = contenido.replace(MARCADOR_CSRF.encode(), get_token(request).encode())
+    return respuesta
+
+
+def cache_catalogo(vista):
+    """
+    Decorador para las vistas públicas del catálogo.
+
+    Los visitantes anónimos reciben la página guardada para su URL (con parámetros) mientras
+    no cambie la versión del catálogo, y un 304 si su copia sigue vigente. Los usuarios
+    autenticados ven la página generada para ellos, con los fragmentos guardados.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        version = version_catalogo()
+        request.catalogo_version = version
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return vista(request, *args, **kwargs)
+
+        firma = hashlib.md5(f'{version}|{request.get_full_path()}'.encode()).hexdigest()
+        etag = quote_etag(firma)
+        modificado = ultima_modificacion(version)
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if respuesta is None:
+            clave = f'administrador:catalogo:pagina:{firma}'
+            respuesta = cache.get(clave)
+            if respuesta is None:
+                request.catalogo_guardar_pagina = True
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code != 200 or respuesta.cookies:
+                    return _con_token(respuesta, request)
+                cache.set(clave, respuesta, _segundos())
+            respuesta = _con_token(respuesta, request)
+
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(modificado)
+        patch_cache_control(respuesta, max_age=0, must_revalidate=True)
+        patch_vary_headers(respuesta, ('Cookie',))
+        return respuesta
+    return envoltura
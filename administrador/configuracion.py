@@ -0,0 +1,88 @@
+"""
+Módulo de Configuración - Digit Soft
+La configuración general activa en la memoria de cada proceso. La copia vence a los
+CONFIGURACION_VIGENCIA_SEGUNDOS, así que un cambio hecho en otro proceso (o con otra caché)
+llega a todos en ese plazo sin depender de una caché compartida; el proceso que guarda o
+elimina una configuración la relee de inmediato.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+
+
+class Configuracion:
+    """Copia de solo lectura de la ConfiguracionGeneral activa, con tipos de Python"""
+
+    CAMPOS = (
+        'pk', 'empresa_nombre', 'empresa_nit', 'empresa_direccion', 'empresa_telefono',
+        'empresa_email', 'empresa_logo', 'iva_porcentaje', 'moneda', 'timezone',
+        'resolucion_dian', 'rango_numeracion_desde', 'rango_numeracion_hasta', 'prefijo_factura',
+        'email_smtp_server', 'email_smtp_port', 'email_username', 'email_password', 'email_use_tls',
+    )
+
+    def __init__(self, datos):
+        from .dinero import a_centavos
+
+        self.pk = datos['pk']
+        self.empresa_nombre = datos['empresa_nombre']
+        self.empresa_nit = datos['empresa_nit']
+        self.empresa_direccion = datos['empresa_direccion']
+        self.empresa_telefono = datos['empresa_telefono']
+        self.empresa_email = datos['empresa_email']
+        self.empresa_logo = datos['empresa_logo'] or None
+
+        self.iva_porcentaje = Decimal(datos['iva_porcentaje'])
+        # En centésimas de punto porcentual (19 % -> 1900), como lo usa dinero.impuesto
+        self.tasa_iva = a_centavos(self.iva_porcentaje)
+        self.moneda = datos['moneda']
+        self.zona_horaria = datos['timezone']
+
+        self.resolucion_dian = datos['resolucion_dian']
+        self.rango_numeracion_desde = int(datos['rango_numeracion_desde'])
+        self.rango_numeracion_hasta = int(datos['rango_numeracion_hasta'])
+        self.prefijo_factura = datos['prefijo_factura']
+
+        self.email_smtp_server = datos['email_smtp_server']
+        self.email_smtp_port = int(datos['email_smtp_port'])
+        self.email_username = datos['email_username']
+        self.email_password = datos['email_password']
+        self.email_use_tls = bool(datos['email_use_tls'])
+
+    def __repr__(self):
+        return f'<Configuracion {self.pk}: {self.empresa_nombre}>'
+
+
+_copia = {'leida': None, 'configuracion': None}
+_lock = threading.Lock()
+
+
+def _vigente():
+    if _copia['leida'] is None:
+        return False
+    vigencia = getattr(settings, 'CONFIGURACION_VIGENCIA_SEGUNDOS', 5)
+    return time.monotonic() - _copia['leida'] < vigencia
+
+
+def configuracion():
+    """
+    Configuración activa (Configuracion) o None si no hay ninguna. Mientras la copia del
+    proceso esté vigente responde desde memoria, sin consultar la base de datos.
+    """
+    if not _vigente():
+        from .models import ConfiguracionGeneral
+
+        # El instante se toma antes de leer la fila: un cambio posterior se verá al vencer
+        leida = time.monotonic()
+        datos = ConfiguracionGeneral.objects.filter(activa=True).values(*Configuracion.CAMPOS).first()
+        with _lock:
+            _copia['configuracion'] = Configuracion(datos) if datos else None
+            _copia['leida'] = leida
+    return _copia['configuracion']
+
+
+def invalidar_configuracion():
+    """Tras guardar o eliminar una configuración: este proceso la relee en su siguiente uso"""
+    with _lock:
+        _copia['leida'] = None
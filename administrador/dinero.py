@@ -0,0 +1,101 @@
+"""
+Módulo de Dinero - Digit Soft
+Aritmética de montos en centavos enteros (exacta y sin crear un Decimal por línea) y el IVA
+de la configuración general. Los precios se leen ya en centavos desde la base de datos
+(en_centavos); convertir cada Decimal en Python cuesta más que la suma que se ahorra.
+Los resultados salen como Decimal con dos decimales, que es lo que guardan los modelos.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from operator import mul
+
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+
+
+# IVA si no hay una configuración activa, en centésimas de punto porcentual (19,00 %)
+TASA_IVA_POR_DEFECTO = 1900
+
+_CENTAVO = Decimal('0.01')
+
+
+def a_centavos(valor):
+    """Monto (Decimal, int, str o float) a centavos enteros, redondeando la mitad hacia arriba"""
+    if isinstance(valor, int):
+        return valor * 100
+    if not isinstance(valor, Decimal):
+        # str() evita arrastrar el error binario de un float
+        valor = Decimal(str(valor))
+    return int(valor.quantize(_CENTAVO, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def en_centavos(campo):
+    """Expresión para anotar un campo de dinero como centavos enteros calculados en la base de datos"""
+    return Cast(Round(F(campo) * 100), BigIntegerField())
+
+
+def a_decimal(centavos):
+    """Centavos enteros a Decimal con dos decimales"""
+    return Decimal(centavos).scaleb(-2)
+
+
+def formatear(centavos):
+    """Centavos como texto de moneda ($1,234.56) sin pasar por Decimal"""
+    signo = '-' if centavos < 0 else ''
+    pesos, resto = divmod(abs(centavos), 100)
+    return f'{signo}${pesos:,}.{resto:02d}'
+
+
+def _dividir(numerador, divisor):
+    """División entera redondeando la mitad alejándose de cero"""
+    cociente, resto = divmod(abs(numerador), divisor)
+    if resto * 2 >= divisor:
+        cociente += 1
+    return cociente if numerador >= 0 else -cociente
+
+
+# ========== IVA ========== #
+
+def tasa_iva():
+    """IVA de la configuración activa en centésimas de punto porcentual (19 % -> 1900)"""
+    from .configuracion import configuracion
+
+    activa = configuracion()
+    return TASA_IVA_POR_DEFECTO if activa is None else activa.tasa_iva
+
+
+def porcentaje_iva():
+    """IVA de la configuración activa como porcentaje para mostrar (Decimal('19.00'))"""
+    return a_decimal(tasa_iva())
+
+
+def impuesto(centavos, tasa=None):
+    """IVA en centavos de un monto en centavos"""
+    return _dividir(centavos * (tasa_iva() if tasa is None else tasa), 10000)
+
+
+def con_iva(monto, tasa=None):
+    """Monto con IVA incluido (Decimal)"""
+    centavos = a_centavos(monto)
+    return a_decimal(centavos + impuesto(centavos, tasa))
+
+
+# ========== TOTALES ========== #
+
+def subtotal_centavos(precios, cantidades):
+    """Suma de precio x cantidad de muchas líneas a la vez (precios en centavos)"""
+    return sum(map(mul, precios, cantidades))
+
+
+def totales(precios, cantidades, tasa=None):
+    """
+    Subtotal, IVA y total de un conjunto de líneas: `precios` en centavos y `cantidades`,
+    en el mismo orden. El IVA se calcula una vez sobre el subtotal.
+    Retorna {'subtotal', 'iva', 'total'} como Decimal.
+    """
+    subtotal = subtotal_centavos(precios, cantidades)
+    iva = impuesto(subtotal, tasa)
+    return {
+        'subtotal': a_decimal(subtotal),
+        'iva': a_decimal(iva),
+        'total': a_decimal(subtotal + iva),
+    }
@@ -2,21 +2,40 @@
 Módulo E-Commerce - Digit Soft
 Sistema completo de tienda online con carrito, facturación y garantías
 """
-from django.db.models import Q
-from decimal import Decimal
+from django.db import transaction
+from django.db.models import Q, F, Case, When, PositiveIntegerField
+from .secuencias import generar_codigos, reservar_numeros, ultimo_numero
+from .dinero import a_centavos, en_centavos, totales
+
+
+def leer_carrito(carrito):
+    """
+    Lectura del carrito para mostrarlo o cobrarlo: sus items con el producto de cada uno en
+    una sola consulta, y los totales calculados sobre esa misma lectura.
+    Retorna (items, totales); ninguno de los dos vuelve a consultar la base de datos.
+    """
+    items = list(
+        carrito.items.select_related('producto')
+        .annotate(precio_centavos=en_centavos('precio_unitario'))
+        .order_by('fecha_agregado', 'pk')
+    )
+    return items, calcular_totales_carrito(items)
 
 
 def calcular_totales_carrito(items_carrito):
-    """Calcula los totales del carrito"""
-    subtotal = sum(item.producto.precio_venta * item.cantidad for item in items_carrito)
-    iva = subtotal * Decimal('0.19')  # 19% IVA
-    total = subtotal + iva
-    
+    """
+    Calcula los totales del carrito con el precio_unitario de cada línea (el que se muestra
+    y el que suma Carrito.subtotal), en centavos y sin leer los productos. Los items de
+    leer_carrito ya traen el precio en centavos.
+    """
+    precios = [
+        item.precio_centavos if hasattr(item, 'precio_centavos') else a_centavos(item.precio_unitario)
+        for item in items_carrito
+    ]
+    cantidades = [item.cantidad for item in items_carrito]
     return {
-        'subtotal': subtotal,
-        'iva': iva,
-        'total': total,
-        'cantidad_items': sum(item.cantidad for item in items_carrito)
+        **totales(precios, cantidades),
+        'cantidad_items': sum(cantidades)
     }
 
 
@@ -25,41 +44,160 @@ def verificar_stock_disponible(producto, cantidad):
     return producto.stock_actual >= cantidad
 
 
-def reducir_stock_producto(producto, cantidad):
-    """Reduce el stock de un producto después de una venta"""
-    if verificar_stock_disponible(producto, cantidad):
-        producto.stock_actual -= cantidad
-        producto.save()
-        return True
-    return False
+class StockInsuficiente(Exception):
+    """Uno o más productos no tienen stock suficiente para completar la venta"""
+
+    def __init__(self, productos):
+        self.productos = productos
+        super().__init__(', '.join(producto.nombre for producto in productos))
+
+
+def _invalidar_catalogo():
+    """El UPDATE de stock no emite señales: la tienda pública se invalida al confirmar la venta"""
+    from .cache_catalogo import invalidar_catalogo
+
+    transaction.on_commit(invalidar_catalogo)
+
+
+def _revisar_stock(producto_ids):
+    """Los productos que bajaron de su mínimo pasan a la cola de reabastecimiento"""
+    from .reabastecimiento import revisar_stock
+
+    revisar_stock(producto_ids)
+
+
+def reducir_stock_producto(producto, cantidad, venta=None):
+    """Reduce el stock de un producto después de una venta (con su salida en el kardex)"""
+    from .kardex import registrar
+
+    movimiento = registrar(producto.pk, -cantidad, 'SALIDA', 'Venta', venta=venta)
+    if movimiento:
+        producto.refresh_from_db(fields=['stock_actual'])
+        _revisar_stock([producto.pk])
+        _invalidar_catalogo()
+    return movimiento is not None
+
+
+def reducir_stock_items(items_carrito, venta=None):
+    """
+    Descuenta el stock de todos los items del carrito en un único UPDATE condicional y
+    registra sus salidas en el kardex en un único INSERT.
+    Solo se vende lo disponible (stock menos lo reservado por otros carritos: las reservas
+    del propio carrito se liberan antes). Si algún producto no alcanza, lanza
+    StockInsuficiente y no se descuenta nada.
+    """
+    from .kardex import registrar_salidas
+    from administrador.models import Producto
+
+    cantidades = {}
+    for item in items_carrito:
+        cantidades[item.producto_id] = cantidades.get(item.producto_id, 0) + item.cantidad
+
+    if not cantidades:
+        return
+
+    condicion = Q()
+    for producto_id, cantidad in cantidades.items():
+        condicion |= Q(pk=producto_id, stock_actual__gte=F('stock_reservado') + cantidad)
+
+    try:
+        with transaction.atomic():
+            actualizados = Producto.objects.filter(condicion).update(
+                stock_actual=Case(
+                    *[When(pk=producto_id, then=F('stock_actual') - cantidad)
+                      for producto_id, cantidad in cantidades.items()],
+                    default=F('stock_actual'),
+                    output_field=PositiveIntegerField()
+                )
+            )
+            if actualizados != len(cantidades):
+                raise StockInsuficiente([])
+            registrar_salidas(cantidades, 'Venta', venta=venta)
+            _revisar_stock(cantidades)
+            _invalidar_catalogo()
+    except StockInsuficiente:
+        # El savepoint ya revirtió los descuentos parciales; se informa qué productos faltan
+        insuficientes = [
+            producto for producto in Producto.objects.filter(pk__in=cantidades)
+            if producto.stock_disponible < cantidades[producto.pk]
+        ]
+        raise StockInsuficiente(insuficientes)
 
 
 def generar_numero_venta():
     """Genera un número único de venta"""
     from administrador.models import Venta
-    from django.utils import timezone
-    
-    fecha = timezone.now().strftime('%Y%m%d')
-    ultimo = Venta.objects.filter(numero_venta__startswith=f'V{fecha}').count()
-    return f'V{fecha}{(ultimo + 1):04d}'
+
+    return generar_codigos('V', Venta, 'numero_venta', '%Y%m%d')[0]
 
 
 def generar_numero_factura():
-    """Genera un número único de factura"""
+    """Genera un número único de factura respetando la resolución configurada"""
     from administrador.models import Factura
-    from django.utils import timezone
-    
-    fecha = timezone.now().strftime('%Y%m%d')
-    ultimo = Factura.objects.filter(numero_factura__startswith=f'F{fecha}').count()
-    return f'F{fecha}{(ultimo + 1):04d}'
+    from administrador.configuracion import configuracion
+
+    config = configuracion()
+    if config is None:
+        return generar_codigos('F', Factura, 'numero_factura', '%Y%m%d')[0]
+
+    prefijo = config.prefijo_factura
+
+    def semilla():
+        return ultimo_numero(Factura, 'numero_factura', prefijo)
+
+    numero = reservar_numeros(
+        prefijo,
+        desde=config.rango_numeracion_desde,
+        hasta=config.rango_numeracion_hasta,
+        semilla=semilla
+    )[0]
+    digitos = len(str(config.rango_numeracion_hasta))
+    return f'{prefijo}{numero:0{digitos}d}'
 
 
 def generar_numero_garantia():
     """Genera un número único de garantía"""
+    return generar_numeros_garantia(1)[0]
+
+
+def generar_numeros_garantia(cantidad):
+    """Reserva `cantidad` números de garantía consecutivos en una sola operación"""
+    from administrador.models import Garantia
+
+    return generar_codigos('G', Garantia, 'numero_garantia', '%Y%m%d', cantidad=cantidad)
+
+
+def emitir_garantias(venta, items_carrito):
+    """
+    Emite las garantías de fabricante de una venta con un único bulk_create.
+    Retorna la lista de garantías creadas (productos sin garantía se omiten).
+    """
     from administrador.models import Garantia
     from django.utils import timezone
-    
-    fecha = timezone.now().strftime('%Y%m%d')
-    ultimo = Garantia.objects.filter(numero_garantia__startswith=f'G{fecha}').count()
-    return f'G{fecha}{(ultimo + 1):04d}'
+    from datetime import timedelta
+
+    items_con_garantia = [item for item in items_carrito if item.producto.garantia_meses > 0]
+    if not items_con_garantia:
+        return []
+
+    ahora = timezone.now()
+    numeros = generar_numeros_garantia(len(items_con_garantia))
 
+    garantias = [
+        Garantia(
+            numero_garantia=numero,
+            producto=item.producto,
+            cliente=venta.cliente,
+            venta=venta,
+            tipo_garantia='FABRICANTE',
+            fecha_inicio=ahora.date(),
+            fecha_vencimiento=(ahora + timedelta(days=item.producto.garantia_meses * 30)).date(),
+            duracion_meses=item.producto.garantia_meses,
+            estado='VIGENTE',
+            condiciones=f'Garantía del fabricante para {item.producto.nombre}',
+            cobertura='Defectos de fabricación',
+            exclusiones='Daños por mal uso o accidentes'
+        )
+        for numero, item in zip(numeros, items_con_garantia)
+    ]
+    return Garantia.objects.bulk_create(garantias)
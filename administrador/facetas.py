@@ -0,0 +1,149 @@
+"""
+Módulo de Facetas - Digit Soft
+Filtros de la tienda (categoría, marca, rango de precio, disponibilidad) con el conteo de
+productos de cada opción, calculados con una sola consulta agrupada
+"""
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+
+from .cache_catalogo import version_catalogo
+
+
+FACETAS = ('categoria', 'marca', 'precio', 'en_stock')
+
+# (clave, etiqueta, desde, hasta): rangos semiabiertos sobre el precio de venta
+RANGOS_PRECIO = (
+    ('0-100000', 'Hasta $100.000', None, 100000),
+    ('100000-500000', '$100.000 a $500.000', 100000, 500000),
+    ('500000-1000000', '$500.000 a $1.000.000', 500000, 1000000),
+    ('1000000-3000000', '$1.000.000 a $3.000.000', 1000000, 3000000),
+    ('3000000-', 'Más de $3.000.000', 3000000, None),
+)
+
+
+def _filtro_rango(clave):
+    for rango, _, desde, hasta in RANGOS_PRECIO:
+        if rango == clave:
+            filtro = {}
+            if desde is not None:
+                filtro['precio_venta__gte'] = desde
+            if hasta is not None:
+                filtro['precio_venta__lt'] = hasta
+            return Q(**filtro)
+    return None
+
+
+def seleccion_desde(parametros):
+    """Facetas elegidas en la URL (?categoria=&marca=&precio=&en_stock=1), descartando valores inválidos"""
+    from .models import Producto
+
+    seleccion = {}
+    categoria = parametros.get('categoria', '')
+    if categoria in dict(Producto.CATEGORIA_CHOICES):
+        seleccion['categoria'] = categoria
+    marca = parametros.get('marca', '')
+    if marca.isdigit():
+        seleccion['marca'] = int(marca)
+    precio = parametros.get('precio', '')
+    if _filtro_rango(precio) is not None:
+        seleccion['precio'] = precio
+    if parametros.get('en_stock') == '1':
+        seleccion['en_stock'] = True
+    return seleccion
+
+
+def _filtro(faceta, valor):
+    if faceta == 'categoria':
+        return Q(categoria=valor)
+    if faceta == 'marca':
+        return Q(marca_id=valor)
+    if faceta == 'precio':
+        return _filtro_rango(valor)
+    return Q(stock_actual__gt=0)
+
+
+def aplicar_facetas(productos, seleccion):
+    """Filtra el queryset por todas las facetas elegidas"""
+    for faceta, valor in seleccion.items():
+        productos = productos.filter(_filtro(faceta, valor))
+    return productos
+
+
+# ========== CONTEO ========== #
+
+def _grupos(productos):
+    """
+    Combinaciones (categoría, marca, rango de precio, en stock) presentes en los productos
+    con cuántos hay de cada una. Se guardan en caché por consulta base: las distintas
+    selecciones de facetas sobre la misma búsqueda reutilizan el mismo resultado.
+    """
+    sql, parametros = productos.order_by().query.sql_with_params()
+    version = version_catalogo()
+    clave = 'administrador:facetas:' + hashlib.md5(f'{version}|{sql}|{parametros}'.encode()).hexdigest()
+
+    grupos = cache.get(clave)
+    if grupos is None:
+        rango = Case(
+            *[When(_filtro_rango(clave_rango), then=Value(clave_rango)) for clave_rango, *_ in RANGOS_PRECIO],
+            output_field=CharField()
+        )
+        en_stock = Case(When(stock_actual__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField())
+        grupos = [
+            (fila['categoria'], fila['marca_id'], fila['marca__nombre'], fila['rango'], fila['en_stock'], fila['cantidad'])
+            for fila in productos.order_by()
+            .annotate(rango=rango, en_stock=en_stock)
+            .values('categoria', 'marca_id', 'marca__nombre', 'rango', 'en_stock')
+            .annotate(cantidad=Count('pk'))
+        ]
+        cache.set(clave, grupos, getattr(settings, 'FACETAS_CACHE_SEGUNDOS', 60))
+    return grupos
+
+
+def calcular_facetas(productos, seleccion):
+    """
+    Opciones de cada faceta con su conteo para los productos de `productos` (la búsqueda,
+    sin las facetas aplicadas). Cada faceta se cuenta con las demás facetas elegidas pero
+    no con la suya, así siempre muestra a qué otras opciones se puede cambiar.
+
+    Retorna {'total': int, 'categoria': [...], 'marca': [...], 'precio': [...], 'en_stock': [...]}
+    donde cada opción es {'valor', 'etiqueta', 'cantidad', 'seleccionado'}.
+    """
+    from .models import Producto
+
+    conteos = {faceta: Counter() for faceta in FACETAS}
+    etiquetas_marca = {}
+    total = 0
+    for categoria, marca_id, marca_nombre, rango, en_stock, cantidad in _grupos(productos):
+        valores = {'categoria': categoria, 'marca': marca_id, 'precio': rango, 'en_stock': en_stock}
+        etiquetas_marca[marca_id] = marca_nombre
+        descartes = [
+            faceta for faceta, elegido in seleccion.items()
+            if valores[faceta] != elegido
+        ]
+        if not descartes:
+            total += cantidad
+        for faceta in FACETAS:
+            if not descartes or descartes == [faceta]:
+                conteos[faceta][valores[faceta]] += cantidad
+
+    def opciones(faceta, etiquetas):
+        elegido = seleccion.get(faceta)
+        return [
+            {'valor': valor, 'etiqueta': etiqueta, 'cantidad': conteos[faceta][valor],
+             'seleccionado': valor == elegido}
+            for valor, etiqueta in etiquetas
+            if conteos[faceta][valor] or valor == elegido
+        ]
+
+    return {
+        'total': total,
+        'categoria': opciones('categoria', Producto.CATEGORIA_CHOICES),
+        'marca': opciones('marca', sorted(etiquetas_marca.items(), key=lambda marca: marca[1] or '')),
+        'precio': opciones('precio', [(clave, etiqueta) for clave, etiqueta, *_ in RANGOS_PRECIO]),
+        'en_stock': opciones('en_stock', [(True, 'Disponible para entrega inmediata')]),
+    }
+
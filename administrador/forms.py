@@ -8,6 +8,9 @@ from .models import (
 
 # ========== FORMULARIO DE PRODUCTO ========== #
 class ProductoForm(forms.ModelForm):
+    # Stock al abrir el formulario: el stock editado se guarda como ajuste por la diferencia
+    stock_leido = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
     class Meta:
         model = Producto
         fields = [
@@ -34,6 +37,11 @@ class ProductoForm(forms.ModelForm):
             'garantia_meses': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['stock_leido'].initial = self.instance.stock_actual
+
     def clean_precio_venta(self):
         precio_venta = self.cleaned_data.get('precio_venta')
         precio_compra = self.cleaned_data.get('precio_compra')
@@ -52,6 +60,11 @@ class ProductoForm(forms.ModelForm):
         
         return stock_maximo
 
+    def save(self, commit=True):
+        if self.instance.pk and self.cleaned_data.get('stock_leido') is not None:
+            self.instance._stock_leido = self.cleaned_data['stock_leido']
+        return super().save(commit)
+
 
 # ========== FORMULARIO DE CLIENTE ========== #
 class ClienteForm(forms.ModelForm):
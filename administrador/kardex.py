@@ -0,0 +1,159 @@
+"""
+Módulo Kardex - Digit Soft
+Libro de movimientos de inventario (MovimientoInventario): cada cambio de Producto.stock_actual
+es un UPDATE atómico con F() más la inserción de su movimiento, en la misma transacción, así
+que la suma de los movimientos de un producto es su stock. Los saldos (SaldoInventario) son
+cortes periódicos de esa suma: el stock a una fecha se calcula desde el último saldo anterior
+sin recorrer todo el historial.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import DateTimeField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import MovimientoInventario, Producto, SaldoInventario
+
+
+# Límite inferior de los movimientos de un producto que todavía no tiene saldos
+_INICIO = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# ========== MOVIMIENTOS ========== #
+
+def registrar(producto_id, cantidad, tipo, motivo='', **origen):
+    """
+    Mueve el stock de un producto `cantidad` unidades (negativa para las salidas) y registra el
+    movimiento. `origen` son las referencias del movimiento (venta, compra, orden_servicio).
+    Retorna el movimiento, o None si no había stock suficiente y no se movió nada.
+    """
+    with transaction.atomic():
+        productos = Producto.objects.filter(pk=producto_id)
+        if cantidad < 0:
+            # UPDATE ... WHERE stock_actual >= cantidad: la base de datos decide, no la copia en memoria
+            productos = productos.filter(stock_actual__gte=-cantidad)
+        if not productos.update(stock_actual=F('stock_actual') + cantidad):
+            return None
+        return MovimientoInventario.objects.create(
+            producto_id=producto_id, tipo=tipo, cantidad=cantidad, motivo=motivo, **origen
+        )
+
+
+def registrar_salidas(cantidades, motivo='', **origen):
+    """
+    Movimientos de un descuento de stock de varios productos que ya se aplicó en un solo
+    UPDATE ({producto_id: cantidad}, ver ecommerce.reducir_stock_items): un solo INSERT.
+    Llamar dentro de la misma transacción que el UPDATE.
+    """
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(producto_id=producto_id, tipo='SALIDA', cantidad=-cantidad, motivo=motivo, **origen)
+        for producto_id, cantidad in cantidades.items()
+    ])
+
+
+def registrar_inicial(producto):
+    """El stock con el que se crea un producto entra al kardex como su primer movimiento"""
+    if producto.stock_actual:
+        MovimientoInventario.objects.create(
+            producto=producto, tipo='ENTRADA', cantidad=producto.stock_actual, motivo='Inventario inicial'
+        )
+
+
+def ajustar(producto, stock_leido, stock_nuevo):
+    """
+    Ajuste manual del stock (formularios y admin): se aplica la diferencia entre el stock
+    editado y el que se había leído, así una venta concurrente no se pierde. Con stock_leido
+    None (instancia que no se leyó de la base de datos) el valor editado reemplaza al guardado.
+    Retorna el stock resultante.
+    """
+    with transaction.atomic():
+        if stock_leido is None:
+            stock_leido = (
+                Producto.objects.select_for_update().values_list('stock_actual', flat=True).get(pk=producto.pk)
+            )
+        cantidad = stock_nuevo - stock_leido
+        if cantidad and registrar(producto.pk, cantidad, 'AJUSTE', 'Ajuste manual de stock') is None:
+            raise ValidationError({
+                'stock_actual': 'El stock cambió mientras se editaba y el ajuste lo dejaría en negativo. '
+                                'Vuelva a cargar el producto.'
+            })
+        return Producto.objects.values_list('stock_actual', flat=True).get(pk=producto.pk)
+
+
+# ========== SALDOS ========== #
+
+def con_stock_kardex(productos, corte=None):
+    """
+    Anota en `productos` el stock según el kardex en `corte` (ahora, si es None) como
+    stock_kardex: el último saldo hasta el corte más los movimientos posteriores a él.
+    Se calcula en la misma consulta que lee stock_actual, así que ambos son del mismo instante.
+    """
+    saldos = SaldoInventario.objects.filter(producto=OuterRef('pk')).order_by('-fecha')
+    movimientos = MovimientoInventario.objects.filter(producto=OuterRef('pk'), fecha__gt=OuterRef('saldo_fecha'))
+    if corte is not None:
+        saldos = saldos.filter(fecha__lte=corte)
+        movimientos = movimientos.filter(fecha__lte=corte)
+    suma = movimientos.values('producto').annotate(total=Sum('cantidad')).values('total')
+
+    return productos.annotate(
+        saldo_fecha=Coalesce(
+            Subquery(saldos.values('fecha')[:1]), Value(_INICIO), output_field=DateTimeField()
+        ),
+        stock_kardex=Coalesce(Subquery(saldos.values('stock')[:1]), Value(0), output_field=IntegerField())
+        + Coalesce(Subquery(suma), Value(0), output_field=IntegerField()),
+    )
+
+
+def stock_al(producto_id, momento):
+    """Stock de un producto en un momento pasado, desde el saldo más cercano anterior"""
+    return (
+        con_stock_kardex(Producto.objects.filter(pk=producto_id), momento)
+        .values_list('stock_kardex', flat=True).get()
+    )
+
+
+def corte_del_dia(fecha):
+    """Instante del saldo de cierre de `fecha`: la medianoche local siguiente"""
+    return timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+
+def cerrar_saldos(corte, lote=1000):
+    """
+    Guarda el saldo de cada producto en `corte`, por lotes de productos. Se puede repetir para
+    el mismo corte: los saldos que ya existen se conservan. Retorna los productos revisados.
+    El corte debe estar en el pasado, cuando ya no quedan ventas en curso con esa fecha.
+    """
+    productos = con_stock_kardex(Producto.objects.order_by('pk'), corte).values_list('pk', 'stock_kardex')
+    revisados = 0
+    ultimo = 0
+    while True:
+        filas = list(productos.filter(pk__gt=ultimo)[:lote])
+        if not filas:
+            break
+        ultimo = filas[-1][0]
+        SaldoInventario.objects.bulk_create(
+            [SaldoInventario(producto_id=producto_id, fecha=corte, stock=stock) for producto_id, stock in filas],
+            ignore_conflicts=True
+        )
+        revisados += len(filas)
+    return revisados
+
+
+def conciliar(producto_id):
+    """
+    Registra como ajuste la diferencia entre stock_actual y el kardex de un producto, con la
+    fila bloqueada para que ningún movimiento se cruce. Retorna la diferencia ajustada.
+    """
+    with transaction.atomic():
+        stock_actual, stock_kardex = (
+            con_stock_kardex(Producto.objects.filter(pk=producto_id).select_for_update(of=('self',)))
+            .values_list('stock_actual', 'stock_kardex').get()
+        )
+        diferencia = stock_actual - stock_kardex
+        if diferencia:
+            MovimientoInventario.objects.create(
+                producto_id=producto_id, tipo='AJUSTE', cantidad=diferencia, motivo='Conciliación con el stock actual'
+            )
+        return diferencia
@@ -0,0 +1,2 @@
+# Este archivo hace que Python reconozca este directorio como un paquete
+
@@ -0,0 +1,81 @@
+"""
+Comando de prueba de carga del carrito de la tienda pública: latencia de agregar y
+actualizar líneas en un carrito grande, pasando por las vistas y los middlewares
+"""
+import json
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from administrador import almacen_carrito
+from administrador.models import Marca, Producto
+
+
+def _percentil(tiempos, porcentaje):
+    ordenados = sorted(tiempos)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * porcentaje / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Mide p50/p95/p99 de agregar y actualizar líneas en un carrito (los datos de prueba se descartan)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, default=100, help='Productos distintos en el carrito')
+        parser.add_argument('--operaciones', type=int, default=500, help='Cambios de cantidad a medir')
+
+    def _medir(self, cliente, url, datos, tiempos):
+        inicio = time.perf_counter()
+        respuesta = cliente.post(url, json.dumps(datos), content_type='application/json')
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f'{url} respondió {respuesta.status_code}: {respuesta.content[:200]}')
+
+    def handle(self, *args, **options):
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+        cliente = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+        url_agregar = reverse('main:agregar_al_carrito')
+        url_actualizar = reverse('main:actualizar_carrito')
+        tiempos = {'agregar': [], 'actualizar': []}
+
+        # Todo ocurre dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            marca = Marca.objects.create(nombre='Prueba de carga', tipo_marca='EQUIPOS')
+            productos = [
+                Producto.objects.create(
+                    codigo_producto=f'CARGA-{i:05d}', nombre=f'Producto de carga {i}', descripcion='-',
+                    categoria='ACCESORIOS', marca=marca, precio_compra=800, precio_venta=1000,
+                    stock_actual=1000000
+                ).pk
+                for i in range(options['lineas'])
+            ]
+
+            for producto_id in productos:
+                self._medir(cliente, url_agregar, {'producto_id': producto_id, 'cantidad': 1}, tiempos['agregar'])
+
+            for _ in range(options['operaciones']):
+                producto_id = random.choice(productos)
+                if random.random() < 0.5:
+                    self._medir(cliente, url_agregar, {'producto_id': producto_id, 'cantidad': 1}, tiempos['agregar'])
+                else:
+                    cantidad = random.randint(1, 5)
+                    self._medir(cliente, url_actualizar, {'producto_id': producto_id, 'cantidad': cantidad},
+                                tiempos['actualizar'])
+
+            carrito_id = cliente.session.get(almacen_carrito.CLAVE_SESION)
+            if carrito_id:
+                almacen_carrito.almacen().vaciar(carrito_id)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Carrito de {options['lineas']} líneas, {options['operaciones']} cambios de cantidad")
+        for operacion, valores in tiempos.items():
+            if valores:
+                self.stdout.write(
+                    f'  {operacion:<11} n={len(valores):<5} '
+                    f'p50={_percentil(valores, 50):.2f} ms  p95={_percentil(valores, 95):.2f} ms  '
+                    f'p99={_percentil(valores, 99):.2f} ms  máx={max(valores):.2f} ms'
+                )
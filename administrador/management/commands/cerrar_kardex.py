@@ -0,0 +1,40 @@
+"""
+Comando para guardar los saldos de inventario al cierre de un día (programar con cron cada
+madrugada): las consultas de stock a una fecha parten del saldo más cercano
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from administrador.kardex import cerrar_saldos, corte_del_dia
+
+
+class Command(BaseCommand):
+    help = 'Guarda el saldo del kardex de cada producto al cierre de un día (por defecto, ayer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Día a cerrar (AAAA-MM-DD)')
+        parser.add_argument('--lote', type=int, default=1000, help='Productos por consulta')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError('--fecha debe tener el formato AAAA-MM-DD')
+        else:
+            fecha = timezone.localdate() - timedelta(days=1)
+        corte = corte_del_dia(fecha)
+        if corte > timezone.now():
+            raise CommandError('Solo se pueden cerrar días terminados')
+
+        inicio = time.perf_counter()
+        productos = cerrar_saldos(corte, lote=options['lote'])
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Saldos al cierre del {fecha}: {productos} productos en {segundos:.2f} s'
+        ))
@@ -0,0 +1,48 @@
+"""
+Comando para verificar (y conciliar) el stock actual de cada producto contra su kardex
+"""
+from django.core.management.base import BaseCommand, CommandError
+from administrador.kardex import con_stock_kardex, conciliar
+from administrador.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Compara stock_actual con el último saldo más los movimientos del kardex y reporta o ajusta las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true',
+                            help='Registrar un ajuste en el kardex por cada diferencia (el stock actual no cambia)')
+        parser.add_argument('--lote', type=int, default=1000, help='Productos por consulta')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+
+        productos = con_stock_kardex(Producto.objects.order_by('pk')).values_list('pk', 'stock_actual', 'stock_kardex')
+        revisados = 0
+        con_diferencia = []
+        ultimo = 0
+        while True:
+            # Un lote por consulta, avanzando por clave primaria
+            lote = list(productos.filter(pk__gt=ultimo)[:options['lote']])
+            if not lote:
+                break
+            ultimo = lote[-1][0]
+            revisados += len(lote)
+
+            for producto_id, stock_actual, stock_kardex in lote:
+                if stock_actual == stock_kardex:
+                    continue
+                con_diferencia.append(producto_id)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  Producto {producto_id}: stock {stock_actual}, kardex {stock_kardex}')
+
+        mensaje = f'Productos revisados: {revisados}, con diferencias: {len(con_diferencia)}'
+        if options['reparar']:
+            # Se vuelve a calcular con la fila bloqueada: un movimiento concurrente no se duplica
+            ajustados = sum(1 for producto_id in con_diferencia if conciliar(producto_id))
+            self.stdout.write(self.style.SUCCESS(f'✅ {mensaje}, ajustados: {ajustados}'))
+        elif con_diferencia:
+            self.stdout.write(self.style.WARNING(f'⚠️ {mensaje} (use --reparar para ajustar el kardex)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {mensaje}'))
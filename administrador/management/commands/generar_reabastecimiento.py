@@ -0,0 +1,27 @@
+"""
+Comando para convertir la cola de reabastecimiento en solicitudes de compra por proveedor
+(programar con cron, por ejemplo una vez al día). Con --revisar encola antes los productos
+marcados con stock bajo que no tienen una sugerencia abierta (p. ej. marcados con un UPDATE
+directo a la base de datos, que no pasa por revisar_stock).
+"""
+from django.core.management.base import BaseCommand
+from administrador.models import Producto
+from administrador.reabastecimiento import encolar, generar_compras
+
+
+class Command(BaseCommand):
+    help = 'Agrupa las sugerencias de reabastecimiento pendientes en compras en estado SOLICITUD, una por proveedor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revisar', action='store_true',
+                            help='Antes, encolar los productos con stock bajo que no tengan una sugerencia abierta')
+
+    def handle(self, *args, **options):
+        if options['revisar']:
+            encoladas = encolar(Producto.objects.filter(bajo_stock=True).values_list('pk', flat=True))
+            self.stdout.write(f'Sugerencias nuevas: {len(encoladas)}')
+
+        compras = generar_compras()
+        for compra in compras:
+            self.stdout.write(f'  {compra.numero_compra}: {compra.proveedor} ({compra.subtotal})')
+        self.stdout.write(self.style.SUCCESS(f'✅ Compras generadas: {len(compras)}'))
@@ -0,0 +1,31 @@
+"""
+Comando para liberar las reservas de stock vencidas (programar con cron cada pocos minutos)
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from administrador.reservas import liberar_vencidas, recalcular_reservado
+
+
+class Command(BaseCommand):
+    help = 'Devuelve al stock disponible las unidades de las reservas vencidas, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Reservas por transacción')
+        parser.add_argument('--recalcular', action='store_true',
+                            help='Además, rehacer el stock reservado de cada producto desde las reservas')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+
+        inicio = time.perf_counter()
+        liberadas = liberar_vencidas(lote=options['lote'])
+        segundos = time.perf_counter() - inicio
+        if options['recalcular']:
+            recalcular_reservado()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Reservas liberadas: {liberadas} en {segundos:.2f} s '
+            f'({liberadas / segundos if segundos else 0:.0f} reservas/s)'
+        ))
@@ -0,0 +1,44 @@
+"""
+Comando para marcar los carritos abandonados y vencidos y purgar del almacén los que nadie usó (programar con cron, p. ej. cada hora)
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from administrador.almacen_carrito import almacen
+from administrador.barrido_carritos import barrer_carritos
+
+
+class Command(BaseCommand):
+    help = 'Pasa a ABANDONADO los carritos inactivos y a EXPIRADO los vencidos, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Carritos por transacción')
+        parser.add_argument('--horas', type=float, help='Horas sin cambios para considerar abandonado un carrito')
+        parser.add_argument('--simular', action='store_true', help='Solo contar, sin modificar')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+        inactividad = timedelta(hours=options['horas']) if options['horas'] is not None else None
+
+        inicio = time.perf_counter()
+        marcados = barrer_carritos(lote=options['lote'], inactividad=inactividad, simular=options['simular'])
+        # Carritos (sobre todo anónimos) que nadie tocó durante su vigencia
+        purgados = 0 if options['simular'] else almacen().purgar(
+            getattr(settings, 'CARRITO_VIGENCIA_SEGUNDOS', 30 * 24 * 3600)
+        )
+        segundos = time.perf_counter() - inicio
+
+        total = sum(marcados.values())
+        if options['simular']:
+            self.stdout.write(
+                f"Se marcarían {marcados['ABANDONADO']} carritos abandonados y {marcados['EXPIRADO']} expirados"
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Carritos abandonados: {marcados['ABANDONADO']}, expirados: {marcados['EXPIRADO']}, "
+            f"purgados del almacén: {purgados} "
+            f"en {segundos:.2f} s ({total / segundos if segundos else 0:.0f} carritos/s)"
+        ))
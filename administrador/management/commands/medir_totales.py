@@ -0,0 +1,51 @@
+"""
+Micro-benchmark de los totales de un carrito: Decimal por línea contra centavos enteros
+(administrador.dinero), sobre los mismos precios y cantidades en memoria
+"""
+import random
+import timeit
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.management.base import BaseCommand
+
+from administrador import dinero
+
+
+class Command(BaseCommand):
+    help = 'Compara el cálculo de subtotal, IVA y total con Decimal por línea y con centavos enteros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, default=1000, help='Líneas del carrito')
+        parser.add_argument('--repeticiones', type=int, default=200, help='Cálculos por medición')
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(0)
+        centavos = [aleatorio.randint(1000, 900000000) for _ in range(options['lineas'])]
+        cantidades = [aleatorio.randint(1, 5) for _ in range(options['lineas'])]
+        # Lo que entrega la base de datos en cada caso: Decimal o centavos (dinero.en_centavos)
+        precios = [dinero.a_decimal(valor) for valor in centavos]
+        tasa = Decimal('0.19')
+        centavo = Decimal('0.01')
+
+        def con_decimal():
+            subtotal = sum((precio * cantidad for precio, cantidad in zip(precios, cantidades)), Decimal('0'))
+            iva = (subtotal * tasa).quantize(centavo, rounding=ROUND_HALF_UP)
+            return subtotal, iva, subtotal + iva
+
+        def con_centavos():
+            return dinero.totales(centavos, cantidades, tasa=1900)
+
+        resultado = con_centavos()
+        if con_decimal() != (resultado['subtotal'], resultado['iva'], resultado['total']):
+            raise RuntimeError('Los dos cálculos no coinciden')
+
+        self.stdout.write(f"Carrito de {options['lineas']} líneas, {options['repeticiones']} cálculos por medición")
+        tiempos = {}
+        for nombre, funcion in (('Decimal por línea', con_decimal), ('Centavos enteros', con_centavos)):
+            mejor = min(timeit.repeat(funcion, number=options['repeticiones'], repeat=5))
+            tiempos[nombre] = mejor / options['repeticiones'] * 1e6
+            self.stdout.write(f'  {nombre:<18} {tiempos[nombre]:10.1f} µs')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Centavos enteros: {tiempos['Decimal por línea'] / tiempos['Centavos enteros']:.1f}x más rápido"
+        ))
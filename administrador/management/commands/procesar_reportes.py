@@ -0,0 +1,52 @@
+"""
+Comando para generar en segundo plano los reportes solicitados desde el Centro de Reportes
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from administrador.reportes import jobs_por_procesar, procesar_reporte_job
+
+
+def _inicializar_proceso():
+    """Prepara Django en cada proceso del pool (necesario cuando no se usa fork)"""
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Procesa los reportes pendientes con un pool de procesos locales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=2,
+                            help='Número de procesos que generan reportes en paralelo')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Seguir esperando nuevos reportes en lugar de terminar')
+        parser.add_argument('--intervalo', type=float, default=5,
+                            help='Segundos entre revisiones en modo continuo')
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['procesos'], initializer=_inicializar_proceso) as pool:
+            while True:
+                # Pendientes y abandonados por un worker que dejó de dar latidos
+                pendientes = list(
+                    jobs_por_procesar()
+                    .order_by('fecha_solicitud')
+                    .values_list('pk', flat=True)
+                )
+
+                if pendientes:
+                    # Los procesos hijos abren sus propias conexiones; no deben heredar las del padre
+                    connections.close_all()
+                    for job_id, estado in zip(pendientes, pool.map(procesar_reporte_job, pendientes)):
+                        if estado == 'COMPLETADO':
+                            self.stdout.write(self.style.SUCCESS(f'✅ Reporte #{job_id} generado'))
+                        elif estado == 'ERROR':
+                            self.stdout.write(self.style.ERROR(f'❌ Reporte #{job_id} falló'))
+
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS('Procesamiento de reportes finalizado.'))
@@ -0,0 +1,28 @@
+"""
+Comando para recalcular el resumen diario de ventas a partir de la tabla de ventas
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from administrador.metricas import invalidar_metricas
+from administrador.resumen_ventas import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de ventas (todo el historial o un rango de fechas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a recalcular (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Último día a recalcular (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for opcion in ('desde', 'hasta'):
+            if options[opcion]:
+                fechas[opcion] = parse_date(options[opcion])
+                if fechas[opcion] is None:
+                    raise CommandError(f'Fecha inválida para --{opcion}: {options[opcion]}')
+
+        filas = reconstruir_resumen(fechas.get('desde'), fechas.get('hasta'))
+        invalidar_metricas()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen diario reconstruido: {filas} filas'))
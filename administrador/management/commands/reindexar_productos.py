@@ -0,0 +1,20 @@
+"""
+Comando para reconstruir el índice de búsqueda de productos de la tienda
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from administrador.busqueda import crear_indice, indice_disponible, reconstruir_indice
+from administrador.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de texto completo de productos (FTS5 / tsvector)'
+
+    def handle(self, *args, **options):
+        if not indice_disponible() and not crear_indice(connection):
+            raise CommandError(f'El motor "{connection.vendor}" no soporta el índice de búsqueda.')
+
+        with transaction.atomic():
+            total = reconstruir_indice(Producto.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Índice de búsqueda reconstruido: {total} productos'))
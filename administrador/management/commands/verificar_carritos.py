@@ -0,0 +1,72 @@
+"""
+Comando para verificar (y reparar) los totales guardados de los carritos contra sus items
+"""
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from administrador.models import Carrito
+
+
+class Command(BaseCommand):
+    help = 'Recalcula total_items y subtotal de cada carrito desde sus items y reporta o repara las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help='Corregir los carritos con diferencias')
+        parser.add_argument('--estado', help='Solo carritos en este estado (ACTIVO, ABANDONADO, ...)')
+        parser.add_argument('--lote', type=int, default=1000, help='Carritos por consulta')
+
+    def handle(self, *args, **options):
+        carritos = Carrito.objects.order_by('pk')
+        if options['estado']:
+            carritos = carritos.filter(estado=options['estado'])
+        carritos = carritos.annotate(
+            items_reales=Coalesce(Sum('items__cantidad'), Value(0)),
+            subtotal_real=Coalesce(
+                Sum(ExpressionWrapper(
+                    F('items__cantidad') * F('items__precio_unitario'),
+                    output_field=DecimalField(max_digits=14, decimal_places=2)
+                )),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            )
+        ).values_list('pk', 'total_items', 'subtotal', 'items_reales', 'subtotal_real')
+
+        revisados = 0
+        con_diferencia = 0
+        ultimo = 0
+        while True:
+            # Un lote por consulta, avanzando por clave primaria
+            lote = list(carritos.filter(pk__gt=ultimo)[:options['lote']])
+            if not lote:
+                break
+            ultimo = lote[-1][0]
+            revisados += len(lote)
+
+            reparaciones = []
+            for carrito_id, total_items, subtotal, items_reales, subtotal_real in lote:
+                subtotal_real = Decimal(subtotal_real).quantize(Decimal('0.01'))
+                if total_items == items_reales and subtotal == subtotal_real:
+                    continue
+                con_diferencia += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'  Carrito {carrito_id}: items {total_items} -> {items_reales}, '
+                        f'subtotal {subtotal} -> {subtotal_real}'
+                    )
+                reparaciones.append(carrito_id)
+
+            for carrito_id in reparaciones if options['reparar'] else []:
+                # Se recalcula con la fila bloqueada: un delta concurrente se aplica después
+                with transaction.atomic():
+                    Carrito.objects.select_for_update().get(pk=carrito_id).actualizar_totales()
+
+        mensaje = f'Carritos revisados: {revisados}, con diferencias: {con_diferencia}'
+        if options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {mensaje}, reparados: {con_diferencia}'))
+        elif con_diferencia:
+            self.stdout.write(self.style.WARNING(f'⚠️ {mensaje} (use --reparar para corregirlos)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {mensaje}'))
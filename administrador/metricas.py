@@ -0,0 +1,138 @@
+"""
+Módulo de Métricas - Digit Soft
+Contadores de los dashboards calculados en un solo viaje a la base de datos y guardados en caché
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, DecimalField, Sum, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Cliente, Producto, OrdenServicio, Venta, Factura, Equipo, Tecnico, VentaResumenDiario
+from .reportes import rango_mes
+from .versiones import nueva_version, version
+
+
+CLAVE_DASHBOARD = 'administrador:metricas:dashboard'
+CLAVE_REPORTES = 'administrador:metricas:reportes'
+VERSION_METRICAS = 'metricas'
+
+# Modelos cuyas escrituras invalidan las métricas en caché (ver signals.py)
+MODELOS_METRICAS = (Cliente, Producto, OrdenServicio, Venta, Factura, Equipo, Tecnico)
+
+
+def _segundos_cache():
+    """Tiempo máximo que las métricas permanecen en caché"""
+    return getattr(settings, 'DASHBOARD_CACHE_SEGUNDOS', 60)
+
+
+def _clave(base):
+    """Clave de caché con la versión compartida de las métricas (ver versiones.py)"""
+    return f'{base}:{version(VERSION_METRICAS)}'
+
+
+def _metricas_en_una_consulta(metricas):
+    """
+    Calcula varias métricas de distintas tablas con una única consulta (UNION ALL).
+
+    `metricas` es un dict {clave: (queryset, agregado)}; cada parte aporta una fila
+    (clave, valor). Los conteos se devuelven como int y el resto como Decimal.
+    """
+    partes = [
+        queryset.order_by()
+        .annotate(clave=Value(clave, output_field=CharField()))
+        .values('clave')
+        .annotate(valor=Cast(agregado, DecimalField(max_digits=20, decimal_places=2)))
+        for clave, (queryset, agregado) in metricas.items()
+    ]
+    consulta = partes[0].union(*partes[1:], all=True)
+
+    resultado = {}
+    for fila in consulta:
+        valor = fila['valor'] or Decimal('0')
+        if isinstance(metricas[fila['clave']][1], Count):
+            valor = int(valor)
+        else:
+            valor = Decimal(valor).quantize(Decimal('0.01'))
+        resultado[fila['clave']] = valor
+    return resultado
+
+
+def metricas_dashboard():
+    """Contadores y listados del dashboard principal (con caché)"""
+    clave = _clave(CLAVE_DASHBOARD)
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    inicio_mes, fin_mes = rango_mes()
+
+    stats = _metricas_en_una_consulta({
+        'total_clientes': (Cliente.objects.filter(activo=True), Count('id')),
+        'total_productos': (Producto.objects.filter(activo=True), Count('id')),
+        'ordenes_pendientes': (OrdenServicio.objects.filter(estado='PENDIENTE'), Count('id')),
+        'ventas_mes': (
+            Venta.objects.filter(fecha_venta__gte=inicio_mes, fecha_venta__lt=fin_mes), Count('id')
+        ),
+        'equipos_reparacion': (Equipo.objects.filter(estado_fisico='EN_REPARACION'), Count('id')),
+        'tecnicos_disponibles': (Tecnico.objects.filter(estado_actual='DISPONIBLE'), Count('id')),
+    })
+
+    datos = {
+        'stats': stats,
+        'ordenes_recientes': list(
+            OrdenServicio.objects.select_related('cliente', 'tecnico_asignado')[:5]
+        ),
+        'productos_stock_bajo': list(
+            Producto.objects.filter(bajo_stock=True)[:5]
+        ),
+    }
+    cache.set(clave, datos, _segundos_cache())
+    return datos
+
+
+def metricas_reportes():
+    """Estadísticas del centro de reportes para los últimos 30 días (con caché)"""
+    clave = _clave(CLAVE_REPORTES)
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    fecha_fin = timezone.localdate()
+    fecha_inicio = fecha_fin - timedelta(days=30)
+    # Las ventas se leen del resumen diario: 31 filas por combinación de estado y método de pago
+    ventas = VentaResumenDiario.objects.filter(fecha__gte=fecha_inicio, fecha__lte=fecha_fin)
+    productos = Producto.objects.filter(activo=True)
+
+    stats = _metricas_en_una_consulta({
+        'total_ventas': (ventas, Sum('cantidad_ventas')),
+        'total_ingresos': (ventas, Sum('total')),
+        'total_clientes': (Cliente.objects.filter(activo=True), Count('id')),
+        'total_productos': (productos, Count('id')),
+        'ordenes_completadas': (OrdenServicio.objects.filter(estado='COMPLETADA'), Count('id')),
+        'productos_stock_bajo': (
+            productos.filter(bajo_stock=True), Count('id')
+        ),
+    })
+
+    stats['total_ventas'] = int(stats['total_ventas'])
+    stats['promedio_venta'] = (
+        (stats['total_ingresos'] / stats['total_ventas']).quantize(Decimal('0.01'))
+        if stats['total_ventas'] else Decimal('0.00')
+    )
+
+    datos = {
+        'stats': stats,
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+    }
+    cache.set(clave, datos, _segundos_cache())
+    return datos
+
+
+def invalidar_metricas():
+    """Descarta las métricas en caché de todos los procesos: la próxima visita las recalcula"""
+    nueva_version(VERSION_METRICAS)
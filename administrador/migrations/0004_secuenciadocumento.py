@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0003_cliente_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(max_length=10, verbose_name='Prefijo')),
+                ('periodo', models.CharField(blank=True, default='', max_length=8, verbose_name='Periodo')),
+                ('ultimo_valor', models.PositiveBigIntegerField(default=0, verbose_name='Último valor asignado')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Documento',
+                'verbose_name_plural': 'Secuencias de Documentos',
+                'db_table': 'secuencias_documento',
+                'unique_together': {('prefijo', 'periodo')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0004_secuenciadocumento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('VENTAS', 'Ventas'), ('SERVICIOS', 'Servicios Técnicos'), ('COMPRAS', 'Compras')], max_length=12, verbose_name='Tipo de reporte')),
+                ('fecha_inicio', models.DateField(blank=True, null=True, verbose_name='Desde')),
+                ('fecha_fin', models.DateField(blank=True, null=True, verbose_name='Hasta')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=12, verbose_name='Estado')),
+                ('archivo', models.FileField(blank=True, null=True, upload_to='reportes/', verbose_name='Archivo generado')),
+                ('mensaje_error', models.TextField(blank=True, null=True, verbose_name='Mensaje de error')),
+                ('fecha_solicitud', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de solicitud')),
+                ('fecha_inicio_proceso', models.DateTimeField(blank=True, null=True, verbose_name='Inicio del proceso')),
+                ('fecha_finalizacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de finalización')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Reporte en Segundo Plano',
+                'verbose_name_plural': 'Reportes en Segundo Plano',
+                'db_table': 'reportes_jobs',
+                'ordering': ['-fecha_solicitud'],
+                'indexes': [models.Index(fields=['tipo', 'fecha_inicio', 'fecha_fin', 'estado'], name='reportes_jo_tipo_eeb858_idx'), models.Index(fields=['estado', 'fecha_solicitud'], name='reportes_jo_estado_14b29b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0005_reportejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['estado', 'fecha_solicitud'], name='compras_estado_603067_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicio',
+            index=models.Index(fields=['estado', 'fecha_ingreso'], name='ordenes_ser_estado_a3a32c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta', 'estado'], name='ventas_fecha_v_8aff2e_idx'),
+        ),
+    ]
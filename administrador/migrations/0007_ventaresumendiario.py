@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0006_indices_rangos_fechas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADA', 'Pagada'), ('PARCIAL', 'Pago Parcial'), ('ANULADA', 'Anulada'), ('CREDITO', 'A Crédito')], max_length=10, verbose_name='Estado')),
+                ('metodo_pago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TARJETA_DEBITO', 'Tarjeta Débito'), ('TARJETA_CREDITO', 'Tarjeta Crédito'), ('TRANSFERENCIA', 'Transferencia'), ('CREDITO', 'A Crédito'), ('MIXTO', 'Mixto')], max_length=15, verbose_name='Método de pago')),
+                ('cantidad_ventas', models.IntegerField(default=0, verbose_name='Cantidad de ventas')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('impuestos', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Impuestos')),
+                ('descuento', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Descuento')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'db_table': 'ventas_resumen_diario',
+                'ordering': ['-fecha'],
+                'unique_together': {('fecha', 'estado', 'metodo_pago')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+import unicodedata
+
+from django.db import migrations, OperationalError
+
+
+# Copia congelada de la estructura del índice (administrador/busqueda.py) al momento de esta
+# migración: la migración no debe cambiar si el módulo de búsqueda cambia después.
+TABLA_BUSQUEDA = 'productos_busqueda'
+
+COLUMNAS_BUSQUEDA = ('nombre', 'codigo_producto', 'palabras_clave', 'marca', 'descripcion', 'especificaciones')
+
+PESOS_POSTGRES = ('A', 'A', 'B', 'B', 'D', 'D')
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA} USING fts5("
+                    f"{', '.join(COLUMNAS_BUSQUEDA)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+                )
+            except OperationalError:
+                # SQLite compilado sin FTS5: la tienda sigue buscando con LIKE
+                return
+            insertar = (
+                f"INSERT INTO {TABLA_BUSQUEDA} (rowid, {', '.join(COLUMNAS_BUSQUEDA)}) "
+                f"VALUES ({', '.join(['%s'] * (len(COLUMNAS_BUSQUEDA) + 1))})"
+            )
+        elif conexion.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLA_BUSQUEDA} ("
+                f"producto_id bigint PRIMARY KEY REFERENCES productos (id) ON DELETE CASCADE, "
+                f"documento tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLA_BUSQUEDA}_documento_idx "
+                f"ON {TABLA_BUSQUEDA} USING GIN (documento)"
+            )
+            documento = ' || '.join(
+                f"setweight(to_tsvector('spanish', %s), '{peso}')" for peso in PESOS_POSTGRES
+            )
+            insertar = f"INSERT INTO {TABLA_BUSQUEDA} (producto_id, documento) VALUES (%s, {documento})"
+        else:
+            return
+
+        Producto = apps.get_model('administrador', 'Producto')
+        filas = Producto.objects.using(conexion.alias).order_by().values_list(
+            'id', 'nombre', 'codigo_producto', 'palabras_clave', 'marca__nombre',
+            'descripcion', 'especificaciones'
+        )
+        lote = []
+        for fila in filas.iterator(chunk_size=2000):
+            lote.append((fila[0], *[_normalizar(valor) for valor in fila[1:]]))
+            if len(lote) >= 2000:
+                cursor.executemany(insertar, lote)
+                lote = []
+        if lote:
+            cursor.executemany(insertar, lote)
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_BUSQUEDA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0007_ventaresumendiario'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0008_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(fields=['estado', 'fecha_expiracion'], name='carritos_estado_expira_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0009_indice_carritos_expiracion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='stock_reservado',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Stock reservado'),
+        ),
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('carrito', models.CharField(max_length=64, verbose_name='Carrito')),
+                ('cantidad', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_expiracion', models.DateTimeField(verbose_name='Fecha de expiración')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='administrador.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Stock',
+                'verbose_name_plural': 'Reservas de Stock',
+                'db_table': 'reservas_stock',
+                'indexes': [models.Index(fields=['fecha_expiracion'], name='reservas_expiracion_idx')],
+                'unique_together': {('carrito', 'producto')},
+            },
+        ),
+    ]
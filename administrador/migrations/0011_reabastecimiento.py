@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def marcar_bajo_stock(apps, schema_editor):
+    Producto = apps.get_model('administrador', 'Producto')
+    Producto.objects.filter(stock_actual__lte=models.F('stock_minimo')).update(bajo_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0010_reservas_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReabastecimientoSugerido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad_sugerida', models.PositiveIntegerField(verbose_name='Cantidad sugerida')),
+                ('stock_detectado', models.PositiveIntegerField(verbose_name='Stock al detectarlo')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_COMPRA', 'En compra'), ('ATENDIDO', 'Atendido'), ('DESCARTADO', 'Descartado')], default='PENDIENTE', max_length=12, verbose_name='Estado')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Reabastecimiento Sugerido',
+                'verbose_name_plural': 'Reabastecimientos Sugeridos',
+                'db_table': 'reabastecimientos_sugeridos',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='bajo_stock',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Stock bajo'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('bajo_stock', True)), fields=['bajo_stock'], name='productos_bajo_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='reabastecimientosugerido',
+            name='compra',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reabastecimientos', to='administrador.compra', verbose_name='Compra'),
+        ),
+        migrations.AddField(
+            model_name='reabastecimientosugerido',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reabastecimientos', to='administrador.producto', verbose_name='Producto'),
+        ),
+        migrations.AddField(
+            model_name='reabastecimientosugerido',
+            name='proveedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='administrador.proveedor', verbose_name='Proveedor'),
+        ),
+        migrations.AddIndex(
+            model_name='reabastecimientosugerido',
+            index=models.Index(fields=['estado', 'proveedor'], name='reabastecim_estado_dddaa7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reabastecimientosugerido',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['PENDIENTE', 'EN_COMPRA'])), fields=('producto',), name='reabastecimiento_abierto_unico'),
+        ),
+        migrations.RunPython(marcar_bajo_stock, migrations.RunPython.noop),
+    ]
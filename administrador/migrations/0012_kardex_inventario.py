@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def abrir_kardex(apps, schema_editor):
+    # El stock de cada producto existente es el saldo con el que empieza su kardex
+    Producto = apps.get_model('administrador', 'Producto')
+    MovimientoInventario = apps.get_model('administrador', 'MovimientoInventario')
+    productos = Producto.objects.filter(stock_actual__gt=0).values_list('pk', 'stock_actual').iterator()
+    MovimientoInventario.objects.bulk_create(
+        (MovimientoInventario(producto_id=producto_id, tipo='AJUSTE', cantidad=stock, motivo='Saldo inicial del kardex')
+         for producto_id, stock in productos),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0011_reabastecimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ENTRADA', 'Entrada'), ('SALIDA', 'Salida'), ('AJUSTE', 'Ajuste')], max_length=7, verbose_name='Tipo')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('motivo', models.CharField(blank=True, max_length=200, verbose_name='Motivo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('compra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_inventario', to='administrador.compra', verbose_name='Compra')),
+                ('orden_servicio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_inventario', to='administrador.ordenservicio', verbose_name='Orden de servicio')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='administrador.producto', verbose_name='Producto')),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_inventario', to='administrador.venta', verbose_name='Venta')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Inventario',
+                'verbose_name_plural': 'Movimientos de Inventario',
+                'db_table': 'movimientos_inventario',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='movimientos_producto_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha de corte')),
+                ('stock', models.IntegerField(verbose_name='Stock')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='administrador.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Inventario',
+                'verbose_name_plural': 'Saldos de Inventario',
+                'db_table': 'saldos_inventario',
+                'ordering': ['-fecha'],
+                'unique_together': {('producto', 'fecha')},
+            },
+        ),
+        migrations.RunPython(abrir_kardex, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0012_kardex_inventario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportejob',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último latido del worker'),
+        ),
+    ]
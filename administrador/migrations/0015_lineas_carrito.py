@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0014_indice_productos_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineaCarrito',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('carrito', models.CharField(max_length=64, verbose_name='Carrito')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='administrador.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Línea de Carrito',
+                'verbose_name_plural': 'Líneas de Carrito',
+                'db_table': 'lineas_carrito',
+                'indexes': [models.Index(fields=['fecha_actualizacion'], name='lineas_carrito_fecha_idx')],
+                'unique_together': {('carrito', 'producto')},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+ABIERTOS = ('PENDIENTE', 'EN_COMPRA')
+
+
+def encolar_bajo_stock(apps, schema_editor):
+    """
+    La migración 0011 marcó bajo_stock en los productos que ya estaban por debajo del mínimo,
+    pero sin encolarlos: revisar_stock solo encola al cruzar el mínimo, así que esos productos
+    nunca se habrían sugerido. Se les crea su sugerencia PENDIENTE y su notificación, como
+    lo hace reabastecimiento.encolar (copiado aquí para no depender del código vigente).
+    Después de esta migración, `generar_reabastecimiento --revisar` hace lo mismo a pedido.
+    """
+    Producto = apps.get_model('administrador', 'Producto')
+    ReabastecimientoSugerido = apps.get_model('administrador', 'ReabastecimientoSugerido')
+    Notificacion = apps.get_model('DigitSoft', 'Notificacion')
+    alias = schema_editor.connection.alias
+
+    con_sugerencia = ReabastecimientoSugerido.objects.using(alias).filter(
+        estado__in=ABIERTOS
+    ).values('producto_id')
+    productos = (
+        Producto.objects.using(alias).filter(bajo_stock=True).exclude(pk__in=con_sugerencia)
+        .select_related('proveedor_principal').order_by('pk')
+    )
+
+    sugerencias = []
+    notificaciones = []
+    for producto in productos.iterator(chunk_size=1000):
+        proveedor = producto.proveedor_principal
+        cantidad = max(producto.stock_maximo - producto.stock_actual, 1)
+        sugerencias.append(ReabastecimientoSugerido(
+            producto=producto, proveedor=proveedor, cantidad_sugerida=cantidad, stock_detectado=producto.stock_actual,
+        ))
+        notificaciones.append(Notificacion(
+            titulo=f'Stock bajo: {producto.nombre}',
+            mensaje=(
+                f'{producto.nombre} tiene {producto.stock_actual} unidades (mínimo {producto.stock_minimo}). '
+                f'Se sugiere pedir {cantidad} unidades'
+                + (f' a {proveedor.razon_social or proveedor.nombre_comercial}.' if proveedor else '; el producto no tiene proveedor principal.')
+            ),
+            tipo='WARNING',
+            categoria='INVENTARIO',
+            para_administradores=True,
+        ))
+    ReabastecimientoSugerido.objects.using(alias).bulk_create(sugerencias, batch_size=1000)
+    Notificacion.objects.using(alias).bulk_create(notificaciones, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0015_lineas_carrito'),
+        ('DigitSoft', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(encolar_bajo_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0016_sugerencias_bajo_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='cargado_en_almacen',
+            field=models.BooleanField(default=False, verbose_name='Cargado en el almacén'),
+        ),
+    ]
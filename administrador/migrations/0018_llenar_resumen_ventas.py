@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def llenar_resumen(apps, schema_editor):
+    """
+    La migración 0007 creó ventas_resumen_diario vacío y las señales solo acumulan las ventas
+    nuevas: sin este llenado las estadísticas y métricas mostrarían 0 para el historial. Hace
+    lo mismo que resumen_ventas.reconstruir_resumen sin rango (copiado aquí para no depender
+    del código vigente); se puede repetir porque reemplaza todas las filas.
+    """
+    Venta = apps.get_model('administrador', 'Venta')
+    VentaResumenDiario = apps.get_model('administrador', 'VentaResumenDiario')
+    alias = schema_editor.connection.alias
+
+    grupos = (
+        Venta.objects.using(alias).order_by()
+        .annotate(fecha=TruncDate('fecha_venta'))
+        .values('fecha', 'estado', 'metodo_pago')
+        .annotate(
+            cantidad_ventas=Count('id'),
+            total=Sum('total'),
+            impuestos=Sum('impuestos'),
+            descuento=Sum('descuento')
+        )
+    )
+    VentaResumenDiario.objects.using(alias).all().delete()
+    VentaResumenDiario.objects.using(alias).bulk_create(
+        [VentaResumenDiario(**grupo) for grupo in grupos.iterator()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0017_carrito_cargado_en_almacen'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_resumen, migrations.RunPython.noop),
+    ]
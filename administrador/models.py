@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.utils import timezone
@@ -326,6 +326,10 @@ class Producto(models.Model):
     stock_actual = models.PositiveIntegerField(default=0, verbose_name="Stock actual")
     stock_minimo = models.PositiveIntegerField(default=1, verbose_name="Stock mínimo")
     stock_maximo = models.PositiveIntegerField(default=100, verbose_name="Stock máximo")
+    # Unidades apartadas por carritos (ReservaStock); solo lo modifica el módulo de reservas
+    stock_reservado = models.PositiveIntegerField(default=0, editable=False, verbose_name="Stock reservado")
+    # stock_actual <= stock_minimo, mantenido por reabastecimiento.revisar_stock en cada cambio de stock
+    bajo_stock = models.BooleanField(default=False, editable=False, verbose_name="Stock bajo")
 
     unidad_medida = models.CharField(max_length=20, default='Unidad', verbose_name="Unidad de medida")
     ubicacion_almacen = models.CharField(max_length=100, blank=True, null=True, verbose_name="Ubicación en almacén")
@@ -352,6 +356,12 @@ class Producto(models.Model):
         verbose_name_plural = "Productos"
         ordering = ['nombre']
         db_table = 'productos'
+        indexes = [
+            # Índice parcial: solo contiene los pocos productos con stock bajo
+            models.Index(fields=['bajo_stock'], condition=models.Q(bajo_stock=True), name='productos_bajo_stock_idx'),
+            # Sincronización del autocompletado: productos cambiados desde un instante
+            models.Index(fields=['fecha_actualizacion'], name='productos_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return f"{self.codigo_producto} - {self.nombre}"
@@ -359,9 +369,8 @@ class Producto(models.Model):
     def save(self, *args, **kwargs):
         if not self.codigo_producto:
             # Generar código automático
-            fecha = timezone.now().strftime('%Y%m')
-            ultimo = Producto.objects.filter(codigo_producto__startswith=f'PRD{fecha}').count()
-            self.codigo_producto = f'PRD{fecha}{(ultimo + 1):04d}'
+            from .secuencias import generar_codigos
+            self.codigo_producto = generar_codigos('PRD', Producto, 'codigo_producto', '%Y%m')[0]
 
         # Calcular margen de ganancia
         if self.precio_compra and self.precio_venta:
@@ -373,18 +382,58 @@ class Producto(models.Model):
             from django.utils.text import slugify
             self.slug = slugify(self.nombre)
 
-        super().save(*args, **kwargs)
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            # El stock con el que se crea el producto es su primera entrada en el kardex
+            from .kardex import registrar_inicial
+            registrar_inicial(self)
+            self._stock_leido = self.stock_actual
+            return
+
+        # stock_actual, stock_reservado y bajo_stock cambian con UPDATE atómicos (kardex, reservas
+        # y reabastecimiento): un guardado con la copia en memoria no debe pisarlos
+        campos = kwargs.get('update_fields')
+        if campos is None:
+            campos = [campo.name for campo in self._meta.concrete_fields if not campo.primary_key]
+        kwargs['update_fields'] = [
+            campo for campo in campos if campo not in ('stock_actual', 'stock_reservado', 'bajo_stock')
+        ]
+
+        with transaction.atomic():
+            # Un stock editado se registra como ajuste por la diferencia con el que se leyó
+            if 'stock_actual' in campos and self.stock_actual != getattr(self, '_stock_leido', None):
+                from .kardex import ajustar
+                self.stock_actual = ajustar(self, getattr(self, '_stock_leido', None), self.stock_actual)
+                self._stock_leido = self.stock_actual
+                # Aunque solo cambie el stock, el guardado se hace (y emite sus señales)
+                kwargs['update_fields'] = kwargs['update_fields'] or ['fecha_actualizacion']
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._stock_leido = instancia.__dict__.get('stock_actual')
+        return instancia
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._stock_leido = self.__dict__.get('stock_actual')
 
     @property
     def precio_con_iva(self):
-        # IVA por defecto 19%
-        from decimal import Decimal
-        return self.precio_venta * Decimal('1.19')
+        # IVA de la configuración general
+        from .dinero import con_iva
+        return con_iva(self.precio_venta)
 
     @property
     def necesita_restock(self):
         return self.stock_actual <= self.stock_minimo
 
+    @property
+    def stock_disponible(self):
+        """Unidades que se pueden prometer: stock físico menos lo reservado por carritos"""
+        return max(self.stock_actual - self.stock_reservado, 0)
+
 
 # ========== EQUIPOS ========== #
 class Equipo(models.Model):
@@ -527,6 +576,9 @@ class OrdenServicio(models.Model):
         verbose_name_plural = "Órdenes de Servicio"
         ordering = ['-fecha_ingreso']
         db_table = 'ordenes_servicio'
+        indexes = [
+            models.Index(fields=['estado', 'fecha_ingreso']),
+        ]
 
     def __str__(self):
         return f"{self.numero_orden} - {self.cliente}"
@@ -587,6 +639,9 @@ class Compra(models.Model):
         verbose_name_plural = "Compras"
         ordering = ['-fecha_solicitud']
         db_table = 'compras'
+        indexes = [
+            models.Index(fields=['estado', 'fecha_solicitud']),
+        ]
 
     def __str__(self):
         return f"{self.numero_compra} - {self.proveedor}"
@@ -594,9 +649,8 @@ class Compra(models.Model):
     def save(self, *args, **kwargs):
         if not self.numero_compra:
             # Generar número de compra automático
-            fecha = timezone.now().strftime('%Y%m')
-            ultimo = Compra.objects.filter(numero_compra__startswith=f'C{fecha}').count()
-            self.numero_compra = f'C{fecha}{(ultimo + 1):04d}'
+            from .secuencias import generar_codigos
+            self.numero_compra = generar_codigos('C', Compra, 'numero_compra', '%Y%m')[0]
 
         # Calcular total
         self.total = self.subtotal - self.descuento + self.impuestos + self.costos_envio
@@ -612,6 +666,47 @@ class Compra(models.Model):
         return 0
 
 
+# ========== REABASTECIMIENTO ========== #
+class ReabastecimientoSugerido(models.Model):
+    """Producto que bajó de su stock mínimo, en cola para pedirlo a su proveedor (ver reabastecimiento.py)"""
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_COMPRA', 'En compra'),
+        ('ATENDIDO', 'Atendido'),
+        ('DESCARTADO', 'Descartado'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reabastecimientos', verbose_name="Producto")
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, blank=True, null=True, verbose_name="Proveedor")
+    cantidad_sugerida = models.PositiveIntegerField(verbose_name="Cantidad sugerida")
+    stock_detectado = models.PositiveIntegerField(verbose_name="Stock al detectarlo")
+
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='PENDIENTE', verbose_name="Estado")
+    compra = models.ForeignKey(Compra, on_delete=models.SET_NULL, blank=True, null=True, related_name='reabastecimientos', verbose_name="Compra")
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        verbose_name = "Reabastecimiento Sugerido"
+        verbose_name_plural = "Reabastecimientos Sugeridos"
+        ordering = ['-fecha_creacion']
+        db_table = 'reabastecimientos_sugeridos'
+        indexes = [
+            models.Index(fields=['estado', 'proveedor']),
+        ]
+        constraints = [
+            # Una sola sugerencia abierta por producto
+            models.UniqueConstraint(
+                fields=['producto'], condition=models.Q(estado__in=['PENDIENTE', 'EN_COMPRA']),
+                name='reabastecimiento_abierto_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.producto} x{self.cantidad_sugerida} ({self.get_estado_display()})"
+
+
 # ========== CARRITOS ========== #
 class Carrito(models.Model):
     ESTADO_CHOICES = [
@@ -631,6 +726,8 @@ class Carrito(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
     fecha_expiracion = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de expiración")
+    # Sus líneas ya se copiaron al almacén de carritos (ver almacen_carrito._cargar)
+    cargado_en_almacen = models.BooleanField(default=False, verbose_name="Cargado en el almacén")
 
     # Relación con venta si se convierte
     venta_generada = models.OneToOneField('Venta', on_delete=models.SET_NULL, blank=True, null=True, verbose_name="Venta generada")
@@ -642,23 +739,118 @@ class Carrito(models.Model):
         verbose_name_plural = "Carritos"
         ordering = ['-fecha_actualizacion']
         db_table = 'carritos'
+        indexes = [
+            # Barrido de carritos vencidos e inactivos (limpiar_carritos)
+            models.Index(fields=['estado', 'fecha_expiracion'], name='carritos_estado_expira_idx'),
+        ]
 
     def __str__(self):
         return f"Carrito {self.id} - {self.cliente} ({self.total_items} items)"
 
+    @staticmethod
+    def calcular_expiracion():
+        """Vencimiento de un carrito modificado ahora (CARRITO_EXPIRACION_DIAS, 7 por defecto)"""
+        from datetime import timedelta
+        from django.conf import settings
+        return timezone.now() + timedelta(days=getattr(settings, 'CARRITO_EXPIRACION_DIAS', 7))
+
     def save(self, *args, **kwargs):
-        # Establecer fecha de expiración si no existe (7 días por defecto)
+        # Establecer fecha de expiración si no existe
         if not self.fecha_expiracion:
-            from datetime import timedelta
-            self.fecha_expiracion = timezone.now() + timedelta(days=7)
+            self.fecha_expiracion = self.calcular_expiracion()
         super().save(*args, **kwargs)
 
+    def aplicar_delta(self, items, subtotal):
+        """
+        Suma a los totales el cambio de una o varias líneas con un UPDATE atómico. Cada cambio
+        también aplaza el vencimiento: fecha_expiracion cuenta desde la última modificación.
+        """
+        if not items and not subtotal:
+            return
+        Carrito.objects.filter(pk=self.pk).update(
+            total_items=models.F('total_items') + items,
+            subtotal=models.F('subtotal') + subtotal,
+            fecha_actualizacion=timezone.now(),
+            fecha_expiracion=self.calcular_expiracion()
+        )
+        self.refresh_from_db(fields=['total_items', 'subtotal', 'fecha_actualizacion', 'fecha_expiracion'])
+
+    def actualizar_lineas(self, cantidades, eliminar_faltantes=False):
+        """
+        Aplica muchos cambios de cantidad ({producto_id: cantidad}, 0 elimina la línea) en una
+        transacción: una consulta de lectura, un INSERT, un UPDATE y un DELETE por lote, y un
+        único ajuste de los totales. Con `eliminar_faltantes` se borran las líneas que no
+        estén en `cantidades`. Las líneas nuevas toman el precio de venta actual del producto.
+        """
+        from decimal import Decimal
+        from django.db import transaction
+
+        with transaction.atomic():
+            actuales = {
+                producto_id: (item_id, cantidad, precio)
+                for item_id, producto_id, cantidad, precio in self.items.values_list(
+                    'id', 'producto_id', 'cantidad', 'precio_unitario'
+                )
+            }
+            delta_items = 0
+            delta_subtotal = Decimal('0')
+
+            modificados = []
+            eliminados = []
+            for producto_id, (item_id, cantidad, precio) in actuales.items():
+                if producto_id in cantidades:
+                    nueva = max(cantidades[producto_id], 0)
+                elif eliminar_faltantes:
+                    nueva = 0
+                else:
+                    continue
+                if nueva == cantidad:
+                    continue
+                delta_items += nueva - cantidad
+                delta_subtotal += (nueva - cantidad) * precio
+                if nueva:
+                    modificados.append(ItemCarrito(id=item_id, cantidad=nueva))
+                else:
+                    eliminados.append(item_id)
+
+            nuevos = [
+                producto_id for producto_id, cantidad in cantidades.items()
+                if producto_id not in actuales and cantidad > 0
+            ]
+            precios = dict(
+                Producto.objects.filter(pk__in=nuevos).values_list('pk', 'precio_venta')
+            ) if nuevos else {}
+            creados = [
+                ItemCarrito(carrito=self, producto_id=producto_id, cantidad=cantidades[producto_id],
+                            precio_unitario=precios[producto_id])
+                for producto_id in nuevos if producto_id in precios
+            ]
+            for item in creados:
+                delta_items += item.cantidad
+                delta_subtotal += item.cantidad * item.precio_unitario
+
+            if eliminados:
+                ItemCarrito.objects.filter(pk__in=eliminados).delete()
+            if modificados:
+                ItemCarrito.objects.bulk_update(modificados, ['cantidad'], batch_size=500)
+            if creados:
+                ItemCarrito.objects.bulk_create(creados, batch_size=500)
+            self.aplicar_delta(delta_items, delta_subtotal)
+
     def actualizar_totales(self):
-        """Actualizar totales del carrito basado en los items"""
-        items = self.items.all()
-        self.total_items = sum(item.cantidad for item in items)
-        self.subtotal = sum(item.subtotal for item in items)
-        self.save()
+        """Recalcula los totales desde los items en la base de datos (repara diferencias)"""
+        from django.db.models import DecimalField, ExpressionWrapper, Sum
+
+        totales = self.items.aggregate(
+            total_items=Sum('cantidad'),
+            subtotal=Sum(ExpressionWrapper(
+                models.F('cantidad') * models.F('precio_unitario'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ))
+        )
+        self.total_items = totales['total_items'] or 0
+        self.subtotal = totales['subtotal'] or 0
+        Carrito.objects.filter(pk=self.pk).update(total_items=self.total_items, subtotal=self.subtotal)
 
 
 # ========== ITEMS DEL CARRITO ========== #
@@ -680,12 +872,84 @@ class ItemCarrito(models.Model):
     def __str__(self):
         return f"{self.producto.nombre} x{self.cantidad} - Carrito #{self.carrito.id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        item._guardado = (item.__dict__.get('cantidad'), item.__dict__.get('precio_unitario'))
+        return item
+
+    def save(self, *args, **kwargs):
+        # Los totales del carrito se ajustan con la diferencia de esta línea, sin recorrer las demás
+        anterior = getattr(self, '_guardado', None)
+        if anterior is None or None in anterior:
+            anterior = self.pk and ItemCarrito.objects.filter(pk=self.pk).values_list(
+                'cantidad', 'precio_unitario'
+            ).first()
+        cantidad_anterior, precio_anterior = anterior or (0, 0)
+        super().save(*args, **kwargs)
+        self.carrito.aplicar_delta(
+            self.cantidad - cantidad_anterior,
+            self.subtotal - cantidad_anterior * precio_anterior
+        )
+        self._guardado = (self.cantidad, self.precio_unitario)
+
+    def delete(self, *args, **kwargs):
+        carrito = self.carrito
+        cantidad, precio = getattr(self, '_guardado', (self.cantidad, self.precio_unitario))
+        resultado = super().delete(*args, **kwargs)
+        carrito.aplicar_delta(-cantidad, -cantidad * precio)
+        return resultado
+
     @property
     def subtotal(self):
         """Calcula el subtotal del item"""
         return self.precio_unitario * self.cantidad
 
 
+class LineaCarrito(models.Model):
+    """Línea de un carrito de la tienda en el almacén de base de datos (ver almacen_carrito.AlmacenBaseDatos)"""
+    carrito = models.CharField(max_length=64, verbose_name="Carrito")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, verbose_name="Producto")
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        verbose_name = "Línea de Carrito"
+        verbose_name_plural = "Líneas de Carrito"
+        db_table = 'lineas_carrito'
+        unique_together = ['carrito', 'producto']
+        indexes = [
+            models.Index(fields=['fecha_actualizacion'], name='lineas_carrito_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} x{self.cantidad} - Carrito {self.carrito}"
+
+
+# ========== RESERVAS DE STOCK ========== #
+class ReservaStock(models.Model):
+    """Unidades apartadas por una línea de carrito hasta fecha_expiracion (ver reservas.py)"""
+    carrito = models.CharField(max_length=64, verbose_name="Carrito")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reservas', verbose_name="Producto")
+    cantidad = models.PositiveIntegerField(verbose_name="Cantidad")
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_expiracion = models.DateTimeField(verbose_name="Fecha de expiración")
+
+    class Meta:
+        verbose_name = "Reserva de Stock"
+        verbose_name_plural = "Reservas de Stock"
+        db_table = 'reservas_stock'
+        unique_together = ['carrito', 'producto']
+        indexes = [
+            models.Index(fields=['fecha_expiracion'], name='reservas_expiracion_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} x{self.cantidad} - Carrito {self.carrito}"
+
+
 # ========== VENTAS ========== #
 class Venta(models.Model):
     ESTADO_CHOICES = [
@@ -728,11 +992,87 @@ class Venta(models.Model):
         verbose_name_plural = "Ventas"
         ordering = ['-fecha_venta']
         db_table = 'ventas'
+        indexes = [
+            models.Index(fields=['fecha_venta', 'estado']),
+        ]
 
     def __str__(self):
         return f"{self.numero_venta} - {self.cliente}"
 
 
+class VentaResumenDiario(models.Model):
+    """Totales de ventas por día, estado y método de pago (se actualiza con cada venta)"""
+    fecha = models.DateField(verbose_name="Fecha")
+    estado = models.CharField(max_length=10, choices=Venta.ESTADO_CHOICES, verbose_name="Estado")
+    metodo_pago = models.CharField(max_length=15, choices=Venta.METODO_PAGO_CHOICES, verbose_name="Método de pago")
+
+    cantidad_ventas = models.IntegerField(default=0, verbose_name="Cantidad de ventas")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total")
+    impuestos = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Impuestos")
+    descuento = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Descuento")
+
+    class Meta:
+        verbose_name = "Resumen Diario de Ventas"
+        verbose_name_plural = "Resúmenes Diarios de Ventas"
+        ordering = ['-fecha']
+        db_table = 'ventas_resumen_diario'
+        unique_together = ['fecha', 'estado', 'metodo_pago']
+
+    def __str__(self):
+        return f"{self.fecha} - {self.estado} - {self.metodo_pago}"
+
+
+# ========== KARDEX DE INVENTARIO ========== #
+class MovimientoInventario(models.Model):
+    """Cada cambio de Producto.stock_actual, con su origen; solo se insertan (ver kardex.py)"""
+    TIPO_CHOICES = [
+        ('ENTRADA', 'Entrada'),
+        ('SALIDA', 'Salida'),
+        ('AJUSTE', 'Ajuste'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos', verbose_name="Producto")
+    tipo = models.CharField(max_length=7, choices=TIPO_CHOICES, verbose_name="Tipo")
+    # Con signo: las salidas son negativas, así el stock es la suma de los movimientos
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+    motivo = models.CharField(max_length=200, blank=True, verbose_name="Motivo")
+
+    venta = models.ForeignKey(Venta, on_delete=models.SET_NULL, blank=True, null=True, related_name='movimientos_inventario', verbose_name="Venta")
+    compra = models.ForeignKey(Compra, on_delete=models.SET_NULL, blank=True, null=True, related_name='movimientos_inventario', verbose_name="Compra")
+    orden_servicio = models.ForeignKey(OrdenServicio, on_delete=models.SET_NULL, blank=True, null=True, related_name='movimientos_inventario', verbose_name="Orden de servicio")
+
+    fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Movimiento de Inventario"
+        verbose_name_plural = "Movimientos de Inventario"
+        ordering = ['-fecha']
+        db_table = 'movimientos_inventario'
+        indexes = [
+            models.Index(fields=['producto', 'fecha'], name='movimientos_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.tipo} {self.cantidad:+d} - {self.fecha:%Y-%m-%d %H:%M}"
+
+
+class SaldoInventario(models.Model):
+    """Stock de un producto según el kardex en un corte (cerrar_kardex): punto de partida de las consultas históricas"""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='saldos', verbose_name="Producto")
+    fecha = models.DateTimeField(verbose_name="Fecha de corte")
+    stock = models.IntegerField(verbose_name="Stock")
+
+    class Meta:
+        verbose_name = "Saldo de Inventario"
+        verbose_name_plural = "Saldos de Inventario"
+        ordering = ['-fecha']
+        db_table = 'saldos_inventario'
+        unique_together = ['producto', 'fecha']
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.stock} al {self.fecha:%Y-%m-%d %H:%M}"
+
+
 # ========== GARANTÍAS ========== #
 class Garantia(models.Model):
     ESTADO_CHOICES = [
@@ -913,3 +1253,80 @@ class ConfiguracionGeneral(models.Model):
         if self.activa:
             ConfiguracionGeneral.objects.exclude(pk=self.pk).update(activa=False)
         super().save(*args, **kwargs)
+
+
+# ========== SECUENCIAS DE NUMERACIÓN ========== #
+class SecuenciaDocumento(models.Model):
+    """Contador por prefijo y periodo usado para numerar documentos sin escanear tablas"""
+    prefijo = models.CharField(max_length=10, verbose_name="Prefijo")
+    periodo = models.CharField(max_length=8, blank=True, default='', verbose_name="Periodo")
+    ultimo_valor = models.PositiveBigIntegerField(default=0, verbose_name="Último valor asignado")
+
+    class Meta:
+        verbose_name = "Secuencia de Documento"
+        verbose_name_plural = "Secuencias de Documentos"
+        db_table = 'secuencias_documento'
+        unique_together = ['prefijo', 'periodo']
+
+    def __str__(self):
+        return f"{self.prefijo}{self.periodo} - {self.ultimo_valor}"
+
+
+# ========== VERSIONES DE CACHÉ ========== #
+class VersionCache(models.Model):
+    """Sello de versión compartido por todos los procesos para una caché invalidada por versión"""
+    nombre = models.CharField(max_length=50, unique=True, verbose_name="Nombre")
+    sello = models.PositiveBigIntegerField(default=0, verbose_name="Sello (ns desde epoch)")
+
+    class Meta:
+        verbose_name = "Versión de Caché"
+        verbose_name_plural = "Versiones de Caché"
+        db_table = 'versiones_cache'
+
+    def __str__(self):
+        return f"{self.nombre} - {self.sello}"
+
+
+# ========== REPORTES EN SEGUNDO PLANO ========== #
+class ReporteJob(models.Model):
+    """Solicitud de un reporte que se genera fuera del request por el worker de reportes"""
+    TIPO_CHOICES = [
+        ('VENTAS', 'Ventas'),
+        ('SERVICIOS', 'Servicios Técnicos'),
+        ('COMPRAS', 'Compras'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=12, choices=TIPO_CHOICES, verbose_name="Tipo de reporte")
+    fecha_inicio = models.DateField(blank=True, null=True, verbose_name="Desde")
+    fecha_fin = models.DateField(blank=True, null=True, verbose_name="Hasta")
+
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='PENDIENTE', verbose_name="Estado")
+    archivo = models.FileField(upload_to='reportes/', blank=True, null=True, verbose_name="Archivo generado")
+    mensaje_error = models.TextField(blank=True, null=True, verbose_name="Mensaje de error")
+
+    solicitado_por = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, verbose_name="Solicitado por")
+    fecha_solicitud = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de solicitud")
+    fecha_inicio_proceso = models.DateTimeField(blank=True, null=True, verbose_name="Inicio del proceso")
+    # El worker la renueva mientras genera el archivo; si deja de hacerlo, otro puede retomar el reporte
+    fecha_latido = models.DateTimeField(blank=True, null=True, verbose_name="Último latido del worker")
+    fecha_finalizacion = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de finalización")
+
+    class Meta:
+        verbose_name = "Reporte en Segundo Plano"
+        verbose_name_plural = "Reportes en Segundo Plano"
+        ordering = ['-fecha_solicitud']
+        db_table = 'reportes_jobs'
+        indexes = [
+            models.Index(fields=['tipo', 'fecha_inicio', 'fecha_fin', 'estado']),
+            models.Index(fields=['estado', 'fecha_solicitud']),
+        ]
+
+    def __str__(self):
+        return f"Reporte {self.get_tipo_display()} #{self.id} - {self.get_estado_display()}"
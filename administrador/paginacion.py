@@ -0,0 +1,233 @@
+"""
+Módulo de Paginación - Digit Soft
+Paginación por cursor (keyset) para los listados del panel de administración
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+
+
+TAMANO_PAGINA = 25
+TAMANO_PAGINA_MAXIMO = 100
+
+# Por encima de este número de filas el total se muestra como "más de N"
+TOPE_CONTEO = 10000
+
+
+class Pagina:
+    """Una página de resultados con los enlaces a la anterior y a la siguiente"""
+
+    def __init__(self, objetos, tamano, total, total_exacto, url_anterior, url_siguiente):
+        self.objetos = objetos
+        self.tamano = tamano
+        self.total = total
+        self.total_exacto = total_exacto
+        self.url_anterior = url_anterior
+        self.url_siguiente = url_siguiente
+
+    @property
+    def total_texto(self):
+        """Total para mostrar: exacto, "más de N" o aproximado según cómo se obtuvo"""
+        if self.total_exacto:
+            return str(self.total)
+        if self.total == TOPE_CONTEO + 1:
+            return f'más de {TOPE_CONTEO}'
+        return f'aprox. {self.total}'
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+# ========== ORDEN Y CURSORES ========== #
+
+def _columnas_orden(queryset):
+    """
+    Columnas del orden del listado como [(campo, descendente)], terminando en la clave primaria
+    para que el orden sea total aunque haya valores repetidos.
+    """
+    orden = queryset.query.order_by or queryset.model._meta.ordering
+    columnas = []
+    for campo in orden:
+        if not isinstance(campo, str) or '__' in campo or campo.lstrip('-') == '?':
+            raise ValueError(f'La paginación por cursor no admite el orden "{campo}"')
+        descendente = campo.startswith('-')
+        nombre = campo.lstrip('-')
+        if nombre == 'pk':
+            nombre = queryset.model._meta.pk.name
+        columnas.append((nombre, descendente))
+
+    pk = queryset.model._meta.pk.name
+    if pk not in [nombre for nombre, _ in columnas]:
+        columnas.append((pk, columnas[-1][1] if columnas else False))
+    return columnas
+
+
+def _ordenar(queryset, columnas, invertir=False):
+    """
+    Ordena explícitamente: ascendente con nulos primero y descendente con nulos al final
+    (el comportamiento por defecto de SQLite y MySQL, forzado en cualquier motor).
+    """
+    expresiones = []
+    for campo, descendente in columnas:
+        if descendente != invertir:
+            expresiones.append(F(campo).desc(nulls_last=True))
+        else:
+            expresiones.append(F(campo).asc(nulls_first=True))
+    return queryset.order_by(*expresiones)
+
+
+def _despues_de(columnas, valores, invertir=False):
+    """Condición (a, b, c) > (x, y, z) según el orden de cada columna, teniendo en cuenta nulos"""
+    condicion = Q(pk__in=[])
+    iguales = Q()
+    for (campo, descendente), valor in zip(columnas, valores):
+        if descendente != invertir:
+            # Descendente, nulos al final: siguen los valores menores y luego los nulos
+            if valor is None:
+                siguiente = Q(pk__in=[])
+            else:
+                siguiente = Q(**{f'{campo}__lt': valor}) | Q(**{f'{campo}__isnull': True})
+        else:
+            # Ascendente, nulos primero: después de un nulo viene cualquier valor
+            if valor is None:
+                siguiente = Q(**{f'{campo}__isnull': False})
+            else:
+                siguiente = Q(**{f'{campo}__gt': valor})
+
+        condicion |= iguales & siguiente
+        igual = Q(**{f'{campo}__isnull': True}) if valor is None else Q(**{campo: valor})
+        iguales &= igual
+    return condicion
+
+
+def _codificar_cursor(objeto, columnas):
+    valores = [getattr(objeto, campo) for campo, _ in columnas]
+    texto = json.dumps(
+        [valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores],
+        default=str
+    )
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, modelo, columnas):
+    """Valores del cursor convertidos al tipo de cada campo; None si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if len(valores) != len(columnas):
+            return None
+        return [
+            None if valor is None else modelo._meta.get_field(campo).to_python(valor)
+            for (campo, _), valor in zip(columnas, valores)
+        ]
+    except Exception:
+        return None
+
+
+# ========== TOTAL ESTIMADO ========== #
+
+def _estimacion_del_motor(modelo):
+    """Filas de la tabla según las estadísticas del motor, sin recorrerla (si están disponibles)"""
+    tabla = modelo._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [tabla])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 solo existe después de ejecutar ANALYZE; el primer número de
+            # cada fila es la cantidad (aproximada) de filas de la tabla
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+        else:
+            return None
+        fila = cursor.fetchone()
+
+    if not fila or fila[0] is None:
+        return None
+    total = int(str(fila[0]).split()[0])
+    return total if total >= 0 else None
+
+
+def total_estimado(queryset):
+    """
+    Total de filas del listado sin un COUNT(*) completo en cada visita: se usan las
+    estadísticas del motor si la consulta no tiene filtros y, si no, un conteo limitado
+    a TOPE_CONTEO + 1 filas que se guarda en caché. Retorna (total, es_exacto).
+    """
+    sql, parametros = queryset.order_by().query.sql_with_params()
+    clave = 'administrador:paginacion:total:' + hashlib.md5(
+        f'{sql}|{parametros}'.encode()
+    ).hexdigest()
+
+    resultado = cache.get(clave)
+    if resultado is None:
+        total = _estimacion_del_motor(queryset.model) if not queryset.query.where else None
+        if total is not None and total > TOPE_CONTEO:
+            resultado = (total, False)
+        else:
+            total = queryset.order_by()[:TOPE_CONTEO + 1].count()
+            resultado = (total, total <= TOPE_CONTEO)
+        cache.set(clave, resultado, getattr(settings, 'PAGINACION_CACHE_TOTAL_SEGUNDOS', 300))
+    return resultado
+
+
+# ========== PAGINACIÓN ========== #
+
+def _url(request, **parametros):
+    consulta = request.GET.copy()
+    for parametro in ('despues', 'antes'):
+        consulta.pop(parametro, None)
+    consulta.update(parametros)
+    return f'?{consulta.urlencode()}'
+
+
+def paginar(request, queryset, tamano=TAMANO_PAGINA):
+    """
+    Retorna la página pedida en `?despues=<cursor>` o `?antes=<cursor>`.
+
+    En lugar de OFFSET se filtra por los valores de la última fila vista (columnas del
+    Meta.ordering del modelo o del order_by del queryset), así cada página cuesta lo
+    mismo sin importar cuántas filas haya antes. `?por_pagina=` admite hasta
+    TAMANO_PAGINA_MAXIMO filas.
+    """
+    try:
+        tamano = int(request.GET.get('por_pagina', tamano))
+    except ValueError:
+        pass
+    tamano = max(1, min(tamano, TAMANO_PAGINA_MAXIMO))
+
+    columnas = _columnas_orden(queryset)
+    hacia_atras = 'antes' in request.GET and 'despues' not in request.GET
+    cursor = request.GET.get('antes' if hacia_atras else 'despues')
+    valores = _decodificar_cursor(cursor, queryset.model, columnas) if cursor else None
+    if valores is None:
+        hacia_atras = False
+
+    pagina = _ordenar(queryset, columnas, invertir=hacia_atras)
+    if valores is not None:
+        pagina = pagina.filter(_despues_de(columnas, valores, invertir=hacia_atras))
+
+    # Una fila extra indica si hay más resultados en la dirección de avance
+    objetos = list(pagina[:tamano + 1])
+    hay_mas = len(objetos) > tamano
+    objetos = objetos[:tamano]
+    if hacia_atras:
+        objetos.reverse()
+
+    url_anterior = url_siguiente = None
+    if objetos:
+        if (hacia_atras and hay_mas) or (not hacia_atras and valores is not None):
+            url_anterior = _url(request, antes=_codificar_cursor(objetos[0], columnas))
+        if (not hacia_atras and hay_mas) or hacia_atras:
+            url_siguiente = _url(request, despues=_codificar_cursor(objetos[-1], columnas))
+
+    return Pagina(objetos, tamano, *total_estimado(queryset), url_anterior, url_siguiente)
@@ -0,0 +1,193 @@
+"""
+Módulo de Reabastecimiento - Digit Soft
+Marca los productos que bajan de su stock mínimo (Producto.bajo_stock) al cambiar su stock,
+los encola como ReabastecimientoSugerido con una notificación y agrupa la cola en compras
+por proveedor; al recibir la compra sus unidades entran al kardex. Solo se revisan los
+productos que cambiaron, nunca todo el inventario.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .dinero import a_decimal, a_centavos, impuesto
+from .kardex import registrar
+from .models import Compra, Producto, ReabastecimientoSugerido
+
+
+ABIERTOS = ('PENDIENTE', 'EN_COMPRA')
+
+
+def _cantidad_sugerida(stock_actual, stock_maximo):
+    """Unidades para volver al stock máximo (al menos una)"""
+    return max(stock_maximo - stock_actual, 1)
+
+
+def revisar_stock(producto_ids):
+    """
+    Llamar después de cambiar el stock (o el mínimo) de estos productos: actualiza bajo_stock,
+    encola los que acaban de bajar del mínimo y cierra las sugerencias pendientes de los que se
+    repusieron. Las que ya van en una compra siguen abiertas hasta recibirla o cancelarla.
+    Sin cambios de estado cuesta una consulta.
+    """
+    filas = Producto.objects.filter(pk__in=set(producto_ids)).values_list(
+        'pk', 'bajo_stock', 'stock_actual', 'stock_minimo'
+    )
+    nuevos = []
+    repuestos = []
+    for producto_id, bajo_stock, stock_actual, stock_minimo in filas:
+        if not bajo_stock and stock_actual <= stock_minimo:
+            nuevos.append(producto_id)
+        elif bajo_stock and stock_actual > stock_minimo:
+            repuestos.append(producto_id)
+
+    # El UPDATE condicional decide quién registra el cambio si dos transacciones lo detectan a la vez
+    marcados = [
+        producto_id for producto_id in nuevos
+        if Producto.objects.filter(pk=producto_id, bajo_stock=False).update(bajo_stock=True)
+    ]
+    if marcados:
+        encolar(marcados)
+    if repuestos:
+        Producto.objects.filter(pk__in=repuestos).update(bajo_stock=False)
+        # Cerrar las EN_COMPRA dejaría sus unidades fuera del kardex al recibir la compra
+        ReabastecimientoSugerido.objects.filter(producto_id__in=repuestos, estado='PENDIENTE').update(
+            estado='ATENDIDO'
+        )
+
+
+def encolar(producto_ids):
+    """
+    Crea la sugerencia de reabastecimiento y la notificación de cada producto que no tenga
+    ya una abierta. Retorna las sugerencias creadas.
+    """
+    from DigitSoft.models import Notificacion
+
+    con_sugerencia = set(
+        ReabastecimientoSugerido.objects.filter(producto_id__in=producto_ids, estado__in=ABIERTOS)
+        .values_list('producto_id', flat=True)
+    )
+    productos = list(
+        Producto.objects.filter(pk__in=producto_ids).exclude(pk__in=con_sugerencia)
+        .select_related('proveedor_principal')
+        .only('nombre', 'stock_actual', 'stock_minimo', 'stock_maximo', 'proveedor_principal')
+    )
+    if not productos:
+        return []
+
+    with transaction.atomic():
+        sugerencias = ReabastecimientoSugerido.objects.bulk_create([
+            ReabastecimientoSugerido(
+                producto=producto,
+                proveedor=producto.proveedor_principal,
+                cantidad_sugerida=_cantidad_sugerida(producto.stock_actual, producto.stock_maximo),
+                stock_detectado=producto.stock_actual,
+            )
+            for producto in productos
+        ])
+        Notificacion.objects.bulk_create([
+            Notificacion(
+                titulo=f'Stock bajo: {sugerencia.producto.nombre}',
+                mensaje=(
+                    f'{sugerencia.producto.nombre} tiene {sugerencia.stock_detectado} unidades '
+                    f'(mínimo {sugerencia.producto.stock_minimo}). Se sugiere pedir '
+                    f'{sugerencia.cantidad_sugerida} unidades'
+                    + (f' a {sugerencia.proveedor}.' if sugerencia.proveedor else
+                       '; el producto no tiene proveedor principal.')
+                ),
+                tipo='WARNING',
+                categoria='INVENTARIO',
+                para_administradores=True,
+            )
+            for sugerencia in sugerencias
+        ])
+    return sugerencias
+
+
+def generar_compras():
+    """
+    Agrupa las sugerencias pendientes por proveedor en compras en estado SOLICITUD (una por
+    proveedor), con las cantidades recalculadas con el stock actual. Las sugerencias de
+    productos sin proveedor quedan pendientes. Retorna las compras creadas.
+    """
+    with transaction.atomic():
+        # Dos ejecuciones simultáneas no toman las mismas sugerencias
+        pendientes = (
+            ReabastecimientoSugerido.objects.filter(estado='PENDIENTE', proveedor__isnull=False)
+            .select_related('producto').select_for_update(skip_locked=True, of=('self',))
+            .order_by('proveedor_id', 'pk')
+        )
+        por_proveedor = {}
+        for sugerencia in pendientes:
+            por_proveedor.setdefault(sugerencia.proveedor_id, []).append(sugerencia)
+        return [_crear_compra(proveedor_id, sugerencias) for proveedor_id, sugerencias in por_proveedor.items()]
+
+
+def _crear_compra(proveedor_id, sugerencias):
+    """Una compra en SOLICITUD con las sugerencias de un proveedor, que pasan a EN_COMPRA"""
+    for sugerencia in sugerencias:
+        sugerencia.cantidad_sugerida = _cantidad_sugerida(
+            sugerencia.producto.stock_actual, sugerencia.producto.stock_maximo
+        )
+    subtotal = sum(
+        a_centavos(sugerencia.producto.precio_compra) * sugerencia.cantidad_sugerida
+        for sugerencia in sugerencias
+    )
+    detalle = '\n'.join(
+        f'- {sugerencia.producto.codigo_producto} {sugerencia.producto.nombre}: '
+        f'{sugerencia.cantidad_sugerida} unidades'
+        for sugerencia in sugerencias
+    )
+
+    compra = Compra.objects.create(
+        proveedor_id=proveedor_id,
+        estado='SOLICITUD',
+        # Los valores por defecto del modelo son float: se pasan todos los montos como Decimal
+        subtotal=a_decimal(subtotal),
+        descuento=a_decimal(0),
+        impuestos=a_decimal(impuesto(subtotal)),
+        costos_envio=a_decimal(0),
+        observaciones=f'Reabastecimiento sugerido por stock bajo:\n{detalle}',
+    )
+    ahora = timezone.now()
+    for sugerencia in sugerencias:
+        sugerencia.estado = 'EN_COMPRA'
+        sugerencia.compra = compra
+        sugerencia.fecha_actualizacion = ahora
+    ReabastecimientoSugerido.objects.bulk_update(
+        sugerencias, ['estado', 'compra', 'cantidad_sugerida', 'fecha_actualizacion']
+    )
+    return compra
+
+
+def compra_cancelada(compra):
+    """
+    Las sugerencias de una compra cancelada vuelven a la cola, salvo las de productos que
+    ya se repusieron mientras tanto, que quedan atendidas
+    """
+    sugerencias = ReabastecimientoSugerido.objects.filter(compra=compra, estado='EN_COMPRA')
+    sugerencias.filter(producto__bajo_stock=False).update(estado='ATENDIDO', compra=None)
+    sugerencias.update(estado='PENDIENTE', compra=None)
+
+
+def compra_recibida(compra):
+    """
+    Al recibir completa una compra de reabastecimiento, las cantidades de sus sugerencias
+    entran al inventario como movimientos del kardex y las sugerencias quedan atendidas
+    """
+    from .cache_catalogo import invalidar_catalogo
+
+    with transaction.atomic():
+        sugerencias = list(
+            ReabastecimientoSugerido.objects.select_for_update().filter(compra=compra, estado='EN_COMPRA')
+        )
+        if not sugerencias:
+            return
+        for sugerencia in sugerencias:
+            registrar(
+                sugerencia.producto_id, sugerencia.cantidad_sugerida, 'ENTRADA',
+                f'Compra {compra.numero_compra}', compra=compra
+            )
+        ReabastecimientoSugerido.objects.filter(pk__in=[sugerencia.pk for sugerencia in sugerencias]).update(
+            estado='ATENDIDO', fecha_actualizacion=timezone.now()
+        )
+        revisar_stock([sugerencia.producto_id for sugerencia in sugerencias])
+        transaction.on_commit(invalidar_catalogo)
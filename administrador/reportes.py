@@ -2,34 +2,153 @@
 Módulo de Reportes - Digit Soft
 Sistema de generación de reportes en PDF y Excel
 """
-from django.http import HttpResponse
-from django.db.models import Sum, Count, Avg, Q
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Sum, Count, Avg, Q, F, DecimalField
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date
+from datetime import date, datetime, time, timedelta
 import csv
+import os
+import time as time_module
+import zipfile
+from xml.sax.saxutils import escape
 from .models import (
     Cliente, Producto, Venta, Compra, OrdenServicio,
-    Equipo, Tecnico, Proveedor, Factura
+    Equipo, Tecnico, Proveedor, Factura, ReporteJob
 )
+from .dinero import en_centavos, formatear
 
 
-# ========== REPORTES EN CSV/EXCEL ========== #
+# ========== MOTOR DE REPORTES EN STREAMING ========== #
 
-def generar_reporte_ventas_csv(request):
-    """Genera reporte de ventas en formato CSV"""
-    # Obtener parámetros de filtro
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+# Filas que se leen de la base de datos (y se envían al cliente) por lote
+TAMANO_LOTE = 2000
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: retorna la fila formateada en vez de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _contenido_csv(encabezados, filas):
+    """Genera el CSV por bloques de texto, empezando por el BOM y los encabezados"""
+    writer = csv.writer(_Eco())
+
+    yield '\ufeff'  # BOM para Excel
+    yield writer.writerow(encabezados)
+
+    lote = []
+    for fila in filas:
+        lote.append(writer.writerow(fila))
+        if len(lote) >= TAMANO_LOTE:
+            yield ''.join(lote)
+            lote = []
+    if lote:
+        yield ''.join(lote)
+
+
+def _respuesta_csv(nombre_reporte, encabezados, filas):
+    """
+    Crea una respuesta CSV que se genera mientras se envía: la memoria se mantiene
+    constante sin importar el número de filas y el primer byte sale de inmediato.
+    """
+    response = StreamingHttpResponse(_contenido_csv(encabezados, filas), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_reporte}_{timezone.now().strftime("%Y%m%d")}.csv"'
+    return response
+
+
+def _nombre_cliente(tipo_cliente, razon_social, nombres, apellidos):
+    """Equivalente a Cliente.nombre_completo a partir de columnas sueltas"""
+    if tipo_cliente == 'JURIDICA':
+        return razon_social
+    return f"{nombres} {apellidos or ''}".strip()
+
+
+def _moneda(valor):
+    return f'${valor:,.2f}'
 
-    # Crear respuesta HTTP con CSV
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="reporte_ventas_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff'.encode('utf-8'))  # BOM para Excel
 
-    writer = csv.writer(response)
+# ========== RANGOS DE FECHAS ========== #
 
-    # Encabezados
-    writer.writerow([
+def _como_instante(valor, dia_siguiente=False):
+    """Convierte una fecha (date o 'AAAA-MM-DD') en el inicio de ese día; los datetime no cambian"""
+    if isinstance(valor, str):
+        valor = parse_date(valor) or valor
+    if isinstance(valor, datetime) or not isinstance(valor, date):
+        return valor
+    if dia_siguiente:
+        valor += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(valor, time.min))
+
+
+def filtro_rango_fechas(campo, fecha_inicio=None, fecha_fin=None):
+    """
+    Filtros de rango semiabierto [inicio, fin) sobre un campo de fecha y hora.
+
+    Con fechas, `fecha_fin` incluye el día completo. La columna se compara sin
+    envolverla en funciones (como __month o __date) para que se usen los índices.
+    """
+    filtros = {}
+    if fecha_inicio:
+        filtros[f'{campo}__gte'] = _como_instante(fecha_inicio)
+    if fecha_fin:
+        filtros[f'{campo}__lt'] = _como_instante(fecha_fin, dia_siguiente=True)
+    return filtros
+
+
+def rango_mes(fecha=None):
+    """Inicio del mes de `fecha` (hoy por defecto) e inicio del mes siguiente"""
+    fecha = fecha or timezone.localdate()
+    inicio = fecha.replace(day=1)
+    siguiente = (inicio + timedelta(days=32)).replace(day=1)
+    return _como_instante(inicio), _como_instante(siguiente)
+
+
+# ========== REPORTES EN CSV/EXCEL ========== #
+
+def construir_reporte_ventas(fecha_inicio=None, fecha_fin=None):
+    """Define el reporte de ventas: nombre, encabezados y generador de filas"""
+    # Filtrar ventas
+    ventas = Venta.objects.all()
+
+    ventas = ventas.filter(**filtro_rango_fechas('fecha_venta', fecha_inicio, fecha_fin))
+
+    metodos_pago = dict(Venta.METODO_PAGO_CHOICES)
+    estados = dict(Venta.ESTADO_CHOICES)
+
+    def filas():
+        columnas = ventas.values_list(
+            'numero_venta', 'fecha_venta',
+            'cliente__tipo_cliente', 'cliente__razon_social', 'cliente__nombres', 'cliente__apellidos',
+            'vendedor__nombres', 'vendedor__apellidos',
+            'subtotal', 'descuento', 'impuestos', 'total', 'metodo_pago', 'estado'
+        )
+        for (numero, fecha, tipo_cliente, razon_social, nombres, apellidos,
+             vendedor_nombres, vendedor_apellidos,
+             subtotal, descuento, impuestos, total, metodo_pago, estado) in columnas.iterator(chunk_size=TAMANO_LOTE):
+            yield [
+                numero,
+                fecha.strftime('%d/%m/%Y %H:%M'),
+                _nombre_cliente(tipo_cliente, razon_social, nombres, apellidos),
+                f'{vendedor_nombres} {vendedor_apellidos}' if vendedor_nombres is not None else 'N/A',
+                _moneda(subtotal),
+                _moneda(descuento),
+                _moneda(impuestos),
+                _moneda(total),
+                metodos_pago.get(metodo_pago, metodo_pago),
+                estados.get(estado, estado)
+            ]
+
+        # Total general
+        total_ventas = obtener_estadisticas_ventas(fecha_inicio, fecha_fin)['total_ingresos'] or 0
+        yield []
+        yield ['TOTAL GENERAL', '', '', '', '', '', '', _moneda(total_ventas), '', '']
+
+    return ('reporte_ventas', [
         'Número Venta',
         'Fecha',
         'Cliente',
@@ -40,50 +159,52 @@ def generar_reporte_ventas_csv(request):
         'Total',
         'Método Pago',
         'Estado'
-    ])
-
-    # Filtrar ventas
-    ventas = Venta.objects.select_related('cliente', 'vendedor').all()
-
-    if fecha_inicio:
-        ventas = ventas.filter(fecha_venta__gte=fecha_inicio)
-    if fecha_fin:
-        ventas = ventas.filter(fecha_venta__lte=fecha_fin)
-
-    # Escribir datos
-    total_ventas = 0
-    for venta in ventas:
-        writer.writerow([
-            venta.numero_venta,
-            venta.fecha_venta.strftime('%d/%m/%Y %H:%M'),
-            venta.cliente.nombre_completo if venta.cliente else 'N/A',
-            venta.vendedor.nombre_completo if venta.vendedor else 'N/A',
-            f'${venta.subtotal:,.2f}',
-            f'${venta.descuento:,.2f}',
-            f'${venta.impuestos:,.2f}',
-            f'${venta.total:,.2f}',
-            venta.get_metodo_pago_display(),
-            venta.get_estado_display()
-        ])
-        total_ventas += venta.total
-
-    # Total general
-    writer.writerow([])
-    writer.writerow(['TOTAL GENERAL', '', '', '', '', '', '', f'${total_ventas:,.2f}', '', ''])
-
-    return response
-
-
-def generar_reporte_inventario_csv(request):
-    """Genera reporte de inventario en formato CSV"""
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="reporte_inventario_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff'.encode('utf-8'))
-
-    writer = csv.writer(response)
-
-    # Encabezados
-    writer.writerow([
+    ], filas())
+
+
+def construir_reporte_inventario():
+    """Define el reporte de inventario: nombre, encabezados y generador de filas"""
+    productos = Producto.objects.filter(activo=True)
+
+    categorias = dict(Producto.CATEGORIA_CHOICES)
+    estados = dict(Producto.ESTADO_CHOICES)
+
+    def filas():
+        # Precios en centavos desde la consulta: el valor del inventario es una multiplicación entera
+        columnas = productos.annotate(
+            compra_centavos=en_centavos('precio_compra'), venta_centavos=en_centavos('precio_venta')
+        ).values_list(
+            'codigo_producto', 'nombre', 'categoria', 'marca__nombre',
+            'stock_actual', 'stock_minimo', 'stock_maximo',
+            'compra_centavos', 'venta_centavos', 'estado'
+        )
+        for (codigo, nombre, categoria, marca, stock_actual, stock_minimo, stock_maximo,
+             precio_compra, precio_venta, estado) in columnas.iterator(chunk_size=TAMANO_LOTE):
+            valor_inventario = precio_venta * stock_actual
+
+            yield [
+                codigo,
+                nombre,
+                categorias.get(categoria, categoria),
+                marca or 'N/A',
+                stock_actual,
+                stock_minimo,
+                stock_maximo,
+                formatear(precio_compra),
+                formatear(precio_venta),
+                formatear(valor_inventario),
+                estados.get(estado, estado)
+            ]
+
+        # Resumen
+        resumen = resumen_inventario(productos)
+        yield []
+        yield ['RESUMEN DEL INVENTARIO']
+        yield ['Total de Productos:', resumen['total_productos']]
+        yield ['Productos con Stock Bajo:', resumen['productos_bajo_stock']]
+        yield ['Valor Total del Inventario:', _moneda(resumen['valor_inventario'])]
+
+    return ('reporte_inventario', [
         'Código',
         'Nombre',
         'Categoría',
@@ -95,55 +216,45 @@ def generar_reporte_inventario_csv(request):
         'Precio Venta',
         'Valor Inventario',
         'Estado'
-    ])
-
-    # Productos
-    productos = Producto.objects.select_related('marca').filter(activo=True)
-
-    total_valor = 0
-    productos_bajo_stock = 0
-
-    for producto in productos:
-        valor_inventario = producto.precio_venta * producto.stock_actual
-        total_valor += valor_inventario
-
-        if producto.stock_actual <= producto.stock_minimo:
-            productos_bajo_stock += 1
-
-        writer.writerow([
-            producto.codigo_producto,
-            producto.nombre,
-            producto.get_categoria_display(),
-            producto.marca.nombre if producto.marca else 'N/A',
-            producto.stock_actual,
-            producto.stock_minimo,
-            producto.stock_maximo,
-            f'${producto.precio_compra:,.2f}',
-            f'${producto.precio_venta:,.2f}',
-            f'${valor_inventario:,.2f}',
-            producto.get_estado_display()
-        ])
-
-    # Resumen
-    writer.writerow([])
-    writer.writerow(['RESUMEN DEL INVENTARIO'])
-    writer.writerow(['Total de Productos:', productos.count()])
-    writer.writerow(['Productos con Stock Bajo:', productos_bajo_stock])
-    writer.writerow(['Valor Total del Inventario:', f'${total_valor:,.2f}'])
-
-    return response
+    ], filas())
 
 
-def generar_reporte_clientes_csv(request):
-    """Genera reporte de clientes en formato CSV"""
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="reporte_clientes_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff'.encode('utf-8'))
-
-    writer = csv.writer(response)
+def construir_reporte_clientes():
+    """Define el reporte de clientes: nombre, encabezados y generador de filas"""
+    clientes = Cliente.objects.filter(activo=True).order_by('nombres')
 
-    # Encabezados
-    writer.writerow([
+    tipos_documento = dict(Cliente.TIPO_DOCUMENTO_CHOICES)
+    tipos_cliente = dict(Cliente.TIPO_CLIENTE_CHOICES)
+
+    def filas():
+        columnas = clientes.values_list(
+            'tipo_documento', 'numero_documento', 'tipo_cliente', 'razon_social',
+            'nombres', 'apellidos', 'telefono', 'email', 'ciudad', 'departamento',
+            'fecha_registro', 'activo'
+        )
+        for (tipo_documento, numero_documento, tipo_cliente, razon_social, nombres, apellidos,
+             telefono, email, ciudad, departamento, fecha_registro, activo) in columnas.iterator(chunk_size=TAMANO_LOTE):
+            yield [
+                tipos_documento.get(tipo_documento, tipo_documento),
+                numero_documento,
+                _nombre_cliente(tipo_cliente, razon_social, nombres, apellidos),
+                tipos_cliente.get(tipo_cliente, tipo_cliente),
+                telefono,
+                email,
+                ciudad,
+                departamento,
+                fecha_registro.strftime('%d/%m/%Y'),
+                'Activo' if activo else 'Inactivo'
+            ]
+
+        # Resumen
+        resumen = resumen_clientes(clientes)
+        yield []
+        yield ['TOTAL DE CLIENTES:', resumen['total_clientes']]
+        yield ['Personas Naturales:', resumen['personas_naturales']]
+        yield ['Personas Jurídicas:', resumen['personas_juridicas']]
+
+    return ('reporte_clientes', [
         'Tipo Documento',
         'Número Documento',
         'Nombre Completo',
@@ -154,53 +265,54 @@ def generar_reporte_clientes_csv(request):
         'Departamento',
         'Fecha Registro',
         'Estado'
-    ])
+    ], filas())
 
-    # Clientes
-    clientes = Cliente.objects.filter(activo=True).order_by('nombres')
-
-    for cliente in clientes:
-        writer.writerow([
-            cliente.get_tipo_documento_display(),
-            cliente.numero_documento,
-            cliente.nombre_completo,
-            cliente.get_tipo_cliente_display(),
-            cliente.telefono,
-            cliente.email,
-            cliente.ciudad,
-            cliente.departamento,
-            cliente.fecha_registro.strftime('%d/%m/%Y'),
-            'Activo' if cliente.activo else 'Inactivo'
-        ])
-
-    # Resumen
-    writer.writerow([])
-    writer.writerow(['TOTAL DE CLIENTES:', clientes.count()])
-    writer.writerow([
-        'Personas Naturales:',
-        clientes.filter(tipo_cliente='NATURAL').count()
-    ])
-    writer.writerow([
-        'Personas Jurídicas:',
-        clientes.filter(tipo_cliente='JURIDICA').count()
-    ])
-
-    return response
-
-
-def generar_reporte_servicios_csv(request):
-    """Genera reporte de órdenes de servicio en formato CSV"""
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
 
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="reporte_servicios_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff'.encode('utf-8'))
-
-    writer = csv.writer(response)
-
-    # Encabezados
-    writer.writerow([
+def construir_reporte_servicios(fecha_inicio=None, fecha_fin=None):
+    """Define el reporte de órdenes de servicio: nombre, encabezados y generador de filas"""
+    # Filtrar órdenes
+    ordenes = OrdenServicio.objects.all()
+
+    ordenes = ordenes.filter(**filtro_rango_fechas('fecha_ingreso', fecha_inicio, fecha_fin))
+
+    estados = dict(OrdenServicio.ESTADO_CHOICES)
+    prioridades = dict(OrdenServicio.PRIORIDAD_CHOICES)
+
+    def filas():
+        columnas = ordenes.values_list(
+            'numero_orden',
+            'cliente__tipo_cliente', 'cliente__razon_social', 'cliente__nombres', 'cliente__apellidos',
+            'equipo__nombre', 'tecnico_asignado__nombres', 'tecnico_asignado__apellidos',
+            'fecha_ingreso', 'fecha_entrega_real', 'estado', 'prioridad',
+            'costo_mano_obra', 'costo_repuestos', 'total'
+        )
+        for (numero, tipo_cliente, razon_social, nombres, apellidos,
+             equipo, tecnico_nombres, tecnico_apellidos,
+             fecha_ingreso, fecha_entrega_real, estado, prioridad,
+             costo_mano_obra, costo_repuestos, total) in columnas.iterator(chunk_size=TAMANO_LOTE):
+            yield [
+                numero,
+                _nombre_cliente(tipo_cliente, razon_social, nombres, apellidos),
+                equipo or 'N/A',
+                f'{tecnico_nombres} {tecnico_apellidos}' if tecnico_nombres is not None else 'Sin asignar',
+                fecha_ingreso.strftime('%d/%m/%Y'),
+                fecha_entrega_real.strftime('%d/%m/%Y') if fecha_entrega_real else 'Pendiente',
+                estados.get(estado, estado),
+                prioridades.get(prioridad, prioridad),
+                _moneda(costo_mano_obra),
+                _moneda(costo_repuestos),
+                _moneda(total)
+            ]
+
+        # Totales
+        resumen = resumen_servicios(ordenes)
+        yield []
+        yield ['TOTALES', '', '', '', '', '', '', '',
+               _moneda(resumen['total_mano_obra']),
+               _moneda(resumen['total_repuestos']),
+               _moneda(resumen['total_general'])]
+
+    return ('reporte_servicios', [
         'Número Orden',
         'Cliente',
         'Equipo',
@@ -212,61 +324,45 @@ def generar_reporte_servicios_csv(request):
         'Costo Mano Obra',
         'Costo Repuestos',
         'Total'
-    ])
-
-    # Filtrar órdenes
-    ordenes = OrdenServicio.objects.select_related('cliente', 'equipo', 'tecnico_asignado').all()
-
-    if fecha_inicio:
-        ordenes = ordenes.filter(fecha_ingreso__gte=fecha_inicio)
-    if fecha_fin:
-        ordenes = ordenes.filter(fecha_ingreso__lte=fecha_fin)
-
-    total_mano_obra = 0
-    total_repuestos = 0
-    total_general = 0
-
-    for orden in ordenes:
-        writer.writerow([
-            orden.numero_orden,
-            orden.cliente.nombre_completo if orden.cliente else 'N/A',
-            orden.equipo.nombre if orden.equipo else 'N/A',
-            orden.tecnico_asignado.nombre_completo if orden.tecnico_asignado else 'Sin asignar',
-            orden.fecha_ingreso.strftime('%d/%m/%Y'),
-            orden.fecha_entrega_real.strftime('%d/%m/%Y') if orden.fecha_entrega_real else 'Pendiente',
-            orden.get_estado_display(),
-            orden.get_prioridad_display(),
-            f'${orden.costo_mano_obra:,.2f}',
-            f'${orden.costo_repuestos:,.2f}',
-            f'${orden.total:,.2f}'
-        ])
-        total_mano_obra += orden.costo_mano_obra
-        total_repuestos += orden.costo_repuestos
-        total_general += orden.total
-
-    # Totales
-    writer.writerow([])
-    writer.writerow(['TOTALES', '', '', '', '', '', '', '',
-                    f'${total_mano_obra:,.2f}',
-                    f'${total_repuestos:,.2f}',
-                    f'${total_general:,.2f}'])
+    ], filas())
 
-    return response
-
-
-def generar_reporte_compras_csv(request):
-    """Genera reporte de compras en formato CSV"""
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
 
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="reporte_compras_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff'.encode('utf-8'))
-
-    writer = csv.writer(response)
-
-    # Encabezados
-    writer.writerow([
+def construir_reporte_compras(fecha_inicio=None, fecha_fin=None):
+    """Define el reporte de compras: nombre, encabezados y generador de filas"""
+    # Filtrar compras
+    compras = Compra.objects.all()
+
+    compras = compras.filter(**filtro_rango_fechas('fecha_solicitud', fecha_inicio, fecha_fin))
+
+    estados = dict(Compra.ESTADO_CHOICES)
+    metodos_pago = dict(Compra.METODO_PAGO_CHOICES)
+
+    def filas():
+        columnas = compras.values_list(
+            'numero_compra', 'proveedor__razon_social', 'fecha_solicitud', 'estado',
+            'subtotal', 'descuento', 'impuestos', 'costos_envio', 'total', 'metodo_pago'
+        )
+        for (numero, proveedor, fecha_solicitud, estado, subtotal, descuento,
+             impuestos, costos_envio, total, metodo_pago) in columnas.iterator(chunk_size=TAMANO_LOTE):
+            yield [
+                numero,
+                proveedor or 'N/A',
+                fecha_solicitud.strftime('%d/%m/%Y'),
+                estados.get(estado, estado),
+                _moneda(subtotal),
+                _moneda(descuento),
+                _moneda(impuestos),
+                _moneda(costos_envio),
+                _moneda(total),
+                metodos_pago.get(metodo_pago, metodo_pago) if metodo_pago else 'N/A'
+            ]
+
+        # Total
+        total_compras = compras.aggregate(total=Sum('total'))['total'] or 0
+        yield []
+        yield ['TOTAL COMPRAS', '', '', '', '', '', '', '', _moneda(total_compras), '']
+
+    return ('reporte_compras', [
         'Número Compra',
         'Proveedor',
         'Fecha Solicitud',
@@ -277,50 +373,470 @@ def generar_reporte_compras_csv(request):
         'Costos Envío',
         'Total',
         'Método Pago'
-    ])
+    ], filas())
 
-    # Filtrar compras
-    compras = Compra.objects.select_related('proveedor').all()
 
-    if fecha_inicio:
-        compras = compras.filter(fecha_solicitud__gte=fecha_inicio)
-    if fecha_fin:
-        compras = compras.filter(fecha_solicitud__lte=fecha_fin)
-
-    total_compras = 0
-
-    for compra in compras:
-        writer.writerow([
-            compra.numero_compra,
-            compra.proveedor.razon_social if compra.proveedor else 'N/A',
-            compra.fecha_solicitud.strftime('%d/%m/%Y'),
-            compra.get_estado_display(),
-            f'${compra.subtotal:,.2f}',
-            f'${compra.descuento:,.2f}',
-            f'${compra.impuestos:,.2f}',
-            f'${compra.costos_envio:,.2f}',
-            f'${compra.total:,.2f}',
-            compra.get_metodo_pago_display() if compra.metodo_pago else 'N/A'
-        ])
-        total_compras += compra.total
-
-    # Total
-    writer.writerow([])
-    writer.writerow(['TOTAL COMPRAS', '', '', '', '', '', '', '', f'${total_compras:,.2f}', ''])
+def generar_reporte_ventas_csv(request):
+    """Genera reporte de ventas en formato CSV"""
+    return _respuesta_csv(*construir_reporte_ventas(
+        request.GET.get('fecha_inicio'),
+        request.GET.get('fecha_fin')
+    ))
+
+
+def generar_reporte_inventario_csv(request):
+    """Genera reporte de inventario en formato CSV"""
+    return _respuesta_csv(*construir_reporte_inventario())
 
+
+def generar_reporte_clientes_csv(request):
+    """Genera reporte de clientes en formato CSV"""
+    return _respuesta_csv(*construir_reporte_clientes())
+
+
+def generar_reporte_servicios_csv(request):
+    """Genera reporte de órdenes de servicio en formato CSV"""
+    return _respuesta_csv(*construir_reporte_servicios(
+        request.GET.get('fecha_inicio'),
+        request.GET.get('fecha_fin')
+    ))
+
+
+def generar_reporte_compras_csv(request):
+    """Genera reporte de compras en formato CSV"""
+    return _respuesta_csv(*construir_reporte_compras(
+        request.GET.get('fecha_inicio'),
+        request.GET.get('fecha_fin')
+    ))
+
+
+# ========== EXPORTACIONES TIPADAS (ARROW / PARQUET / XLSX) ========== #
+
+# Cada exportación: (modelo, filtros fijos, campo de fecha, [(columna, campo ORM, tipo)])
+# Los valores salen tal como están en la base de datos, sin formato de moneda
+EXPORTACIONES_TIPADAS = {
+    'VENTAS': (Venta, {}, 'fecha_venta', [
+        ('numero_venta', 'numero_venta', 'texto'),
+        ('fecha_venta', 'fecha_venta', 'fecha_hora'),
+        ('cliente_id', 'cliente_id', 'entero'),
+        ('cliente_documento', 'cliente__numero_documento', 'texto'),
+        ('vendedor_id', 'vendedor_id', 'entero'),
+        ('subtotal', 'subtotal', 'decimal'),
+        ('descuento', 'descuento', 'decimal'),
+        ('impuestos', 'impuestos', 'decimal'),
+        ('total', 'total', 'decimal'),
+        ('metodo_pago', 'metodo_pago', 'texto'),
+        ('estado', 'estado', 'texto'),
+    ]),
+    'SERVICIOS': (OrdenServicio, {}, 'fecha_ingreso', [
+        ('numero_orden', 'numero_orden', 'texto'),
+        ('cliente_id', 'cliente_id', 'entero'),
+        ('equipo_id', 'equipo_id', 'entero'),
+        ('tecnico_id', 'tecnico_asignado_id', 'entero'),
+        ('fecha_ingreso', 'fecha_ingreso', 'fecha_hora'),
+        ('fecha_entrega_real', 'fecha_entrega_real', 'fecha_hora'),
+        ('estado', 'estado', 'texto'),
+        ('prioridad', 'prioridad', 'texto'),
+        ('costo_mano_obra', 'costo_mano_obra', 'decimal'),
+        ('costo_repuestos', 'costo_repuestos', 'decimal'),
+        ('total', 'total', 'decimal'),
+    ]),
+    'COMPRAS': (Compra, {}, 'fecha_solicitud', [
+        ('numero_compra', 'numero_compra', 'texto'),
+        ('proveedor_id', 'proveedor_id', 'entero'),
+        ('proveedor', 'proveedor__razon_social', 'texto'),
+        ('fecha_solicitud', 'fecha_solicitud', 'fecha_hora'),
+        ('estado', 'estado', 'texto'),
+        ('subtotal', 'subtotal', 'decimal'),
+        ('descuento', 'descuento', 'decimal'),
+        ('impuestos', 'impuestos', 'decimal'),
+        ('costos_envio', 'costos_envio', 'decimal'),
+        ('total', 'total', 'decimal'),
+        ('metodo_pago', 'metodo_pago', 'texto'),
+    ]),
+    'INVENTARIO': (Producto, {'activo': True}, None, [
+        ('codigo_producto', 'codigo_producto', 'texto'),
+        ('nombre', 'nombre', 'texto'),
+        ('categoria', 'categoria', 'texto'),
+        ('marca', 'marca__nombre', 'texto'),
+        ('stock_actual', 'stock_actual', 'entero'),
+        ('stock_minimo', 'stock_minimo', 'entero'),
+        ('stock_maximo', 'stock_maximo', 'entero'),
+        ('precio_compra', 'precio_compra', 'decimal'),
+        ('precio_venta', 'precio_venta', 'decimal'),
+        ('estado', 'estado', 'texto'),
+    ]),
+}
+
+FORMATOS_TIPADOS = {
+    'arrow': ('arrow', 'application/vnd.apache.arrow.stream'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+class _BufferSalida:
+    """Destino de escritura (pyarrow, zipfile) que se vacía después de cada lote"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self.partes.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def _filas_tipadas(tipo, fecha_inicio=None, fecha_fin=None):
+    """Columnas y tuplas crudas (values_list) de una exportación tipada"""
+    modelo, filtros, campo_fecha, columnas = EXPORTACIONES_TIPADAS[tipo]
+    queryset = modelo.objects.filter(**filtros)
+
+    if campo_fecha:
+        queryset = queryset.filter(**filtro_rango_fechas(campo_fecha, fecha_inicio, fecha_fin))
+
+    filas = queryset.values_list(*[campo for _, campo, _ in columnas]).iterator(chunk_size=TAMANO_LOTE)
+    return columnas, filas
+
+
+def _lotes(filas):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _contenido_arrow(formato, columnas, filas):
+    """Genera un archivo Arrow IPC (stream) o Parquet lote a lote"""
+    import pyarrow as pa
+
+    tipos = {
+        'texto': pa.string(),
+        'entero': pa.int64(),
+        'decimal': pa.decimal128(14, 2),
+        'fecha_hora': pa.timestamp('us', tz='UTC'),
+    }
+    esquema = pa.schema([(nombre, tipos[tipo]) for nombre, _, tipo in columnas])
+    destino = _BufferSalida()
+
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(destino, esquema)
+        escribir = lambda lote: writer.write_table(pa.Table.from_batches([lote]))
+    else:
+        writer = pa.ipc.new_stream(destino, esquema)
+        escribir = writer.write_batch
+
+    for lote in _lotes(filas):
+        valores_por_columna = zip(*lote)
+        escribir(pa.RecordBatch.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(valores_por_columna, esquema)],
+            schema=esquema
+        ))
+        yield destino.vaciar()
+
+    writer.close()
+    yield destino.vaciar()
+
+
+# Partes fijas del paquete XLSX (Office Open XML) con una sola hoja
+_XLSX_PARTES = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Reporte" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilos: 0 general, 1 decimal (#,##0.00), 2 fecha y hora
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+# Día cero de las fechas seriales de Excel
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+# Caracteres de control que XML 1.0 no admite
+_CONTROL_XML = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _columna_xlsx(indice):
+    """Letra de columna de Excel (0 -> A, 26 -> AA)"""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda_xlsx(referencia, valor, tipo):
+    if valor is None:
+        return ''
+    if tipo == 'entero':
+        return f'<c r="{referencia}"><v>{valor}</v></c>'
+    if tipo == 'decimal':
+        return f'<c r="{referencia}" s="1"><v>{valor}</v></c>'
+    if tipo == 'fecha_hora':
+        # Excel no maneja zonas horarias: fecha serial en hora local
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor)
+        serial = (valor - _EPOCA_EXCEL) / timedelta(days=1)
+        return f'<c r="{referencia}" s="2"><v>{serial!r}</v></c>'
+    texto = escape(str(valor).translate(_CONTROL_XML))
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xlsx(numero, valores, tipos, letras):
+    celdas = ''.join(
+        _celda_xlsx(f'{letra}{numero}', valor, tipo)
+        for valor, tipo, letra in zip(valores, tipos, letras)
+    )
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def _contenido_xlsx(columnas, filas):
+    """
+    Genera un XLSX lote a lote: la hoja se escribe comprimida directamente sobre la respuesta
+    (zipfile usa descriptores de datos en un destino sin seek), sin archivo temporal.
+    """
+    destino = _BufferSalida()
+    letras = [_columna_xlsx(indice) for indice in range(len(columnas))]
+    tipos = [tipo for _, _, tipo in columnas]
+
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as paquete:
+        for nombre, contenido in _XLSX_PARTES.items():
+            paquete.writestr(nombre, contenido)
+
+        with paquete.open('xl/worksheets/sheet1.xml', 'w') as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            hoja.write(_fila_xlsx(1, [nombre for nombre, _, _ in columnas], ['texto'] * len(columnas), letras).encode())
+            numero = 1
+            for lote in _lotes(filas):
+                partes = []
+                for fila in lote:
+                    numero += 1
+                    partes.append(_fila_xlsx(numero, fila, tipos, letras))
+                hoja.write(''.join(partes).encode())
+                yield destino.vaciar()
+            hoja.write(b'</sheetData></worksheet>')
+
+    yield destino.vaciar()
+
+
+def exportar_reporte_tipado(tipo, formato, fecha_inicio=None, fecha_fin=None):
+    """
+    Exporta un reporte con columnas tipadas en Arrow, Parquet o XLSX, enviado lote a lote.
+    Lanza ImportError si pyarrow (Arrow y Parquet) no está instalado.
+    """
+    extension, content_type = FORMATOS_TIPADOS[formato]
+    columnas, filas = _filas_tipadas(tipo, fecha_inicio, fecha_fin)
+
+    if formato == 'xlsx':
+        response = StreamingHttpResponse(_contenido_xlsx(columnas, filas), content_type=content_type)
+    else:
+        import pyarrow  # noqa: F401 - dependencia opcional, se valida antes de empezar a enviar
+        response = StreamingHttpResponse(_contenido_arrow(formato, columnas, filas), content_type=content_type)
+
+    response['Content-Disposition'] = f'attachment; filename="reporte_{tipo.lower()}_{timezone.now().strftime("%Y%m%d")}.{extension}"'
     return response
 
 
+# ========== REPORTES EN SEGUNDO PLANO ========== #
+
+# Cada cuánto renueva su latido el worker mientras escribe un reporte
+INTERVALO_LATIDO_SEGUNDOS = 30
+
+# Reportes con rango de fechas que se pueden generar con el worker
+REPORTES_EN_SEGUNDO_PLANO = {
+    'VENTAS': construir_reporte_ventas,
+    'SERVICIOS': construir_reporte_servicios,
+    'COMPRAS': construir_reporte_compras,
+}
+
+
+def _reporte_sigue_vigente(job):
+    """Un archivo generado se reutiliza si su rango ya cerró o si es reciente"""
+    if job.fecha_fin and job.fecha_fin < timezone.localdate():
+        return True
+    vigencia = timedelta(minutes=getattr(settings, 'REPORTES_VIGENCIA_MINUTOS', 15))
+    return job.fecha_finalizacion is not None and timezone.now() - job.fecha_finalizacion <= vigencia
+
+
+def _limite_latido():
+    """Un job en proceso sin latidos desde antes de este instante se considera abandonado"""
+    return timezone.now() - timedelta(minutes=getattr(settings, 'REPORTES_LATIDO_EXPIRA_MINUTOS', 10))
+
+
+def _abandonados():
+    """Jobs tomados por un worker que dejó de renovar su latido (p. ej. porque se cayó)"""
+    return Q(estado='PROCESANDO') & (Q(fecha_latido__lt=_limite_latido()) | Q(fecha_latido__isnull=True))
+
+
+def jobs_por_procesar():
+    """Jobs que un worker puede tomar: los pendientes y los abandonados"""
+    return ReporteJob.objects.filter(Q(estado='PENDIENTE') | _abandonados())
+
+
+def solicitar_reporte(tipo, fecha_inicio=None, fecha_fin=None, usuario=None):
+    """
+    Encola un reporte para el worker. Si ya hay uno igual en proceso, o un archivo
+    vigente para el mismo rango de fechas, retorna ese en lugar de crear otro.
+    Uno igual que quedó abandonado vuelve a la cola y se retorna ese.
+    """
+    with transaction.atomic():
+        jobs = ReporteJob.objects.filter(tipo=tipo, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+        jobs.filter(_abandonados()).update(estado='PENDIENTE', fecha_latido=None)
+
+        en_curso = jobs.filter(estado__in=['PENDIENTE', 'PROCESANDO']).first()
+        if en_curso:
+            return en_curso
+
+        completado = jobs.filter(estado='COMPLETADO').first()
+        if completado and _reporte_sigue_vigente(completado):
+            return completado
+
+        return ReporteJob.objects.create(
+            tipo=tipo,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            solicitado_por=usuario
+        )
+
+
+def procesar_reporte_job(job_id):
+    """Genera el CSV de un ReporteJob pendiente en MEDIA_ROOT (lo ejecuta cada proceso del worker)"""
+    # Tomar el job de forma atómica: si otro worker ya lo tomó, no se procesa dos veces.
+    # El inicio del proceso identifica esta toma: si el job se retoma, el resultado de esta se descarta
+    inicio = timezone.now()
+    tomado = jobs_por_procesar().filter(pk=job_id).update(
+        estado='PROCESANDO',
+        fecha_inicio_proceso=inicio,
+        fecha_latido=inicio
+    )
+    if not tomado:
+        return None
+    esta_toma = ReporteJob.objects.filter(pk=job_id, estado='PROCESANDO', fecha_inicio_proceso=inicio)
+
+    job = ReporteJob.objects.get(pk=job_id)
+    ruta = None
+    resultado = {'archivo': None, 'mensaje_error': None}
+    try:
+        nombre_reporte, encabezados, filas = REPORTES_EN_SEGUNDO_PLANO[job.tipo](
+            job.fecha_inicio.isoformat() if job.fecha_inicio else None,
+            job.fecha_fin.isoformat() if job.fecha_fin else None
+        )
+
+        nombre_archivo = f'reportes/{nombre_reporte}_{job.pk}_{timezone.now().strftime("%Y%m%d%H%M%S")}.csv'
+        ruta = os.path.join(settings.MEDIA_ROOT, nombre_archivo)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        ultimo_latido = time_module.monotonic()
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            for bloque in _contenido_csv(encabezados, filas):
+                archivo.write(bloque)
+                if time_module.monotonic() - ultimo_latido >= INTERVALO_LATIDO_SEGUNDOS:
+                    esta_toma.update(fecha_latido=timezone.now())
+                    ultimo_latido = time_module.monotonic()
+
+        resultado.update(archivo=nombre_archivo, estado='COMPLETADO')
+    except Exception as e:
+        resultado.update(estado='ERROR', mensaje_error=str(e))
+
+    if not esta_toma.update(fecha_finalizacion=timezone.now(), **resultado):
+        # Otro worker retomó el job mientras tanto: su archivo es el que vale
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+        return None
+    return resultado['estado']
+
+
 # ========== FUNCIONES DE ANÁLISIS ========== #
 
+def _es_dia_completo(valor):
+    """True si el límite del rango es una fecha (o no hay límite), no un instante"""
+    if isinstance(valor, str):
+        return parse_date(valor) is not None
+    return not isinstance(valor, datetime)
+
+
 def obtener_estadisticas_ventas(fecha_inicio=None, fecha_fin=None):
     """Obtiene estadísticas de ventas para reportes"""
-    ventas = Venta.objects.all()
+    if _es_dia_completo(fecha_inicio) and _es_dia_completo(fecha_fin):
+        # Rangos de días completos: basta con el resumen diario (una fila por día)
+        from .resumen_ventas import estadisticas_resumen
+        return estadisticas_resumen(fecha_inicio, fecha_fin)
 
-    if fecha_inicio:
-        ventas = ventas.filter(fecha_venta__gte=fecha_inicio)
-    if fecha_fin:
-        ventas = ventas.filter(fecha_venta__lte=fecha_fin)
+    ventas = Venta.objects.filter(**filtro_rango_fechas('fecha_venta', fecha_inicio, fecha_fin))
 
     stats = ventas.aggregate(
         total_ventas=Count('id'),
@@ -333,6 +849,53 @@ def obtener_estadisticas_ventas(fecha_inicio=None, fecha_fin=None):
     return stats
 
 
+def resumen_inventario(productos=None):
+    """Resumen del inventario (conteos y valor total) en una sola consulta"""
+    if productos is None:
+        productos = Producto.objects.filter(activo=True)
+
+    resumen = productos.aggregate(
+        total_productos=Count('id'),
+        productos_bajo_stock=Count('id', filter=Q(bajo_stock=True)),
+        productos_sin_stock=Count('id', filter=Q(stock_actual=0)),
+        valor_inventario=Sum(
+            F('precio_venta') * F('stock_actual'),
+            output_field=DecimalField(max_digits=20, decimal_places=2)
+        )
+    )
+    resumen['valor_inventario'] = resumen['valor_inventario'] or 0
+    return resumen
+
+
+def resumen_clientes(clientes=None):
+    """Totales de clientes por tipo en una sola consulta"""
+    if clientes is None:
+        clientes = Cliente.objects.filter(activo=True)
+
+    return clientes.aggregate(
+        total_clientes=Count('id'),
+        personas_naturales=Count('id', filter=Q(tipo_cliente='NATURAL')),
+        personas_juridicas=Count('id', filter=Q(tipo_cliente='JURIDICA'))
+    )
+
+
+def resumen_servicios(ordenes=None):
+    """Conteos y costos de órdenes de servicio en una sola consulta"""
+    if ordenes is None:
+        ordenes = OrdenServicio.objects.all()
+
+    resumen = ordenes.aggregate(
+        total_ordenes=Count('id'),
+        ordenes_completadas=Count('id', filter=Q(estado='COMPLETADA')),
+        total_mano_obra=Sum('costo_mano_obra'),
+        total_repuestos=Sum('costo_repuestos'),
+        total_general=Sum('total')
+    )
+    for campo in ('total_mano_obra', 'total_repuestos', 'total_general'):
+        resumen[campo] = resumen[campo] or 0
+    return resumen
+
+
 def obtener_productos_mas_vendidos(limite=10):
     """Obtiene los productos más vendidos"""
     # Nota: Requiere modelo DetalleVenta que no está en el código actual
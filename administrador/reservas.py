@@ -0,0 +1,147 @@
+"""
+Módulo de Reservas de Stock - Digit Soft
+Cada línea de un carrito aparta sus unidades por un tiempo (ReservaStock) y el producto lleva
+el total reservado en stock_reservado. Lo disponible para prometer es
+stock_actual - stock_reservado, y se toma con un UPDATE condicional en vez de bloquear la fila.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Producto, ReservaStock
+
+
+def _expiracion():
+    return timezone.now() + timedelta(minutes=getattr(settings, 'RESERVA_STOCK_MINUTOS', 30))
+
+
+def _tomar(producto_id, cantidad):
+    """Suma hasta `cantidad` unidades a lo reservado del producto si están disponibles; retorna cuántas tomó"""
+    productos = Producto.objects.filter(pk=producto_id)
+    if productos.filter(stock_actual__gte=F('stock_reservado') + cantidad).update(
+        stock_reservado=F('stock_reservado') + cantidad
+    ):
+        return cantidad
+
+    # No alcanza para todo: se toma lo que quede libre (otro carrito pudo ganarlo entretanto)
+    libre = productos.values_list('stock_actual', 'stock_reservado').first()
+    libre = min(max(libre[0] - libre[1], 0), cantidad) if libre else 0
+    if libre and productos.filter(stock_actual__gte=F('stock_reservado') + libre).update(
+        stock_reservado=F('stock_reservado') + libre
+    ):
+        return libre
+    return 0
+
+
+def _devolver(cantidades):
+    """Resta de lo reservado de cada producto ({producto_id: cantidad}) en un solo UPDATE"""
+    cantidades = {producto_id: cantidad for producto_id, cantidad in cantidades.items() if cantidad}
+    if not cantidades:
+        return
+    Producto.objects.filter(pk__in=cantidades).update(
+        stock_reservado=Greatest(
+            Case(
+                *[When(pk=producto_id, then=F('stock_reservado') - cantidad)
+                  for producto_id, cantidad in cantidades.items()],
+                default=F('stock_reservado'),
+                output_field=PositiveIntegerField()
+            ),
+            0
+        )
+    )
+
+
+def reservar(carrito_id, producto_id, cantidad):
+    """
+    Deja reservadas `cantidad` unidades del producto para la línea del carrito (0 libera la
+    reserva) y renueva su vencimiento. Si no hay tantas disponibles se reservan las que haya;
+    retorna la cantidad que quedó reservada.
+    """
+    with transaction.atomic():
+        reserva = ReservaStock.objects.select_for_update().filter(
+            carrito=carrito_id, producto_id=producto_id
+        ).first()
+        actual = reserva.cantidad if reserva else 0
+        cantidad = max(cantidad, 0)
+
+        if cantidad > actual:
+            cantidad = actual + _tomar(producto_id, cantidad - actual)
+        elif cantidad < actual:
+            _devolver({producto_id: actual - cantidad})
+
+        if cantidad == 0:
+            if reserva:
+                reserva.delete()
+        elif reserva:
+            reserva.cantidad = cantidad
+            reserva.fecha_expiracion = _expiracion()
+            reserva.save(update_fields=['cantidad', 'fecha_expiracion'])
+        else:
+            ReservaStock.objects.create(
+                carrito=carrito_id, producto_id=producto_id, cantidad=cantidad, fecha_expiracion=_expiracion()
+            )
+    return cantidad
+
+
+def liberar(carrito_id, productos=None):
+    """Libera las reservas del carrito (o solo las de `productos`); retorna cuántas unidades devolvió"""
+    with transaction.atomic():
+        reservas = ReservaStock.objects.select_for_update().filter(carrito=carrito_id)
+        if productos is not None:
+            reservas = reservas.filter(producto_id__in=productos)
+        filas = list(reservas.values_list('pk', 'producto_id', 'cantidad'))
+        if not filas:
+            return 0
+        ReservaStock.objects.filter(pk__in=[pk for pk, _, _ in filas]).delete()
+        _devolver({producto_id: cantidad for _, producto_id, cantidad in filas})
+    return sum(cantidad for _, _, cantidad in filas)
+
+
+def transferir(origen, destino):
+    """Pasa las reservas de un carrito a otro (el anónimo al del cliente al iniciar sesión)"""
+    for producto_id, cantidad in ReservaStock.objects.filter(carrito=origen).values_list('producto_id', 'cantidad'):
+        actual = ReservaStock.objects.filter(carrito=destino, producto_id=producto_id).values_list(
+            'cantidad', flat=True
+        ).first() or 0
+        # Primero se devuelven las del origen para que el destino pueda tomarlas
+        liberar(origen, [producto_id])
+        reservar(destino, producto_id, actual + cantidad)
+
+
+def liberar_vencidas(lote=1000, ahora=None):
+    """Borra las reservas vencidas por lotes y devuelve sus unidades; retorna cuántas reservas liberó"""
+    ahora = ahora or timezone.now()
+    liberadas = 0
+    while True:
+        with transaction.atomic():
+            # Las reservas que un carrito está modificando se dejan para el próximo lote
+            filas = list(
+                ReservaStock.objects.select_for_update(skip_locked=True)
+                .filter(fecha_expiracion__lte=ahora)
+                .order_by('fecha_expiracion')
+                .values_list('pk', 'producto_id', 'cantidad')[:lote]
+            )
+            if not filas:
+                return liberadas
+            ReservaStock.objects.filter(pk__in=[pk for pk, _, _ in filas]).delete()
+            cantidades = {}
+            for _, producto_id, cantidad in filas:
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+            _devolver(cantidades)
+            liberadas += len(filas)
+
+
+def recalcular_reservado():
+    """Rehace stock_reservado de todos los productos desde las reservas (tras una carga o reparación)"""
+    with transaction.atomic():
+        reservado = dict(
+            ReservaStock.objects.values('producto_id').annotate(total=Sum('cantidad'))
+            .values_list('producto_id', 'total')
+        )
+        Producto.objects.exclude(pk__in=reservado).exclude(stock_reservado=0).update(stock_reservado=0)
+        for producto_id, total in reservado.items():
+            Producto.objects.filter(pk=producto_id).update(stock_reservado=total)
@@ -0,0 +1,133 @@
+"""
+Módulo de Resumen de Ventas - Digit Soft
+Totales diarios de ventas precalculados para que las estadísticas no recorran toda la tabla
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Venta, VentaResumenDiario
+
+
+def _grupo(venta):
+    """Fila del resumen a la que pertenece la venta y los importes que aporta"""
+    clave = {
+        'fecha': timezone.localdate(venta.fecha_venta),
+        'estado': venta.estado,
+        'metodo_pago': venta.metodo_pago,
+    }
+    importes = {
+        'total': Decimal(str(venta.total or 0)),
+        'impuestos': Decimal(str(venta.impuestos or 0)),
+        'descuento': Decimal(str(venta.descuento or 0)),
+    }
+    return clave, importes
+
+
+def _acumular(clave, importes, signo):
+    """Suma (signo=1) o resta (signo=-1) una venta en su fila del resumen"""
+    filas = VentaResumenDiario.objects.filter(**clave)
+    cambios = {
+        'cantidad_ventas': F('cantidad_ventas') + signo,
+        **{campo: F(campo) + signo * valor for campo, valor in importes.items()}
+    }
+
+    with transaction.atomic():
+        if filas.update(**cambios):
+            return
+        try:
+            with transaction.atomic():
+                VentaResumenDiario.objects.create(
+                    cantidad_ventas=signo,
+                    **clave,
+                    **{campo: signo * valor for campo, valor in importes.items()}
+                )
+        except IntegrityError:
+            # Otra venta creó la fila del día al mismo tiempo
+            filas.update(**cambios)
+
+
+def registrar_estado_anterior(venta):
+    """Guarda en la instancia cómo estaba la venta en la base de datos antes de modificarla"""
+    venta._resumen_anterior = None
+    if venta.pk:
+        anterior = Venta.objects.filter(pk=venta.pk).only(
+            'fecha_venta', 'estado', 'metodo_pago', 'total', 'impuestos', 'descuento'
+        ).first()
+        if anterior is not None:
+            venta._resumen_anterior = _grupo(anterior)
+
+
+def actualizar_resumen(venta):
+    """Aplica al resumen diario el alta o el cambio de una venta"""
+    anterior = getattr(venta, '_resumen_anterior', None)
+    actual = _grupo(venta)
+    if anterior == actual:
+        return
+    if anterior is not None:
+        _acumular(*anterior, signo=-1)
+    _acumular(*actual, signo=1)
+
+
+def descontar_venta(venta):
+    """Retira del resumen diario una venta eliminada"""
+    _acumular(*_grupo(venta), signo=-1)
+
+
+def reconstruir_resumen(fecha_inicio=None, fecha_fin=None):
+    """
+    Recalcula el resumen diario desde la tabla de ventas (días completos, fechas incluidas).
+    Retorna la cantidad de filas generadas.
+    """
+    from .reportes import filtro_rango_fechas
+
+    ventas = Venta.objects.filter(**filtro_rango_fechas('fecha_venta', fecha_inicio, fecha_fin))
+    grupos = (
+        ventas.order_by()
+        .annotate(fecha=TruncDate('fecha_venta'))
+        .values('fecha', 'estado', 'metodo_pago')
+        .annotate(
+            cantidad_ventas=Count('id'),
+            total=Sum('total'),
+            impuestos=Sum('impuestos'),
+            descuento=Sum('descuento')
+        )
+    )
+
+    filas = VentaResumenDiario.objects.all()
+    if fecha_inicio:
+        filas = filas.filter(fecha__gte=fecha_inicio)
+    if fecha_fin:
+        filas = filas.filter(fecha__lte=fecha_fin)
+
+    with transaction.atomic():
+        filas.delete()
+        creadas = VentaResumenDiario.objects.bulk_create(
+            [VentaResumenDiario(**grupo) for grupo in grupos.iterator()],
+            batch_size=500
+        )
+    return len(creadas)
+
+
+def estadisticas_resumen(fecha_inicio=None, fecha_fin=None):
+    """Estadísticas de ventas entre dos fechas (incluidas) leyendo solo el resumen diario"""
+    filas = VentaResumenDiario.objects.all()
+    if fecha_inicio:
+        filas = filas.filter(fecha__gte=fecha_inicio)
+    if fecha_fin:
+        filas = filas.filter(fecha__lte=fecha_fin)
+
+    stats = filas.aggregate(
+        total_ventas=Sum('cantidad_ventas'),
+        total_ingresos=Sum('total'),
+        total_descuentos=Sum('descuento'),
+        total_impuestos=Sum('impuestos')
+    )
+    stats['total_ventas'] = stats['total_ventas'] or 0
+    stats['promedio_venta'] = (
+        stats['total_ingresos'] / stats['total_ventas'] if stats['total_ventas'] else None
+    )
+    return stats
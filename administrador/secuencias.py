@@ -0,0 +1,115 @@
+"""
+Módulo de Secuencias - Digit Soft
+Numeración atómica de documentos (ventas, facturas, garantías, compras y productos)
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, F, Max
+from django.db.models.functions import Cast, Greatest, Substr
+from django.utils import timezone
+
+
+class RangoNumeracionAgotado(Exception):
+    """Se superó el rango de numeración autorizado para un prefijo"""
+
+
+# Bloques pre-asignados por proceso: {(prefijo, periodo): range}
+_bloques = {}
+_bloques_lock = threading.Lock()
+
+
+def _tamano_bloque(prefijo):
+    """Cantidad de números que cada worker reserva de una vez para el prefijo"""
+    return getattr(settings, 'SECUENCIAS_TAMANO_BLOQUE', {}).get(prefijo, 1)
+
+
+def _incrementar(prefijo, periodo, cantidad, desde, hasta, semilla):
+    """Incrementa la secuencia en la base de datos y retorna el rango asignado"""
+    from .models import SecuenciaDocumento
+
+    secuencia = SecuenciaDocumento.objects.filter(prefijo=prefijo, periodo=periodo)
+    incremento = Greatest(F('ultimo_valor'), desde - 1) + cantidad
+
+    with transaction.atomic():
+        # El UPDATE bloquea la fila antes de leerla, así dos workers nunca obtienen el mismo valor
+        if not secuencia.update(ultimo_valor=incremento):
+            inicial = max(desde - 1, semilla() if semilla else 0)
+            try:
+                with transaction.atomic():
+                    SecuenciaDocumento.objects.create(
+                        prefijo=prefijo,
+                        periodo=periodo,
+                        ultimo_valor=inicial + cantidad
+                    )
+            except IntegrityError:
+                # Otro worker creó la secuencia al mismo tiempo
+                secuencia.update(ultimo_valor=incremento)
+
+        ultimo = secuencia.values_list('ultimo_valor', flat=True).get()
+        if hasta is not None and ultimo > hasta:
+            raise RangoNumeracionAgotado(
+                f'El rango de numeración de "{prefijo}" llegó a su límite ({hasta}).'
+            )
+
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def reservar_numeros(prefijo, periodo='', cantidad=1, desde=1, hasta=None, semilla=None):
+    """
+    Reserva `cantidad` números consecutivos de la secuencia (prefijo, periodo).
+
+    `semilla` es una función opcional que retorna el último número ya usado con ese
+    prefijo (ver ultimo_numero); solo se llama la primera vez que se crea la secuencia.
+    Si el prefijo tiene un tamaño de bloque configurado en SECUENCIAS_TAMANO_BLOQUE
+    (y no tiene rango limitado), el worker reserva un bloque y reparte desde memoria.
+    """
+    tamano = _tamano_bloque(prefijo)
+    if tamano <= 1 or hasta is not None:
+        return _incrementar(prefijo, periodo, cantidad, desde, hasta, semilla)
+
+    clave = (prefijo, periodo)
+    with _bloques_lock:
+        bloque = _bloques.get(clave)
+        if bloque is not None and len(bloque) >= cantidad:
+            _bloques[clave] = bloque[cantidad:]
+            return bloque[:cantidad]
+
+    nuevo = _incrementar(prefijo, periodo, max(cantidad, tamano), desde, hasta, semilla)
+    restante = nuevo[cantidad:]
+
+    def guardar_bloque():
+        with _bloques_lock:
+            _bloques[clave] = restante
+
+    # Solo se guarda el sobrante si el incremento se confirma; un rollback lo descarta
+    transaction.on_commit(guardar_bloque)
+    return nuevo[:cantidad]
+
+
+def ultimo_numero(modelo, campo, base):
+    """
+    Retorna el mayor consecutivo numérico ya usado en `campo` bajo `base` (0 si no hay).
+    Se toma el máximo y no el conteo: con huecos, o si la numeración no empezó en 1,
+    contar filas volvería a entregar números ya emitidos.
+    """
+    return modelo.objects.filter(
+        **{f'{campo}__regex': rf'^{re.escape(base)}[0-9]+$'}
+    ).aggregate(
+        ultimo=Max(Cast(Substr(campo, len(base) + 1), BigIntegerField()))
+    )['ultimo'] or 0
+
+
+def generar_codigos(prefijo, modelo, campo, formato_periodo, cantidad=1, digitos=4):
+    """Genera códigos con el formato <prefijo><periodo><consecutivo>, p. ej. V202510070001"""
+    periodo = timezone.now().strftime(formato_periodo)
+    base = f'{prefijo}{periodo}'
+
+    def semilla():
+        # Continúa la numeración de documentos creados antes de existir la secuencia
+        return ultimo_numero(modelo, campo, base)
+
+    numeros = reservar_numeros(prefijo, periodo, cantidad, semilla=semilla)
+    return [f'{base}{numero:0{digitos}d}' for numero in numeros]
@@ -0,0 +1,141 @@
+"""
+Señales del módulo administrador - Digit Soft
+"""
+from django.db import transaction
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .metricas import MODELOS_METRICAS, invalidar_metricas
+from .models import Venta, Producto, Marca, Compra, ConfiguracionGeneral
+from .busqueda import indexar_productos, quitar_producto
+from .cache_catalogo import invalidar_catalogo
+from .configuracion import invalidar_configuracion
+from .reabastecimiento import revisar_stock, compra_cancelada, compra_recibida
+from . import almacen_carrito, sugerencias
+from .resumen_ventas import registrar_estado_anterior, actualizar_resumen, descontar_venta
+
+
+def _invalidar_metricas(sender, **kwargs):
+    """Cualquier alta, cambio o baja en un modelo del dashboard invalida sus métricas"""
+    # Tras el commit, para que ninguna visita concurrente vuelva a guardar los datos anteriores
+    transaction.on_commit(invalidar_metricas)
+
+
+for modelo in MODELOS_METRICAS:
+    post_save.connect(_invalidar_metricas, sender=modelo, dispatch_uid=f'metricas_save_{modelo.__name__}')
+    post_delete.connect(_invalidar_metricas, sender=modelo, dispatch_uid=f'metricas_delete_{modelo.__name__}')
+
+
+# ========== RESUMEN DIARIO DE VENTAS ========== #
+
+def _venta_antes_de_guardar(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_estado_anterior(instance)
+
+
+def _venta_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        actualizar_resumen(instance)
+
+
+def _venta_eliminada(sender, instance, **kwargs):
+    descontar_venta(instance)
+
+
+pre_save.connect(_venta_antes_de_guardar, sender=Venta, dispatch_uid='resumen_ventas_pre_save')
+post_save.connect(_venta_guardada, sender=Venta, dispatch_uid='resumen_ventas_post_save')
+post_delete.connect(_venta_eliminada, sender=Venta, dispatch_uid='resumen_ventas_post_delete')
+
+
+# ========== ÍNDICE DE BÚSQUEDA DE PRODUCTOS ========== #
+
+def _producto_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_productos(Producto.objects.filter(pk=instance.pk))
+        # El índice de sugerencias vive en memoria: solo se toca si la transacción se confirma
+        transaction.on_commit(lambda: sugerencias.actualizar_producto(instance))
+
+
+def _producto_eliminado(sender, instance, **kwargs):
+    quitar_producto(instance.pk)
+    producto_id = instance.pk
+    transaction.on_commit(lambda: sugerencias.quitar_producto(producto_id))
+
+
+def _marca_guardada(sender, instance, raw=False, **kwargs):
+    # El nombre de la marca forma parte del índice de cada uno de sus productos
+    if not raw:
+        indexar_productos(Producto.objects.filter(marca=instance))
+        transaction.on_commit(lambda: sugerencias.actualizar_marca(instance))
+
+
+def _marca_eliminada(sender, instance, **kwargs):
+    marca_id = instance.pk
+    transaction.on_commit(lambda: sugerencias.quitar_marca(marca_id))
+
+
+post_save.connect(_producto_guardado, sender=Producto, dispatch_uid='busqueda_producto_post_save')
+post_delete.connect(_producto_eliminado, sender=Producto, dispatch_uid='busqueda_producto_post_delete')
+post_save.connect(_marca_guardada, sender=Marca, dispatch_uid='busqueda_marca_post_save')
+post_delete.connect(_marca_eliminada, sender=Marca, dispatch_uid='busqueda_marca_post_delete')
+
+
+# ========== CACHÉ DEL CATÁLOGO PÚBLICO ========== #
+
+def _invalidar_catalogo(sender, **kwargs):
+    """Páginas, fragmentos y conteos de facetas de la tienda se descartan al confirmar el cambio"""
+    transaction.on_commit(invalidar_catalogo)
+
+
+for modelo in (Producto, Marca):
+    post_save.connect(_invalidar_catalogo, sender=modelo, dispatch_uid=f'catalogo_save_{modelo.__name__}')
+    post_delete.connect(_invalidar_catalogo, sender=modelo, dispatch_uid=f'catalogo_delete_{modelo.__name__}')
+
+
+# ========== CARRITO DE LA TIENDA ========== #
+
+def _sesion_iniciada(sender, request, user, **kwargs):
+    almacen_carrito.al_iniciar_sesion(request, user)
+
+
+def _sesion_cerrada(sender, request, user, **kwargs):
+    almacen_carrito.al_cerrar_sesion(request, user)
+
+
+user_logged_in.connect(_sesion_iniciada, dispatch_uid='carrito_sesion_iniciada')
+user_logged_out.connect(_sesion_cerrada, dispatch_uid='carrito_sesion_cerrada')
+
+
+# ========== CONFIGURACIÓN GENERAL ========== #
+
+def _configuracion_cambiada(sender, **kwargs):
+    """Este proceso relee la configuración activa (los demás al vencer su copia) y el catálogo se invalida"""
+    def invalidar():
+        invalidar_configuracion()
+        invalidar_catalogo()
+    transaction.on_commit(invalidar)
+
+
+post_save.connect(_configuracion_cambiada, sender=ConfiguracionGeneral, dispatch_uid='configuracion_save')
+post_delete.connect(_configuracion_cambiada, sender=ConfiguracionGeneral, dispatch_uid='configuracion_delete')
+
+
+# ========== REABASTECIMIENTO ========== #
+
+def _stock_guardado(sender, instance, raw=False, **kwargs):
+    """Un cambio de stock o de stock mínimo desde el panel puede poner o sacar el producto de la cola"""
+    if not raw:
+        revisar_stock([instance.pk])
+
+
+def _compra_guardada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.estado == 'CANCELADA':
+        compra_cancelada(instance)
+    elif instance.estado == 'RECIBIDA_COMPLETA':
+        compra_recibida(instance)
+
+
+post_save.connect(_stock_guardado, sender=Producto, dispatch_uid='reabastecimiento_producto_save')
+post_save.connect(_compra_guardada, sender=Compra, dispatch_uid='reabastecimiento_compra_save')
@@ -0,0 +1,217 @@
+"""
+Módulo de Sugerencias - Digit Soft
+Índice de prefijos en memoria para el autocompletado de la tienda (sin consultas por tecla)
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from .busqueda import normalizar
+
+
+MAXIMO_SUGERENCIAS = 8
+
+# Los cambios se buscan desde la última sincronización menos este margen: cubre transacciones
+# que se confirmaron después con una fecha_actualizacion anterior y relojes desfasados
+MARGEN_SINCRONIZACION = timedelta(seconds=60)
+
+_lock = threading.Lock()
+_claves = []       # Lista ordenada de (clave normalizada, (tipo, id))
+_entradas = {}     # (tipo, id) -> (texto a mostrar, claves)
+_estado = {'construido': None, 'sincronizado': None, 'revisado': None, 'reconstruyendo': False}
+
+
+def _claves_de(*textos):
+    """Claves de un texto: el texto completo y el resto a partir de cada palabra"""
+    claves = set()
+    for texto in textos:
+        palabras = normalizar(texto).split()
+        claves.update(' '.join(palabras[i:]) for i in range(len(palabras)))
+    return claves
+
+
+def _agregar(tipo, objeto_id, texto, *textos_indexados):
+    """Agrega o reemplaza una entrada del índice (se llama con el lock tomado)"""
+    _quitar(tipo, objeto_id)
+    entrada = (tipo, objeto_id)
+    claves = _claves_de(texto, *textos_indexados)
+    for clave in claves:
+        insort(_claves, (clave, entrada))
+    _entradas[entrada] = (texto, claves)
+
+
+def _quitar(tipo, objeto_id):
+    entrada = (tipo, objeto_id)
+    anterior = _entradas.pop(entrada, None)
+    if anterior is None:
+        return
+    for clave in anterior[1]:
+        posicion = bisect_left(_claves, (clave, entrada))
+        if posicion < len(_claves) and _claves[posicion] == (clave, entrada):
+            del _claves[posicion]
+
+
+def _url(tipo, objeto_id):
+    if tipo == 'marca':
+        return f"{reverse('administrador:tienda_publica')}?marca={objeto_id}"
+    return reverse('administrador:producto_detalle_tienda', args=[objeto_id])
+
+
+# ========== CONSTRUCCIÓN Y ACTUALIZACIÓN ========== #
+
+def reconstruir():
+    """Carga desde la base de datos todos los productos y marcas activos"""
+    from .models import Producto, Marca
+
+    # Lo que cambie mientras se lee se aplica en la siguiente sincronización
+    desde = timezone.now()
+    textos = [
+        ('producto', producto_id, (nombre, codigo))
+        for producto_id, nombre, codigo in Producto.objects.filter(activo=True)
+        .values_list('id', 'nombre', 'codigo_producto').iterator()
+    ] + [
+        ('marca', marca_id, (nombre,))
+        for marca_id, nombre in Marca.objects.filter(activa=True).values_list('id', 'nombre')
+    ]
+
+    claves = []
+    entradas = {}
+    for tipo, objeto_id, textos_objeto in textos:
+        entrada = (tipo, objeto_id)
+        claves_objeto = _claves_de(*textos_objeto)
+        entradas[entrada] = (textos_objeto[0], claves_objeto)
+        claves.extend((clave, entrada) for clave in claves_objeto)
+    claves.sort()
+
+    with _lock:
+        _claves[:] = claves
+        _entradas.clear()
+        _entradas.update(entradas)
+        _estado['construido'] = _estado['revisado'] = time.monotonic()
+        _estado['sincronizado'] = desde
+
+
+def _reconstruir_en_segundo_plano():
+    """Reconstruye en otro hilo; mientras tanto se sigue respondiendo con el índice anterior"""
+    try:
+        reconstruir()
+    finally:
+        _estado['reconstruyendo'] = False
+        connection.close()
+
+
+def sincronizar():
+    """
+    Aplica uno a uno los productos y marcas que otros procesos guardaron desde la última
+    sincronización (la base de datos es la fuente compartida). Los borrados físicos en otros
+    procesos se reflejan en la siguiente reconstrucción completa.
+    """
+    from .models import Producto, Marca
+
+    desde = timezone.now()
+    cambios_desde = _estado['sincronizado'] - MARGEN_SINCRONIZACION
+    productos = list(
+        Producto.objects.filter(fecha_actualizacion__gte=cambios_desde)
+        .values_list('id', 'nombre', 'codigo_producto', 'activo')
+    )
+    marcas = list(Marca.objects.filter(fecha_actualizacion__gte=cambios_desde).values_list('id', 'nombre', 'activa'))
+
+    with _lock:
+        for producto_id, nombre, codigo, activo in productos:
+            if activo:
+                _agregar('producto', producto_id, nombre, codigo)
+            else:
+                _quitar('producto', producto_id)
+        for marca_id, nombre, activa in marcas:
+            if activa:
+                _agregar('marca', marca_id, nombre)
+            else:
+                _quitar('marca', marca_id)
+        _estado['revisado'] = time.monotonic()
+        _estado['sincronizado'] = max(_estado['sincronizado'], desde)
+
+
+def actualizar_producto(producto):
+    with _lock:
+        if producto.activo:
+            _agregar('producto', producto.pk, producto.nombre, producto.codigo_producto)
+        else:
+            _quitar('producto', producto.pk)
+
+
+def quitar_producto(producto_id):
+    with _lock:
+        _quitar('producto', producto_id)
+
+
+def actualizar_marca(marca):
+    with _lock:
+        if marca.activa:
+            _agregar('marca', marca.pk, marca.nombre)
+        else:
+            _quitar('marca', marca.pk)
+
+
+def quitar_marca(marca_id):
+    with _lock:
+        _quitar('marca', marca_id)
+
+
+def _preparar():
+    """
+    Deja el índice listo para consultar. Solo la primera construcción bloquea la petición;
+    después se aplican los cambios recientes y la reconstrucción periódica corre en otro hilo.
+    """
+    if _estado['construido'] is None:
+        reconstruir()
+        return
+
+    ahora = time.monotonic()
+    antiguedad = getattr(settings, 'SUGERENCIAS_RECONSTRUIR_SEGUNDOS', 600)
+    if ahora - _estado['construido'] > antiguedad and not _estado['reconstruyendo']:
+        with _lock:
+            iniciar = not _estado['reconstruyendo']
+            _estado['reconstruyendo'] = True
+        if iniciar:
+            threading.Thread(target=_reconstruir_en_segundo_plano, daemon=True).start()
+
+    if ahora - _estado['revisado'] > getattr(settings, 'SUGERENCIAS_SINCRONIZAR_SEGUNDOS', 5):
+        sincronizar()
+
+
+# ========== CONSULTA ========== #
+
+def sugerir(texto, limite=MAXIMO_SUGERENCIAS):
+    """
+    Productos (por nombre o código) y marcas cuyo texto, o alguna de sus palabras,
+    empieza por `texto`. Se responde desde memoria con búsqueda binaria.
+    """
+    prefijo = ' '.join(normalizar(texto).split())
+    if not prefijo:
+        return []
+    _preparar()
+
+    resultado = []
+    vistos = set()
+    with _lock:
+        posicion = bisect_left(_claves, (prefijo,))
+        while posicion < len(_claves) and len(resultado) < limite:
+            clave, entrada = _claves[posicion]
+            if not clave.startswith(prefijo):
+                break
+            if entrada not in vistos:
+                vistos.add(entrada)
+                resultado.append(entrada)
+            posicion += 1
+        textos = [_entradas[entrada][0] for entrada in resultado]
+
+    return [
+        {'texto': texto, 'tipo': tipo, 'url': _url(tipo, objeto_id)}
+        for (tipo, objeto_id), texto in zip(resultado, textos)
+    ]
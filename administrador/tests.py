@@ -1,3 +1,1345 @@
-from django.test import TestCase
+import csv
+import re
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Cliente, Venta, Garantia, OrdenServicio, Compra, Marca, Proveedor, Producto, Carrito, ItemCarrito, ReservaStock,
+    ConfiguracionGeneral, ReabastecimientoSugerido, MovimientoInventario, ReporteJob, LineaCarrito, Factura,
+    VentaResumenDiario, VersionCache, Equipo
+)
+from . import metricas, reportes, versiones
+from .reportes import filtro_rango_fechas, procesar_reporte_job, rango_mes, solicitar_reporte
+from .metricas import metricas_dashboard
+from .paginacion import paginar
+from .busqueda import buscar_productos, indice_disponible
+from .facetas import calcular_facetas
+from .barrido_carritos import barrer_carritos
+from .reservas import liberar_vencidas
+from .configuracion import configuracion, invalidar_configuracion
+from .ecommerce import (
+    StockInsuficiente, emitir_garantias, generar_numero_factura, generar_numero_venta, reducir_stock_items,
+    reducir_stock_producto
+)
+from .secuencias import RangoNumeracionAgotado, reservar_numeros
+from .reabastecimiento import generar_compras, revisar_stock
+from .forms import ProductoForm
+from . import almacen_carrito, dinero, kardex, sugerencias
+
+
+def en_paralelo(funcion, hilos):
+    """Ejecuta `funcion` en varios hilos a la vez (cada uno con su conexión) y retorna sus errores"""
+    errores = []
+    barrera = threading.Barrier(hilos)
+
+    def ejecutar(numero):
+        try:
+            barrera.wait()
+            funcion(numero)
+        except Exception as error:
+            errores.append(error)
+        finally:
+            connection.close()
+
+    trabajadores = [threading.Thread(target=ejecutar, args=(numero,)) for numero in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return errores
+
+
+class SecuenciasTest(TransactionTestCase):
+    """Los números se reservan con un UPDATE atómico: únicos en paralelo y sin contar documentos"""
+
+    def test_numeros_unicos_en_paralelo(self):
+        numeros = []
+
+        def reservar(hilo):
+            for _ in range(25):
+                numeros.extend(reservar_numeros('T', '202610'))
+
+        self.assertEqual(en_paralelo(reservar, 8), [])
+        self.assertEqual(sorted(numeros), list(range(1, 201)))
+
+    def test_bloques_rango_y_sin_conteos(self):
+        with override_settings(SECUENCIAS_TAMANO_BLOQUE={'B': 10}):
+            self.assertEqual(list(reservar_numeros('B', '202610')), [1])
+            # El resto del bloque se reparte desde memoria
+            with self.assertNumQueries(0):
+                self.assertEqual(list(reservar_numeros('B', '202610', cantidad=3)), [2, 3, 4])
+
+        self.assertEqual(list(reservar_numeros('F', '', cantidad=2, desde=100, hasta=102)), [100, 101])
+        with self.assertRaises(RangoNumeracionAgotado):
+            reservar_numeros('F', '', cantidad=2, desde=100, hasta=102)
+        self.assertEqual(list(reservar_numeros('F', '', desde=100, hasta=102)), [102])
+
+        # Solo la creación de la secuencia consulta los documentos existentes
+        generar_numero_venta()
+        with CaptureQueriesContext(connection) as consultas:
+            generar_numero_venta()
+        tabla = Venta._meta.db_table
+        self.assertFalse(any(tabla in consulta['sql'] for consulta in consultas.captured_queries))
+
+
+class CompraConcurrenteTest(TransactionTestCase):
+    """Compras simultáneas del mismo producto: nunca se vende más de lo que hay"""
+
+    def setUp(self):
+        caches[settings.CARRITO_CACHE].clear()
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        self.producto = Producto.objects.create(
+            codigo_producto='H1', nombre='Portátil', descripcion='-', categoria='HARDWARE',
+            marca=marca, precio_compra=50, precio_venta=100, stock_actual=20
+        )
+
+    def test_200_descuentos_simultaneos_sin_sobreventa(self):
+        vendidos = []
+
+        def comprar(hilo):
+            try:
+                with transaction.atomic():
+                    reducir_stock_items([SimpleNamespace(producto_id=self.producto.pk, cantidad=1)])
+                vendidos.append(hilo)
+            except StockInsuficiente:
+                pass
+
+        self.assertEqual(en_paralelo(comprar, 200), [])
+        self.producto.refresh_from_db()
+        self.assertEqual((len(vendidos), self.producto.stock_actual), (20, 0))
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='SALIDA').count(), 20)
+
+    def test_procesar_compra_en_paralelo(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=5)
+        navegadores = []
+        for numero in range(12):
+            usuario = User.objects.create(username=f'comprador{numero}')
+            cliente = Cliente.objects.create(
+                user=usuario, tipo_documento='CC', numero_documento=f'70{numero}', nombres='Cliente',
+                telefono='3000000000', email=f'comprador{numero}@example.com', direccion='Calle 7',
+                ciudad='Cali', departamento='Valle'
+            )
+            identificador = almacen_carrito.carrito_de_cliente(cliente)
+            almacen_carrito.almacen().sumar(identificador, self.producto.pk, 1)
+            navegador = Client()
+            navegador.force_login(usuario)
+            navegadores.append(navegador)
+
+        destinos = []
+
+        def comprar(hilo):
+            respuesta = navegadores[hilo].post(reverse('administrador:procesar_compra'), {'metodo_pago': 'EFECTIVO'})
+            destinos.append(respuesta.url)
+
+        self.assertEqual(en_paralelo(comprar, len(navegadores)), [])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 0)
+        self.assertEqual(Venta.objects.count(), 5)
+        self.assertEqual(sum('/compra/exitosa/' in destino for destino in destinos), 5)
+
+
+class GarantiasTest(TestCase):
+    """Las garantías de una venta se emiten con un número de consultas fijo"""
+
+    def setUp(self):
+        usuario = User.objects.create(username='garantias')
+        cliente = Cliente.objects.create(
+            user=usuario, tipo_documento='CC', numero_documento='800', nombres='Cliente',
+            telefono='3000000000', email='garantias@example.com', direccion='Calle 8',
+            ciudad='Cali', departamento='Valle'
+        )
+        self.venta = Venta.objects.create(
+            numero_venta='V1', cliente=cliente, subtotal=0, impuestos=0, total=0, metodo_pago='EFECTIVO'
+        )
+        self.marca = Marca.objects.create(nombre='Epson', tipo_marca='EQUIPOS')
+
+    def items(self, lineas):
+        numero = Producto.objects.count()
+        return [
+            SimpleNamespace(producto=Producto.objects.create(
+                codigo_producto=f'G{numero + i}', nombre=f'Impresora {i}', descripcion='-',
+                categoria='HARDWARE', marca=self.marca, precio_compra=50, precio_venta=100
+            ))
+            for i in range(lineas)
+        ]
+
+    def test_consultas_constantes_y_numeros_unicos(self):
+        # La primera emisión crea la secuencia del día
+        emitir_garantias(self.venta, self.items(1))
+        pocos, muchos = self.items(2), self.items(40)
+        with CaptureQueriesContext(connection) as consultas_pocos:
+            emitir_garantias(self.venta, pocos)
+        with CaptureQueriesContext(connection) as consultas_muchos:
+            emitidas = emitir_garantias(self.venta, muchos)
+
+        self.assertEqual(len(consultas_pocos), len(consultas_muchos))
+        self.assertEqual(len(emitidas), 40)
+        numeros = list(Garantia.objects.values_list('numero_garantia', flat=True))
+        self.assertEqual(len(numeros), 43)
+        self.assertEqual(len(set(numeros)), 43)
+
+
+class ReportesEnSegundoPlanoTest(TestCase):
+    """Un reporte que quedó en proceso sin latidos (worker caído) se retoma en vez de esperarlo para siempre"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+    def test_job_abandonado_se_retoma(self):
+        job = solicitar_reporte('VENTAS', timezone.localdate(), timezone.localdate())
+        ReporteJob.objects.filter(pk=job.pk).update(
+            estado='PROCESANDO', fecha_latido=timezone.now() - timedelta(minutes=30)
+        )
+
+        # La misma solicitud no se queda con el job muerto: vuelve a la cola
+        self.assertEqual(solicitar_reporte('VENTAS', timezone.localdate(), timezone.localdate()).pk, job.pk)
+        self.assertEqual(ReporteJob.objects.get(pk=job.pk).estado, 'PENDIENTE')
+
+        # Un job en proceso con latido reciente no se toma dos veces
+        ReporteJob.objects.filter(pk=job.pk).update(estado='PROCESANDO', fecha_latido=timezone.now())
+        self.assertIsNone(procesar_reporte_job(job.pk))
+
+        ReporteJob.objects.filter(pk=job.pk).update(fecha_latido=timezone.now() - timedelta(minutes=30))
+        self.assertEqual(procesar_reporte_job(job.pk), 'COMPLETADO')
+        self.assertTrue(ReporteJob.objects.get(pk=job.pk).archivo.name.endswith('.csv'))
+
+
+class ExportacionCsvTest(TestCase):
+    """El CSV se envía por lotes: BOM y encabezados de inmediato, filas por lote y el total al final"""
+
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='1201', nombres='Ana', apellidos='Ruiz',
+            telefono='3000000000', email='csv@example.com', direccion='Calle 1', ciudad='Cali',
+            departamento='Valle'
+        )
+        for numero in range(25):
+            Venta.objects.create(
+                numero_venta=f'V{numero:03d}', cliente=cliente, subtotal=numero + 1, impuestos=0,
+                total=numero + 1, metodo_pago='EFECTIVO'
+            )
+        hoy = timezone.localdate().isoformat()
+        self.request = RequestFactory().get('/', {'fecha_inicio': hoy, 'fecha_fin': hoy})
+
+    def test_bom_encabezados_y_total_general(self):
+        respuesta = reportes.generar_reporte_ventas_csv(self.request)
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="reporte_ventas_', respuesta['Content-Disposition'])
+
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        filas = list(csv.reader(StringIO(contenido[1:])))
+        self.assertEqual(filas[0], [
+            'Número Venta', 'Fecha', 'Cliente', 'Vendedor', 'Subtotal', 'Descuento', 'Impuestos',
+            'Total', 'Método Pago', 'Estado'
+        ])
+        self.assertEqual(len(filas), 1 + 25 + 2)
+        # Las ventas más recientes primero
+        self.assertEqual((filas[1][0], filas[1][2], filas[1][3], filas[1][7]), ('V024', 'Ana Ruiz', 'N/A', '$25.00'))
+        self.assertEqual(filas[-2], [])
+        self.assertEqual(filas[-1], ['TOTAL GENERAL', '', '', '', '', '', '', '$325.00', '', ''])
+
+    def test_exportacion_grande_por_lotes(self):
+        with mock.patch.object(reportes, 'TAMANO_LOTE', 10):
+            partes = iter(reportes.generar_reporte_ventas_csv(self.request).streaming_content)
+            # El BOM y los encabezados salen antes de consultar las ventas
+            with self.assertNumQueries(0):
+                self.assertEqual(next(partes), '\ufeff'.encode())
+                self.assertTrue(next(partes).startswith('Número Venta'.encode()))
+            partes = list(partes)
+
+        # Dos lotes completos y el último con las 5 filas restantes, la línea vacía y el total
+        self.assertEqual([parte.count(b'\r\n') for parte in partes], [10, 10, 7])
+        self.assertTrue(partes[-1].startswith(b'V004,'))
+        self.assertIn(b'TOTAL GENERAL', partes[-1])
+
+
+class ResumenesReportesTest(TestCase):
+    """Los resúmenes de los reportes salen de una sola consulta agregada con los mismos números"""
+
+    def setUp(self):
+        marca = Marca.objects.create(nombre='Dell', tipo_marca='EQUIPOS')
+        for numero, (stock, minimo, precio) in enumerate([(0, 2, 100), (3, 5, Decimal('250.50')), (10, 5, 80), (7, 1, 40)]):
+            Producto.objects.create(
+                codigo_producto=f'S{numero}', nombre=f'Producto {numero}', descripcion='-', categoria='HARDWARE',
+                marca=marca, precio_compra=30, precio_venta=precio, stock_actual=stock, stock_minimo=minimo,
+                activo=numero != 3
+            )
+        for numero, tipo in enumerate(['NATURAL', 'NATURAL', 'JURIDICA']):
+            Cliente.objects.create(
+                tipo_documento='CC', numero_documento=f'130{numero}', tipo_cliente=tipo, nombres='Cliente',
+                razon_social='Empresa' if tipo == 'JURIDICA' else None, telefono='3000000000',
+                email=f'resumen{numero}@example.com', direccion='Calle 1', ciudad='Cali', departamento='Valle'
+            )
+        cliente = Cliente.objects.first()
+        equipo = Equipo.objects.create(
+            codigo_equipo='E1', nombre='Portátil', tipo_equipo='LAPTOP', marca=marca, modelo='XPS',
+            serial='SN1', cliente=cliente, estado_fisico='BUENO', especificaciones='-'
+        )
+        for numero, (estado, mano_obra, repuestos) in enumerate([('COMPLETADA', 50, Decimal('20.25')), ('PENDIENTE', 30, 0)]):
+            OrdenServicio.objects.create(
+                numero_orden=f'OS{numero}', cliente=cliente, equipo=equipo, descripcion_problema='-',
+                estado=estado, costo_mano_obra=mano_obra, costo_repuestos=repuestos,
+                total=Decimal(mano_obra) + Decimal(repuestos)
+            )
+
+    def test_inventario(self):
+        productos = list(Producto.objects.filter(activo=True))
+        # El cálculo anterior, recorriendo los productos
+        esperado = {
+            'total_productos': len(productos),
+            'productos_bajo_stock': sum(p.stock_actual <= p.stock_minimo for p in productos),
+            'productos_sin_stock': sum(p.stock_actual == 0 for p in productos),
+            'valor_inventario': sum(p.precio_venta * p.stock_actual for p in productos),
+        }
+        with self.assertNumQueries(1):
+            resumen = reportes.resumen_inventario()
+        self.assertEqual(resumen, esperado)
+        self.assertEqual(resumen['valor_inventario'], Decimal('1551.50'))
+
+    def test_clientes(self):
+        clientes = list(Cliente.objects.filter(activo=True))
+        esperado = {
+            'total_clientes': len(clientes),
+            'personas_naturales': sum(c.tipo_cliente == 'NATURAL' for c in clientes),
+            'personas_juridicas': sum(c.tipo_cliente == 'JURIDICA' for c in clientes),
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(reportes.resumen_clientes(), esperado)
+        self.assertEqual(esperado, {'total_clientes': 3, 'personas_naturales': 2, 'personas_juridicas': 1})
+
+    def test_servicios(self):
+        ordenes = list(OrdenServicio.objects.all())
+        esperado = {
+            'total_ordenes': len(ordenes),
+            'ordenes_completadas': sum(o.estado == 'COMPLETADA' for o in ordenes),
+            'total_mano_obra': sum(o.costo_mano_obra for o in ordenes),
+            'total_repuestos': sum(o.costo_repuestos for o in ordenes),
+            'total_general': sum(o.total for o in ordenes),
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(reportes.resumen_servicios(), esperado)
+        self.assertEqual(esperado['total_general'], Decimal('100.25'))
+
+        # Sin órdenes los totales son 0, no None
+        with self.assertNumQueries(1):
+            vacio = reportes.resumen_servicios(OrdenServicio.objects.filter(estado='CANCELADA'))
+        self.assertEqual((vacio['total_ordenes'], vacio['total_general']), (0, 0))
+
+
+class ExportacionXlsxTest(TestCase):
+    """El XLSX se envía lote a lote como un paquete válido, sin archivo temporal"""
+
+    def test_xlsx_en_streaming(self):
+        columnas = [('numero', 'n', 'texto'), ('cantidad', 'c', 'entero'),
+                    ('total', 't', 'decimal'), ('fecha', 'f', 'fecha_hora')]
+        fecha = timezone.make_aware(timezone.datetime(2024, 1, 2, 12, 0))
+        filas = [(f'V-{i} <&>\x01', i, Decimal('10.50'), fecha) for i in range(5)] + [(None, None, None, None)]
+
+        with mock.patch.object(reportes, 'TAMANO_LOTE', 2):
+            partes = list(reportes._contenido_xlsx(columnas, iter(filas)))
+        # Un envío por lote más el cierre del paquete
+        self.assertEqual(len(partes), 4)
+
+        with zipfile.ZipFile(BytesIO(b''.join(partes))) as paquete:
+            self.assertIsNone(paquete.testzip())
+            hoja = ElementTree.fromstring(paquete.read('xl/worksheets/sheet1.xml'))
+
+        ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        filas_xml = hoja.findall('x:sheetData/x:row', ns)
+        self.assertEqual(len(filas_xml), 7)
+        self.assertEqual(filas_xml[0].find('x:c/x:is/x:t', ns).text, 'numero')
+
+        celdas = {c.get('r'): c for c in filas_xml[1].findall('x:c', ns)}
+        self.assertEqual(celdas['A2'].find('x:is/x:t', ns).text, 'V-0 <&>')
+        self.assertEqual(celdas['B2'].find('x:v', ns).text, '0')
+        self.assertEqual(celdas['C2'].find('x:v', ns).text, '10.50')
+        self.assertEqual(celdas['C2'].get('s'), '1')
+        self.assertEqual(float(celdas['D2'].find('x:v', ns).text), 45293.5)
+        self.assertEqual(len(filas_xml[6].findall('x:c', ns)), 0)
+
+
+class RangosDeFechasTest(TestCase):
+    """Las métricas por fecha usan rangos semiabiertos y los índices compuestos"""
+
+    def assertUsaIndice(self, queryset, modelo):
+        if connection.vendor != 'sqlite':
+            self.skipTest('El formato del plan solo se verifica en SQLite')
+        plan = queryset.explain()
+        nombres = [indice.name for indice in modelo._meta.indexes]
+        self.assertTrue(
+            any(nombre in plan for nombre in nombres),
+            f'La consulta no usa los índices {nombres}:\n{plan}'
+        )
+
+    def test_ventas_del_mes_usa_indice(self):
+        inicio, fin = rango_mes()
+        ventas = Venta.objects.filter(fecha_venta__gte=inicio, fecha_venta__lt=fin)
+        self.assertUsaIndice(ventas, Venta)
+
+    def test_reporte_ventas_por_fechas_usa_indice(self):
+        ventas = Venta.objects.filter(
+            estado='COMPLETADA', **filtro_rango_fechas('fecha_venta', '2025-01-01', '2025-01-31')
+        )
+        self.assertUsaIndice(ventas, Venta)
+
+    def test_ordenes_por_estado_usa_indice(self):
+        ordenes = OrdenServicio.objects.filter(
+            estado='PENDIENTE', **filtro_rango_fechas('fecha_ingreso', '2025-01-01')
+        )
+        self.assertUsaIndice(ordenes, OrdenServicio)
+
+    def test_compras_por_estado_usa_indice(self):
+        compras = Compra.objects.filter(
+            estado='PENDIENTE', **filtro_rango_fechas('fecha_solicitud', None, '2025-01-31')
+        )
+        self.assertUsaIndice(compras, Compra)
+
+    def test_fecha_fin_incluye_el_dia_completo(self):
+        filtros = filtro_rango_fechas('fecha_venta', '2025-01-01', '2025-01-31')
+        self.assertEqual(filtros['fecha_venta__gte'].date().isoformat(), '2025-01-01')
+        self.assertEqual(filtros['fecha_venta__lt'].date().isoformat(), '2025-02-01')
+
+    def test_ventas_mes_no_cuenta_el_mismo_mes_de_otros_anios(self):
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='1001', nombres='Ana',
+            apellidos='Pérez', telefono='3000000000', email='ana@example.com',
+            direccion='Calle 1', ciudad='Bogotá', departamento='Cundinamarca'
+        )
+        ahora = timezone.now()
+        hace_un_anio = ahora.replace(year=ahora.year - 1, day=min(ahora.day, 28))
+        for numero, fecha in (('V1', ahora), ('V2', hace_un_anio)):
+            Venta.objects.create(
+                numero_venta=numero, cliente=cliente, fecha_venta=fecha,
+                subtotal=1, impuestos=0, total=1, metodo_pago='EFECTIVO'
+            )
+
+        self.assertEqual(metricas_dashboard()['stats']['ventas_mes'], 1)
+
+
+class MetricasReportesTest(TestCase):
+    """Las estadísticas del centro de reportes salen de una consulta UNION ALL y se invalidan al guardar"""
+
+    def setUp(self):
+        cache.clear()
+        marca = Marca.objects.create(nombre='Asus', tipo_marca='EQUIPOS')
+        self.productos = [
+            Producto.objects.create(
+                codigo_producto=f'M{numero}', nombre=f'Equipo {numero}', descripcion='-', categoria='HARDWARE',
+                marca=marca, precio_compra=50, precio_venta=100, stock_actual=stock, stock_minimo=2
+            )
+            for numero, stock in enumerate([1, 5, 8])
+        ]
+        self.cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='1401', nombres='Ana', telefono='3000000000',
+            email='metricas@example.com', direccion='Calle 1', ciudad='Cali', departamento='Valle'
+        )
+        for numero, total in enumerate([100, Decimal('50.50'), 30]):
+            Venta.objects.create(
+                numero_venta=f'VM{numero}', cliente=self.cliente, subtotal=total, impuestos=0, total=total,
+                metodo_pago='EFECTIVO'
+            )
+        # Lectura vigente de la versión: así solo se cuentan las consultas de las métricas
+        versiones.version(metricas.VERSION_METRICAS)
+
+    def test_una_consulta_con_los_mismos_numeros(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = metricas.metricas_reportes()
+        self.assertEqual(len(consultas), 1)
+        self.assertIn('UNION ALL', consultas[0]['sql'])
+
+        # Los mismos números que con una consulta por métrica
+        ventas = Venta.objects.filter(fecha_venta__date__gte=datos['fecha_inicio'])
+        self.assertEqual(datos['stats'], {
+            'total_ventas': ventas.count(),
+            'total_ingresos': ventas.aggregate(total=Sum('total'))['total'],
+            'promedio_venta': Decimal('60.17'),
+            'total_clientes': Cliente.objects.filter(activo=True).count(),
+            'total_productos': Producto.objects.filter(activo=True).count(),
+            'ordenes_completadas': OrdenServicio.objects.filter(estado='COMPLETADA').count(),
+            'productos_stock_bajo': Producto.objects.filter(activo=True, stock_actual__lte=F('stock_minimo')).count(),
+        })
+        self.assertEqual(
+            (datos['stats']['total_ventas'], datos['stats']['total_productos'], datos['stats']['productos_stock_bajo']),
+            (3, 3, 1)
+        )
+        self.assertIsInstance(datos['stats']['total_productos'], int)
+
+        # La segunda visita sale de la caché
+        with self.assertNumQueries(0):
+            self.assertEqual(metricas.metricas_reportes(), datos)
+
+    def test_guardar_producto_o_factura_invalida(self):
+        metricas.metricas_reportes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = self.productos[1]
+            producto.activo = False
+            producto.save()
+        self.assertEqual(metricas.metricas_reportes()['stats']['total_productos'], 2)
+
+        with self.assertNumQueries(0):
+            metricas.metricas_reportes()
+        with self.captureOnCommitCallbacks(execute=True):
+            Factura.objects.create(
+                numero_factura='FM1', cliente=self.cliente, venta=Venta.objects.first(), tipo_factura='VENTA',
+                subtotal=100, impuestos=0, total=100, fecha_vencimiento=timezone.localdate()
+            )
+        with self.assertNumQueries(1):
+            metricas.metricas_reportes()
+
+
+class ResumenVentasTest(TestCase):
+    """El resumen diario de ventas se mantiene con las señales y se puede reconstruir o llenar"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='1101', nombres='Ana', telefono='3000000000',
+            email='ana@example.com', direccion='Calle 1', ciudad='Bogotá', departamento='Cundinamarca'
+        )
+        self.hoy = timezone.localdate()
+
+    def vender(self, numero, total, **datos):
+        return Venta.objects.create(
+            numero_venta=numero, cliente=self.cliente, subtotal=total, impuestos=0, total=total,
+            metodo_pago='EFECTIVO', **datos
+        )
+
+    def resumen(self):
+        return {
+            (fila.fecha, fila.estado, fila.metodo_pago): (fila.cantidad_ventas, fila.total)
+            for fila in VentaResumenDiario.objects.exclude(cantidad_ventas=0)
+        }
+
+    def test_senales_mantienen_el_resumen(self):
+        primera = self.vender('V1', 100)
+        self.vender('V2', 50)
+        self.assertEqual(self.resumen(), {(self.hoy, 'PENDIENTE', 'EFECTIVO'): (2, Decimal('150.00'))})
+
+        # Un cambio de estado mueve la venta de fila; un borrado la descuenta
+        primera.estado = 'PAGADA'
+        primera.save()
+        self.assertEqual(self.resumen(), {
+            (self.hoy, 'PENDIENTE', 'EFECTIVO'): (1, Decimal('50.00')),
+            (self.hoy, 'PAGADA', 'EFECTIVO'): (1, Decimal('100.00')),
+        })
+        primera.delete()
+        self.assertEqual(self.resumen(), {(self.hoy, 'PENDIENTE', 'EFECTIVO'): (1, Decimal('50.00'))})
+
+    def test_comando_y_migracion_reconstruyen_el_historial(self):
+        self.vender('V1', 100)
+        self.vender('V2', 40, fecha_venta=timezone.now() - timedelta(days=3))
+        esperado = self.resumen()
+
+        # Ventas anteriores al resumen (o cambiadas con UPDATE): la tabla queda desfasada
+        VentaResumenDiario.objects.all().delete()
+        call_command('reconstruir_resumen_ventas', stdout=StringIO())
+        self.assertEqual(self.resumen(), esperado)
+
+        VentaResumenDiario.objects.update(total=0)
+        call_command('reconstruir_resumen_ventas', desde=self.hoy.isoformat(), stdout=StringIO())
+        self.assertEqual(self.resumen()[(self.hoy, 'PENDIENTE', 'EFECTIVO')], (1, Decimal('100.00')))
+
+        from django.apps import apps
+        VentaResumenDiario.objects.all().delete()
+        migracion = import_module('administrador.migrations.0018_llenar_resumen_ventas')
+        migracion.llenar_resumen(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.resumen(), esperado)
+
+
+class PaginacionKeysetTest(TestCase):
+    """Recorrer los listados por cursor devuelve cada fila una sola vez y en orden"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Nombres repetidos y apellidos nulos para probar empates y nulos en el orden
+        for i in range(23):
+            Cliente.objects.create(
+                tipo_documento='CC', numero_documento=f'20{i:02d}',
+                nombres=['Ana', 'Luis', 'Zoe'][i % 3], apellidos=[None, 'Díaz', 'Gómez'][(i // 3) % 3],
+                telefono='3000000000', email=f'cliente{i}@example.com',
+                direccion='Calle 1', ciudad='Bogotá', departamento='Cundinamarca'
+            )
+
+    def recorrer(self, url, enlace):
+        ids = []
+        while url:
+            pagina = paginar(RequestFactory().get(url), Cliente.objects.all())
+            ids.append([cliente.pk for cliente in pagina])
+            url = getattr(pagina, enlace) and '/' + getattr(pagina, enlace)
+        return ids
+
+    def test_recorrido_hacia_adelante_y_hacia_atras(self):
+        esperado = list(Cliente.objects.order_by(
+            F('nombres').asc(nulls_first=True), F('apellidos').asc(nulls_first=True), 'id'
+        ).values_list('pk', flat=True))
+
+        paginas = self.recorrer('/?por_pagina=5', 'url_siguiente')
+        self.assertEqual(sum(paginas, []), esperado)
+        self.assertEqual(len(paginas), 5)
+
+        # Desde la última página volviendo hacia atrás
+        ultima = paginar(RequestFactory().get('/?por_pagina=5'), Cliente.objects.all())
+        while ultima.url_siguiente:
+            ultima = paginar(RequestFactory().get('/' + ultima.url_siguiente), Cliente.objects.all())
+        paginas = self.recorrer('/' + ultima.url_anterior, 'url_anterior')
+        self.assertEqual(sum(reversed(paginas), []) + [cliente.pk for cliente in ultima], esperado)
+
+    def test_tamano_de_pagina_limitado(self):
+        pagina = paginar(RequestFactory().get('/?por_pagina=100000'), Cliente.objects.all())
+        self.assertEqual(len(pagina), 23)
+        self.assertEqual(pagina.total_texto, '23')
+
+
+class BusquedaProductosTest(TestCase):
+    """Búsqueda de la tienda: sin tildes, por prefijo, ordenada por relevancia y sincronizada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.marca = Marca.objects.create(nombre='Lógitech', tipo_marca='ACCESORIOS')
+        for nombre, descripcion in (
+            ('Cámara réflex', 'Incluye estuche para portátil'),
+            ('Portátil ThinkPad', 'Equipo de oficina'),
+            ('Mouse inalámbrico', 'Compatible con cualquier equipo'),
+        ):
+            Producto.objects.create(
+                nombre=nombre, descripcion=descripcion, categoria='HARDWARE', marca=cls.marca,
+                precio_compra=50, precio_venta=100
+            )
+
+    def buscar(self, texto):
+        return [producto.nombre for producto in buscar_productos(Producto.objects.all(), texto)]
+
+    def test_sin_tildes_y_por_prefijo(self):
+        self.assertEqual(self.buscar('camara'), ['Cámara réflex'])
+        self.assertEqual(self.buscar('INALAMB'), ['Mouse inalámbrico'])
+
+    def test_el_nombre_pesa_mas_que_la_descripcion(self):
+        self.assertEqual(self.buscar('portatil'), ['Portátil ThinkPad', 'Cámara réflex'])
+
+    def test_el_limite_se_aplica_despues_de_ordenar(self):
+        # Coincidencias débiles insertadas antes que la más relevante
+        for i in range(5):
+            Producto.objects.create(
+                nombre=f'Adaptador {i}', descripcion='Incluye cable', categoria='ACCESORIOS', marca=self.marca,
+                precio_compra=5, precio_venta=10
+            )
+        Producto.objects.create(
+            nombre='Cable HDMI', descripcion='2 metros', categoria='ACCESORIOS', marca=self.marca,
+            precio_compra=5, precio_venta=10
+        )
+        resultado = buscar_productos(Producto.objects.all(), 'cable', limite=2)
+        self.assertEqual([producto.nombre for producto in resultado][0], 'Cable HDMI')
+
+    def test_indice_sincronizado_al_guardar(self):
+        if not indice_disponible():
+            self.skipTest('El motor no tiene índice de texto completo')
+        self.marca.nombre = 'Genius'
+        self.marca.save()
+        self.assertEqual(len(self.buscar('genius')), 3)
+
+        Producto.objects.get(nombre='Mouse inalámbrico').delete()
+        self.assertEqual(len(self.buscar('genius')), 2)
+
+
+class SugerenciasTest(TestCase):
+    """El autocompletado responde desde memoria y se actualiza al guardar"""
+
+    def test_prefijo_de_cualquier_palabra_sin_consultas(self):
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        producto = Producto.objects.create(
+            nombre='Portátil ThinkPad', descripcion='Equipo', categoria='HARDWARE', marca=marca,
+            precio_compra=50, precio_venta=100
+        )
+        sugerencias.reconstruir()
+
+        with self.assertNumQueries(0):
+            self.assertEqual([s['texto'] for s in sugerencias.sugerir('think')], ['Portátil ThinkPad'])
+            self.assertEqual([s['tipo'] for s in sugerencias.sugerir('LENO')], ['marca'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.nombre = 'Cámara réflex'
+            producto.save()
+        self.assertEqual([s['texto'] for s in sugerencias.sugerir('camara r')], ['Cámara réflex'])
+        self.assertEqual(sugerencias.sugerir('portatil'), [])
+
+    def test_cambios_de_otro_proceso_sin_reconstruir(self):
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        producto = Producto.objects.create(
+            nombre='Portátil ThinkPad', descripcion='Equipo', categoria='HARDWARE', marca=marca,
+            precio_compra=50, precio_venta=100
+        )
+        sugerencias.reconstruir()
+
+        # Otro proceso renombra el producto: este proceso no recibe la señal
+        Producto.objects.filter(pk=producto.pk).update(nombre='Tablet Yoga', fecha_actualizacion=timezone.now())
+        sugerencias._estado['revisado'] -= settings.SUGERENCIAS_SINCRONIZAR_SEGUNDOS + 1
+        with mock.patch.object(sugerencias, 'reconstruir') as reconstruir:
+            self.assertEqual([s['texto'] for s in sugerencias.sugerir('yoga')], ['Tablet Yoga'])
+            self.assertEqual(sugerencias.sugerir('portatil'), [])
+        reconstruir.assert_not_called()
+
+        # Un índice vencido se reconstruye en otro hilo, sin bloquear la consulta
+        sugerencias._estado['construido'] -= settings.SUGERENCIAS_RECONSTRUIR_SEGUNDOS + 1
+        with mock.patch.object(sugerencias.threading, 'Thread') as hilo, self.assertNumQueries(0):
+            self.assertEqual([s['texto'] for s in sugerencias.sugerir('tablet')], ['Tablet Yoga'])
+        hilo.return_value.start.assert_called_once()
+        sugerencias._estado['reconstruyendo'] = False
+
+
+class FacetasTiendaTest(TestCase):
+    """Los conteos de cada faceta salen de una consulta y excluyen el filtro de la propia faceta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lenovo = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        cls.genius = Marca.objects.create(nombre='Genius', tipo_marca='ACCESORIOS')
+        for codigo, categoria, marca, precio, stock in (
+            ('P1', 'HARDWARE', cls.lenovo, 2500000, 3),
+            ('P2', 'HARDWARE', cls.lenovo, 800000, 0),
+            ('P3', 'ACCESORIOS', cls.genius, 50000, 10),
+            ('P4', 'ACCESORIOS', cls.lenovo, 90000, 1),
+        ):
+            Producto.objects.create(
+                codigo_producto=codigo, nombre=codigo, descripcion='-', categoria=categoria,
+                marca=marca, precio_compra=1, precio_venta=precio, stock_actual=stock
+            )
+
+    def conteos(self, facetas, faceta):
+        return {opcion['valor']: opcion['cantidad'] for opcion in facetas[faceta]}
+
+    def test_conteos_con_seleccion(self):
+        with self.assertNumQueries(1):
+            facetas = calcular_facetas(Producto.objects.all(), {'marca': self.lenovo.pk})
+
+        self.assertEqual(facetas['total'], 3)
+        self.assertEqual(self.conteos(facetas, 'categoria'), {'HARDWARE': 2, 'ACCESORIOS': 1})
+        # La faceta elegida sigue mostrando las demás marcas
+        self.assertEqual(self.conteos(facetas, 'marca'), {self.genius.pk: 1, self.lenovo.pk: 3})
+        self.assertEqual(self.conteos(facetas, 'precio'), {'0-100000': 1, '500000-1000000': 1, '1000000-3000000': 1})
+        self.assertEqual(self.conteos(facetas, 'en_stock'), {True: 2})
+
+        # Otra selección sobre la misma búsqueda reutiliza los grupos guardados en caché
+        with self.assertNumQueries(0):
+            facetas = calcular_facetas(Producto.objects.all(), {'precio': '0-100000', 'en_stock': True})
+        self.assertEqual(facetas['total'], 2)
+        self.assertEqual(self.conteos(facetas, 'precio')['1000000-3000000'], 1)
+
+
+class DineroTest(TestCase):
+    """Montos en centavos enteros e IVA leído de la configuración general"""
+
+    def setUp(self):
+        cache.clear()
+        # Sin copia de la configuración de otra prueba, ni dejar la de esta a las siguientes
+        invalidar_configuracion()
+        self.addCleanup(invalidar_configuracion)
+
+    def test_centavos_y_redondeo(self):
+        self.assertEqual(dinero.a_centavos(Decimal('10.005')), 1001)
+        self.assertEqual(dinero.a_centavos(0.1 + 0.2), 30)
+        self.assertEqual(dinero.impuesto(1050), 200)
+        self.assertEqual(dinero.formatear(-123456), '-$1,234.56')
+        self.assertEqual(
+            dinero.totales([9999, 250], [3, 2]),
+            {'subtotal': Decimal('304.97'), 'iva': Decimal('57.94'), 'total': Decimal('362.91')}
+        )
+
+    def test_iva_de_la_configuracion(self):
+        marca = Marca.objects.create(nombre='HP', tipo_marca='EQUIPOS')
+        producto = Producto.objects.create(
+            codigo_producto='D1', nombre='Mouse', descripcion='-', categoria='ACCESORIOS',
+            marca=marca, precio_compra=50, precio_venta=100
+        )
+        self.assertEqual(producto.precio_con_iva, Decimal('119.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            ConfiguracionGeneral.objects.create(
+                empresa_nombre='Digit Soft', empresa_nit='900', empresa_direccion='Calle 1',
+                empresa_telefono='3000000000', empresa_email='info@example.com', iva_porcentaje=5
+            )
+        self.assertEqual(producto.precio_con_iva, Decimal('105.00'))
+
+
+class ConfiguracionTest(TestCase):
+    """La configuración activa se lee de memoria y se relee al cambiar o al vencer la copia del proceso"""
+
+    def setUp(self):
+        cache.clear()
+        # Sin copia de la configuración de otra prueba, ni dejar la de esta a las siguientes
+        invalidar_configuracion()
+        self.addCleanup(invalidar_configuracion)
+
+    def crear(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ConfiguracionGeneral.objects.create(
+                empresa_nombre='Digit Soft', empresa_nit='900', empresa_direccion='Calle 1',
+                empresa_telefono='3000000000', empresa_email='info@example.com', **datos
+            )
+
+    def test_lectura_en_memoria_e_invalidacion(self):
+        self.assertIsNone(configuracion())
+        anterior = self.crear(prefijo_factura='FV', iva_porcentaje=Decimal('19.00'))
+        self.assertEqual((configuracion().prefijo_factura, configuracion().tasa_iva), ('FV', 1900))
+
+        # Los totales leen el IVA sin consultar la base de datos
+        with self.assertNumQueries(0):
+            self.assertEqual(dinero.totales([10000], [1])['iva'], Decimal('19.00'))
+
+        # Una nueva configuración activa reemplaza a la anterior en todos los procesos
+        self.crear(prefijo_factura='FE', iva_porcentaje=Decimal('5.00'))
+        self.assertEqual((configuracion().prefijo_factura, configuracion().tasa_iva), ('FE', 500))
+        self.assertTrue(generar_numero_factura().startswith('FE'))
+
+        # Un cambio hecho en otro proceso (sin señales aquí) se ve al vencer la copia local
+        ConfiguracionGeneral.objects.update(activa=False)
+        ConfiguracionGeneral.objects.filter(pk=anterior.pk).update(activa=True)
+        self.assertEqual(configuracion().prefijo_factura, 'FE')
+        with override_settings(CONFIGURACION_VIGENCIA_SEGUNDOS=0):
+            self.assertEqual(configuracion().prefijo_factura, 'FV')
+
+    def test_carrito_muestra_el_iva_configurado(self):
+        self.crear(iva_porcentaje=Decimal('16.00'))
+        producto = Producto.objects.create(
+            codigo_producto='I1', nombre='Mouse', descripcion='-', categoria='ACCESORIOS',
+            marca=Marca.objects.create(nombre='Genius', tipo_marca='ACCESORIOS'),
+            precio_compra=50, precio_venta=100, stock_actual=5
+        )
+        self.client.post(
+            reverse('main:agregar_al_carrito'), {'producto_id': producto.pk, 'cantidad': 1},
+            content_type='application/json'
+        )
+        contenido = self.client.get(reverse('main:carrito')).content.decode()
+        self.assertIn('IVA (16%)', contenido)
+        self.assertNotIn('IVA (19%)', contenido)
+
+    def test_numeracion_continua_desde_el_mayor_numero(self):
+        self.crear(prefijo_factura='FE', rango_numeracion_desde=1000, rango_numeracion_hasta=9999)
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='300', nombres='Cliente', telefono='3000000000',
+            email='facturas@example.com', direccion='Calle 3', ciudad='Cali', departamento='Valle'
+        )
+        # Facturas emitidas antes de la secuencia, con huecos, y otras de un prefijo parecido
+        for numero in ['FE1000', 'FE1001', 'FE1009', 'FEX5000', 'FE10A']:
+            Factura.objects.create(
+                numero_factura=numero, cliente=cliente, tipo_factura='VENTA', subtotal=100,
+                impuestos=19, total=119, fecha_vencimiento=timezone.localdate()
+            )
+        # Con 3 facturas el conteo habría repetido FE1003; se continúa después de la mayor
+        self.assertEqual(generar_numero_factura(), 'FE1010')
+        self.assertEqual(generar_numero_factura(), 'FE1011')
+
+
+class ReabastecimientoTest(TestCase):
+    """Los productos que bajan del mínimo se encolan una vez y se piden agrupados por proveedor"""
+
+    def setUp(self):
+        marca = Marca.objects.create(nombre='HP', tipo_marca='EQUIPOS')
+        self.proveedor = Proveedor.objects.create(
+            numero_documento='900100', razon_social='Mayorista', telefono='3000000000',
+            email='ventas@example.com', direccion='Calle 5', ciudad='Cali', departamento='Valle',
+            categoria_principal='HARDWARE', contacto_principal='Ana'
+        )
+        self.productos = [
+            Producto.objects.create(
+                codigo_producto=f'R{i}', nombre=f'Disco {i}', descripcion='-', categoria='HARDWARE',
+                marca=marca, precio_compra=50, precio_venta=100, stock_actual=8, stock_minimo=5,
+                stock_maximo=20, proveedor_principal=self.proveedor
+            )
+            for i in range(2)
+        ]
+
+    def test_cola_compra_y_reposicion(self):
+        from DigitSoft.models import Notificacion
+
+        for producto in self.productos:
+            reducir_stock_producto(producto, 4)
+        reducir_stock_producto(self.productos[0], 1)
+        self.assertEqual(Producto.objects.filter(bajo_stock=True).count(), 2)
+        self.assertEqual(ReabastecimientoSugerido.objects.filter(estado='PENDIENTE').count(), 2)
+        self.assertEqual(Notificacion.objects.filter(categoria='INVENTARIO').count(), 2)
+
+        # Una sola compra para el proveedor, con las cantidades para volver al stock máximo
+        compra, = generar_compras()
+        self.assertEqual((compra.proveedor, compra.estado, compra.subtotal), (self.proveedor, 'SOLICITUD', Decimal('1650.00')))
+        self.assertEqual(compra.reabastecimientos.filter(estado='EN_COMPRA').count(), 2)
+        self.assertEqual(generar_compras(), [])
+
+        # Reponer el stock por otra vía no cierra la sugerencia que ya va en la compra
+        producto = self.productos[0]
+        producto.refresh_from_db()
+        producto.stock_actual = 20
+        producto.save()
+        self.assertEqual(producto.reabastecimientos.get().estado, 'EN_COMPRA')
+        self.assertFalse(Producto.objects.get(pk=producto.pk).bajo_stock)
+
+        # Al recibir la compra todas sus unidades entran al kardex
+        compra.estado = 'RECIBIDA_COMPLETA'
+        with self.captureOnCommitCallbacks(execute=True):
+            compra.save()
+        self.assertEqual(compra.reabastecimientos.filter(estado='ATENDIDO').count(), 2)
+        self.assertEqual(
+            dict(Producto.objects.filter(pk__in=[p.pk for p in self.productos]).values_list('codigo_producto', 'stock_actual')),
+            {'R0': 37, 'R1': 20}
+        )
+        self.assertEqual(MovimientoInventario.objects.filter(compra=compra, tipo='ENTRADA').count(), 2)
+
+    def test_compra_cancelada_devuelve_a_la_cola_lo_que_sigue_bajo(self):
+        for producto in self.productos:
+            reducir_stock_producto(producto, 4)
+        compra, = generar_compras()
+        # Repuesto por otra vía mientras la compra estaba abierta
+        Producto.objects.filter(pk=self.productos[0].pk).update(stock_actual=20)
+        revisar_stock([self.productos[0].pk])
+
+        compra.estado = 'CANCELADA'
+        compra.save()
+        self.assertEqual(self.productos[0].reabastecimientos.get().estado, 'ATENDIDO')
+        self.assertEqual(self.productos[1].reabastecimientos.get().estado, 'PENDIENTE')
+
+    def test_migracion_encola_los_marcados_sin_sugerencia(self):
+        from django.apps import apps
+        from DigitSoft.models import Notificacion
+
+        migracion = import_module('administrador.migrations.0016_sugerencias_bajo_stock')
+        # Marcados por la migración 0011 sin pasar por revisar_stock; uno ya tiene su sugerencia
+        Producto.objects.filter(pk__in=[p.pk for p in self.productos]).update(stock_actual=3, bajo_stock=True)
+        ReabastecimientoSugerido.objects.create(
+            producto=self.productos[1], cantidad_sugerida=17, stock_detectado=3
+        )
+
+        migracion.encolar_bajo_stock(apps, SimpleNamespace(connection=connection))
+        sugerencia = ReabastecimientoSugerido.objects.get(producto=self.productos[0])
+        self.assertEqual((sugerencia.estado, sugerencia.cantidad_sugerida, sugerencia.proveedor), ('PENDIENTE', 17, self.proveedor))
+        self.assertEqual(ReabastecimientoSugerido.objects.count(), 2)
+        self.assertEqual(Notificacion.objects.filter(categoria='INVENTARIO').count(), 1)
+
+
+class KardexTest(TestCase):
+    """Cada cambio de stock queda en el kardex y el stock a una fecha parte de los saldos"""
+
+    def setUp(self):
+        marca = Marca.objects.create(nombre='HP', tipo_marca='EQUIPOS')
+        self.producto = Producto.objects.create(
+            codigo_producto='K1', nombre='Teclado', descripcion='-', categoria='ACCESORIOS',
+            marca=marca, precio_compra=50, precio_venta=100, stock_actual=10
+        )
+
+    def stock_kardex(self):
+        return MovimientoInventario.objects.filter(producto=self.producto).aggregate(total=Sum('cantidad'))['total']
+
+    def test_movimientos_sin_actualizaciones_perdidas(self):
+        leido = Producto.objects.get(pk=self.producto.pk)
+        self.assertTrue(reducir_stock_producto(self.producto, 3))
+        self.assertFalse(reducir_stock_producto(self.producto, 30))
+
+        # Una copia leída antes de la venta no pisa el stock al guardarse
+        leido.nombre = 'Teclado USB'
+        leido.save()
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock_actual, 7)
+
+        # El formulario ajusta por la diferencia con el stock que se vio al abrirlo (10 -> 12)
+        datos = {campo: valor for campo, valor in ProductoForm(instance=leido).initial.items() if valor is not None}
+        datos.update(stock_actual=12, stock_leido=10)
+        formulario = ProductoForm(datos, instance=Producto.objects.get(pk=self.producto.pk))
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        formulario.save()
+
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock_actual, 9)
+        self.assertEqual(self.stock_kardex(), 9)
+        self.assertEqual(
+            list(MovimientoInventario.objects.filter(producto=self.producto).order_by('pk').values_list('tipo', 'cantidad')),
+            [('ENTRADA', 10), ('SALIDA', -3), ('AJUSTE', 2)]
+        )
+
+    def test_edicion_desde_el_formulario_renderizado(self):
+        self.assertContains(self.client.get(reverse('administrador:producto_list')), 'name="stock_leido"')
+
+        url = reverse('administrador:producto_edit', args=[self.producto.pk])
+        pagina = self.client.get(url)
+        self.assertEqual(pagina.status_code, 200)
+        stock_leido = re.search(r'name="stock_leido" value="(\d+)"', pagina.content.decode()).group(1)
+        self.assertEqual(stock_leido, '10')
+
+        # Una venta mientras el formulario está abierto no se pierde al guardar 10 -> 12
+        reducir_stock_producto(self.producto, 3)
+        datos = {
+            campo: valor for campo, valor in pagina.context['form'].initial.items()
+            if valor is not None and campo != 'imagen'
+        }
+        datos.update(stock_actual=12, stock_leido=stock_leido)
+        respuesta = self.client.post(url, datos)
+        self.assertRedirects(respuesta, reverse('administrador:producto_list'), fetch_redirect_response=False)
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock_actual, 9)
+
+    def test_saldos_y_conciliacion(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        MovimientoInventario.objects.update(fecha=timezone.now() - timedelta(days=2))
+        kardex.cerrar_saldos(kardex.corte_del_dia(ayer))
+        reducir_stock_producto(self.producto, 4)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(kardex.stock_al(self.producto.pk, kardex.corte_del_dia(ayer)), 10)
+        self.assertEqual(kardex.stock_al(self.producto.pk, timezone.now()), 6)
+
+        # Un UPDATE por fuera del kardex aparece en la conciliación y --reparar lo registra
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=F('stock_actual') + 5)
+        salida = StringIO()
+        call_command('conciliar_inventario', stdout=salida)
+        self.assertIn('con diferencias: 1', salida.getvalue())
+        call_command('conciliar_inventario', '--reparar', stdout=StringIO())
+        self.assertEqual(self.stock_kardex(), 11)
+
+
+class CacheCatalogoTest(TestCase):
+    """Las páginas públicas se sirven desde caché a los anónimos y revalidan con ETag"""
+
+    def setUp(self):
+        cache.clear()
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        self.producto = Producto.objects.create(
+            nombre='Portátil ThinkPad', descripcion='Equipo', categoria='HARDWARE', marca=marca,
+            precio_compra=50, precio_venta=100, stock_actual=3
+        )
+
+    def test_pagina_guardada_condicional_e_invalidada(self):
+        cliente = Client(enforce_csrf_checks=True)
+        url = reverse('main:tienda')
+        cliente.get(url)
+        with self.assertNumQueries(0):
+            respuesta = cliente.get(url)
+        self.assertNotIn(b'csrf-catalogo-pendiente', respuesta.content)
+        self.assertEqual(cliente.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = 'Portátil IdeaPad'
+            self.producto.save()
+        respuesta_nueva = cliente.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(respuesta_nueva.status_code, 200)
+        self.assertIn('IdeaPad', respuesta_nueva.content.decode())
+
+    def test_version_compartida_con_otros_procesos(self):
+        url = reverse('main:tienda')
+        Client().get(url)
+        total_productos = metricas_dashboard()['stats']['total_productos']
+
+        # Otro proceso cambia el catálogo e invalida: solo la fila de versiones es compartida
+        Producto.objects.filter(pk=self.producto.pk).update(nombre='Portátil IdeaPad', activo=False)
+        for nombre in ('catalogo', 'metricas'):
+            VersionCache.objects.update_or_create(
+                nombre=nombre, defaults={'sello': int(timezone.now().timestamp() * 10**9)}
+            )
+
+        # Mientras la lectura del proceso está vigente se sirve lo guardado; al vencer, lo nuevo
+        self.assertIn('ThinkPad', Client().get(url).content.decode())
+        with override_settings(VERSIONES_CACHE_VIGENCIA_SEGUNDOS=0):
+            self.assertNotIn('ThinkPad', Client().get(url).content.decode())
+            self.assertEqual(metricas_dashboard()['stats']['total_productos'], total_productos - 1)
+
+
+class CarritoTiendaTest(TestCase):
+    """El carrito de la tienda pública modifica una línea por petición y la sesión solo guarda su id"""
+
+    def setUp(self):
+        caches[settings.CARRITO_CACHE].clear()
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        self.productos = [
+            Producto.objects.create(
+                codigo_producto=f'C{i}', nombre=f'Producto {i}', descripcion='-', categoria='HARDWARE',
+                marca=marca, precio_compra=50, precio_venta=100, stock_actual=5
+            )
+            for i in range(3)
+        ]
+
+    def post(self, cliente, nombre, **datos):
+        return cliente.post(reverse(nombre), datos, content_type='application/json').json()
+
+    def test_agregar_actualizar_y_eliminar(self):
+        cliente = Client()
+        for producto in self.productos:
+            self.post(cliente, 'main:agregar_al_carrito', producto_id=producto.pk, cantidad=2)
+        respuesta = self.post(cliente, 'main:agregar_al_carrito', producto_id=self.productos[0].pk, cantidad=10)
+
+        # Solo la línea modificada, con la cantidad limitada al stock
+        self.assertEqual(respuesta['linea'], {'producto_id': self.productos[0].pk, 'cantidad': 5})
+        self.assertEqual(respuesta['total_items'], 9)
+        self.assertNotIn('carrito', respuesta)
+        self.assertEqual(list(cliente.session.keys()), [almacen_carrito.CLAVE_SESION])
+
+        self.post(cliente, 'main:actualizar_carrito', producto_id=self.productos[1].pk, cantidad=1)
+        respuesta = self.post(cliente, 'main:eliminar_del_carrito', producto_id=self.productos[2].pk)
+        self.assertEqual(respuesta['total_items'], 6)
+
+        carrito = cliente.get(reverse('main:carrito')).context['carrito']
+        self.assertEqual(
+            {item['nombre']: item['cantidad'] for item in carrito.values()},
+            {'Producto 0': 5, 'Producto 1': 1}
+        )
+
+    def test_actualizar_solo_lineas_existentes_de_productos_activos(self):
+        cliente = Client()
+        self.post(cliente, 'main:agregar_al_carrito', producto_id=self.productos[0].pk, cantidad=1)
+        self.post(cliente, 'main:agregar_al_carrito', producto_id=self.productos[1].pk, cantidad=1)
+
+        # Un producto que no está en el carrito no se agrega ni aparta stock
+        respuesta = self.post(cliente, 'main:actualizar_carrito', producto_id=self.productos[2].pk, cantidad=3)
+        self.assertEqual((respuesta['linea']['cantidad'], respuesta['total_items']), (0, 2))
+        self.assertFalse(ReservaStock.objects.filter(producto=self.productos[2]).exists())
+
+        # Ni se aparta más stock de uno que se desactivó
+        Producto.objects.filter(pk=self.productos[1].pk).update(activo=False)
+        respuesta = self.post(cliente, 'main:actualizar_carrito', producto_id=self.productos[1].pk, cantidad=4)
+        self.assertEqual(respuesta['linea']['cantidad'], 1)
+        self.assertEqual(ReservaStock.objects.get(producto=self.productos[1]).cantidad, 1)
+
+    def test_carrito_del_cliente_se_guarda_por_lotes(self):
+        User.objects.create_user('ana', password='clave')
+        Cliente.objects.create(
+            user=User.objects.get(username='ana'), tipo_documento='CC', numero_documento='3001',
+            nombres='Ana', telefono='3000000000', email='ana@example.com', direccion='Calle 1',
+            ciudad='Bogotá', departamento='Cundinamarca'
+        )
+        cliente = Client()
+        self.post(cliente, 'main:agregar_al_carrito', producto_id=self.productos[0].pk, cantidad=2)
+
+        # Al iniciar sesión el carrito anónimo pasa al del cliente y se guarda
+        cliente.login(username='ana', password='clave')
+        carrito = Carrito.objects.get(estado='ACTIVO')
+        self.assertEqual((carrito.total_items, carrito.subtotal), (2, 200))
+
+        # Dentro del intervalo los cambios quedan en el almacén; al cerrar sesión se escriben
+        self.post(cliente, 'main:agregar_al_carrito', producto_id=self.productos[1].pk, cantidad=1)
+        self.post(cliente, 'main:actualizar_carrito', producto_id=self.productos[0].pk, cantidad=3)
+        carrito.refresh_from_db()
+        self.assertEqual(carrito.total_items, 2)
+
+        cliente.logout()
+        carrito.refresh_from_db()
+        self.assertEqual((carrito.total_items, carrito.subtotal), (4, 400))
+        self.assertEqual(
+            dict(carrito.items.values_list('producto_id', 'cantidad')),
+            {self.productos[0].pk: 3, self.productos[1].pk: 1}
+        )
+
+    def test_totales_por_delta_y_verificacion(self):
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='3002', nombres='Luis', telefono='3000000000',
+            email='luis@example.com', direccion='Calle 2', ciudad='Cali', departamento='Valle'
+        )
+        carrito = Carrito.objects.create(cliente=cliente)
+        carrito.actualizar_lineas({producto.pk: 2 for producto in self.productos})
+        carrito.actualizar_lineas({self.productos[0].pk: 4, self.productos[2].pk: 0})
+        self.assertEqual((carrito.total_items, carrito.subtotal), (6, 600))
+
+        # Guardar o eliminar un item aplica solo su diferencia al carrito
+        item = ItemCarrito.objects.get(carrito=carrito, producto=self.productos[1])
+        item.cantidad = 1
+        item.save()
+        carrito.refresh_from_db()
+        self.assertEqual((carrito.total_items, carrito.subtotal), (5, 500))
+
+        Carrito.objects.filter(pk=carrito.pk).update(total_items=0, subtotal=0)
+        call_command('verificar_carritos', reparar=True, stdout=StringIO())
+        carrito.refresh_from_db()
+        self.assertEqual((carrito.total_items, carrito.subtotal), (5, 500))
+
+    def test_cambios_no_sincronizados_sobreviven_a_perder_la_marca(self):
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='3004', nombres='Ivo', telefono='3000000000',
+            email='ivo@example.com', direccion='Calle 3', ciudad='Cali', departamento='Valle'
+        )
+        uno, dos = self.productos[0].pk, self.productos[1].pk
+        identificador = almacen_carrito.carrito_de_cliente(cliente)
+        almacen_carrito.almacen().fijar(identificador, uno, 3)
+        almacen_carrito.almacen().fijar(identificador, dos, 1)
+        almacen_carrito.sincronizar(identificador)
+
+        # El cliente reduce y quita líneas antes de la siguiente sincronización y la caché se pierde
+        almacen_carrito.almacen().fijar(identificador, uno, 1)
+        almacen_carrito.almacen().quitar(identificador, dos)
+        caches[settings.CARRITO_CACHE].clear()
+        self.assertEqual(almacen_carrito.almacen().lineas(almacen_carrito.carrito_de_cliente(cliente)), {uno: 1})
+
+        # Un carrito guardado que nunca pasó por el almacén se carga una sola vez
+        otro = Carrito.objects.create(cliente=cliente, estado='ABANDONADO')
+        ItemCarrito.objects.create(carrito=otro, producto=self.productos[2], cantidad=2, precio_unitario=100)
+        caches[settings.CARRITO_CACHE].clear()
+        self.assertEqual(
+            almacen_carrito.almacen().lineas(almacen_carrito.carrito_de_cliente(cliente)),
+            {uno: 1, self.productos[2].pk: 2}
+        )
+        almacen_carrito.almacen().quitar(identificador, self.productos[2].pk)
+        caches[settings.CARRITO_CACHE].clear()
+        self.assertEqual(almacen_carrito.almacen().lineas(almacen_carrito.carrito_de_cliente(cliente)), {uno: 1})
+
+    def test_barrido_de_carritos_abandonados_y_vencidos(self):
+        cliente = Cliente.objects.create(
+            tipo_documento='CC', numero_documento='3003', nombres='Eva', telefono='3000000000',
+            email='eva@example.com', direccion='Calle 3', ciudad='Cali', departamento='Valle'
+        )
+        identificador = almacen_carrito.carrito_de_cliente(cliente)
+        almacen_carrito.almacen().sumar(identificador, self.productos[0].pk, 2)
+        carrito = almacen_carrito.sincronizar(identificador)
+        ahora = timezone.now()
+
+        # Sin cambios desde hace dos días: abandonado; el próximo cambio del cliente lo recupera
+        Carrito.objects.filter(pk=carrito.pk).update(fecha_expiracion=ahora + timedelta(days=5))
+        self.assertEqual(barrer_carritos(), {'EXPIRADO': 0, 'ABANDONADO': 1})
+        almacen_carrito.almacen().sumar(identificador, self.productos[1].pk, 1)
+        self.assertEqual(almacen_carrito.sincronizar(identificador).pk, carrito.pk)
+        carrito.refresh_from_db()
+        self.assertEqual((carrito.estado, carrito.total_items), ('ACTIVO', 3))
+
+        # Vencido: se marca y su copia en el almacén se descarta
+        Carrito.objects.filter(pk=carrito.pk).update(fecha_expiracion=ahora - timedelta(hours=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(barrer_carritos(), {'EXPIRADO': 1, 'ABANDONADO': 0})
+        self.assertEqual(almacen_carrito.almacen().lineas(identificador), {})
+
+    def test_reservas_limitan_lo_disponible_y_vencen(self):
+        otro = Client()
+        primero = Client()
+        self.post(primero, 'main:agregar_al_carrito', producto_id=self.productos[0].pk, cantidad=4)
+        respuesta = self.post(otro, 'main:agregar_al_carrito', producto_id=self.productos[0].pk, cantidad=3)
+
+        # Solo queda una unidad sin reservar; un guardado completo del producto no pisa lo reservado
+        self.assertEqual(respuesta['linea']['cantidad'], 1)
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.stock_reservado = 0
+        producto.save()
+        producto.refresh_from_db()
+        self.assertEqual((producto.stock_reservado, producto.stock_disponible), (5, 0))
+
+        self.post(primero, 'main:eliminar_del_carrito', producto_id=self.productos[0].pk)
+        ReservaStock.objects.update(fecha_expiracion=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(liberar_vencidas(), 1)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock_reservado, 0)
+
+    def consultas_con_lineas(self, lineas):
+        """Consultas de ver el carrito del panel y de comprarlo con `lineas` productos distintos"""
+        numero = Cliente.objects.count() + 1
+        usuario = User.objects.create_user(f'cliente{numero}', password='clave')
+        cliente = Cliente.objects.create(
+            user=usuario, tipo_documento='CC', numero_documento=f'40{numero}', nombres='Cliente',
+            telefono='3000000000', email=f'cliente{numero}@example.com', direccion='Calle 4',
+            ciudad='Cali', departamento='Valle'
+        )
+        marca = self.productos[0].marca
+        identificador = almacen_carrito.carrito_de_cliente(cliente)
+        for i in range(lineas):
+            producto = Producto.objects.create(
+                codigo_producto=f'Q{numero}-{i}', nombre=f'Producto Q{i}', descripcion='-',
+                categoria='HARDWARE', marca=marca, precio_compra=50, precio_venta=100, stock_actual=5
+            )
+            almacen_carrito.almacen().sumar(identificador, producto.pk, 1)
+        almacen_carrito.sincronizar(identificador)
+
+        navegador = Client()
+        navegador.force_login(usuario)
+        with CaptureQueriesContext(connection) as ver:
+            respuesta = navegador.get(reverse('administrador:ver_carrito'))
+        self.assertEqual(respuesta.context['totales']['cantidad_items'], lineas)
+        with CaptureQueriesContext(connection) as comprar:
+            respuesta = navegador.post(reverse('administrador:procesar_compra'), {'metodo_pago': 'EFECTIVO'})
+        self.assertIn('/compra/exitosa/', respuesta.url)
+        return len(ver), len(comprar)
+
+    def test_consultas_del_carrito_no_dependen_de_las_lineas(self):
+        # La primera compra crea las secuencias de numeración del día
+        self.consultas_con_lineas(1)
+        self.assertEqual(self.consultas_con_lineas(2), self.consultas_con_lineas(12))
+
+
+class AlmacenCarritoTest(TestCase):
+    """Los almacenes de carritos modifican cada línea por separado y sin reescribir un índice compartido"""
+
+    def setUp(self):
+        caches[settings.CARRITO_CACHE].clear()
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        self.productos = [
+            Producto.objects.create(
+                codigo_producto=f'A{i}', nombre=f'Producto {i}', descripcion='-', categoria='HARDWARE',
+                marca=marca, precio_compra=50, precio_venta=100, stock_actual=5
+            ).pk
+            for i in range(3)
+        ]
+
+    def comprobar(self, almacen):
+        uno, dos, tres = self.productos
+        self.assertEqual(almacen.sumar('c1', uno, 2), 2)
+        self.assertEqual(almacen.sumar('c1', uno, 3), 5)
+        almacen.fijar('c1', dos, 4)
+        almacen.sumar('c1', tres, 1)
+        self.assertEqual(almacen.sumar('c1', tres, -1), 0)
+        self.assertEqual(almacen.lineas('c1'), {uno: 5, dos: 4})
+        self.assertEqual(almacen.total_items('c1'), 9)
+
+        # Una línea quitada y vuelta a agregar aparece una sola vez
+        almacen.quitar('c1', dos)
+        almacen.sumar('c1', dos, 1)
+        self.assertEqual(almacen.lineas('c1'), {uno: 5, dos: 1})
+        self.assertEqual(almacen.lineas('c2'), {})
+
+        almacen.vaciar('c1')
+        self.assertEqual(almacen.lineas('c1'), {})
+
+    def test_almacen_base_datos(self):
+        self.comprobar(almacen_carrito.AlmacenBaseDatos())
+
+    def test_almacen_cache(self):
+        self.comprobar(almacen_carrito.AlmacenCache('default'))
+
+    def test_almacen_incompleto_falla_al_crearse(self):
+        class SinVaciar(almacen_carrito.AlmacenCarrito):
+            lineas = sumar = fijar = quitar = lambda self, *args: None
+
+        with self.assertRaises(TypeError):
+            SinVaciar()
+
+    def test_purgar_carritos_sin_uso(self):
+        almacen = almacen_carrito.AlmacenBaseDatos()
+        almacen.sumar('viejo', self.productos[0], 1)
+        almacen.sumar('nuevo', self.productos[0], 1)
+        LineaCarrito.objects.filter(carrito='viejo').update(fecha_actualizacion=timezone.now() - timedelta(days=40))
+
+        self.assertEqual(almacen.purgar(30 * 24 * 3600), 1)
+        self.assertEqual(almacen.lineas('viejo'), {})
+        self.assertEqual(almacen.lineas('nuevo'), {self.productos[0]: 1})
+
+
+class AlmacenCarritoConcurrenteTest(TransactionTestCase):
+    """Varios procesos agregando el mismo producto al mismo carrito: ninguna unidad se pierde"""
+
+    def test_sumas_simultaneas_en_base_de_datos(self):
+        marca = Marca.objects.create(nombre='Lenovo', tipo_marca='EQUIPOS')
+        producto = Producto.objects.create(
+            codigo_producto='A1', nombre='Producto', descripcion='-', categoria='HARDWARE',
+            marca=marca, precio_compra=50, precio_venta=100, stock_actual=5
+        )
+        almacen = almacen_carrito.AlmacenBaseDatos()
+
+        errores = en_paralelo(lambda numero: almacen.sumar('compartido', producto.pk, 1), 10)
+        self.assertEqual(errores, [])
+        self.assertEqual(almacen.lineas('compartido'), {producto.pk: 10})
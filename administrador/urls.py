@@ -83,6 +83,10 @@ urlpatterns = [
     path('reportes/clientes/', views.reporte_clientes, name='reporte_clientes'),
     path('reportes/servicios/', views.reporte_servicios, name='reporte_servicios'),
     path('reportes/compras/', views.reporte_compras, name='reporte_compras'),
+    path('reportes/<str:tipo>/segundo-plano/', views.reporte_solicitar, name='reporte_solicitar'),
+    path('reportes/<str:tipo>/exportar/<str:formato>/', views.reporte_exportar, name='reporte_exportar'),
+    path('reportes/jobs/<int:job_id>/', views.reporte_estado, name='reporte_estado'),
+    path('reportes/jobs/<int:job_id>/descargar/', views.reporte_descargar, name='reporte_descargar'),
 
     # Ayuda
     path('ayuda/', views.ayuda_centro, name='ayuda_centro'),
@@ -95,6 +99,7 @@ urlpatterns = [
     # ========== E-COMMERCE URLS ========== #
     # Tienda Pública
     path('tienda/', views.tienda_publica, name='tienda_publica'),
+    path('tienda/sugerencias/', views.tienda_sugerencias, name='tienda_sugerencias'),
     path('tienda/producto/<int:producto_id>/', views.producto_detalle_tienda, name='producto_detalle_tienda'),
 
     # Carrito
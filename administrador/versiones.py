@@ -0,0 +1,59 @@
+"""
+Módulo de Versiones - Digit Soft
+Sellos de versión de las cachés que se invalidan por versión (catálogo, facetas y métricas).
+El sello vive en la base de datos, compartido por todos los procesos aunque la caché sea local;
+cada proceso reutiliza su lectura VERSIONES_CACHE_VIGENCIA_SEGUNDOS, así un cambio hecho en otro
+proceso llega a todos en ese plazo y el proceso que invalida ve el nuevo sello de inmediato.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+
+# Lecturas de este proceso: {nombre: (instante de lectura, sello)}
+_copias = {}
+_lock = threading.Lock()
+
+
+def _vigente(copia):
+    vigencia = getattr(settings, 'VERSIONES_CACHE_VIGENCIA_SEGUNDOS', 2)
+    return copia is not None and time.monotonic() - copia[0] < vigencia
+
+
+def version(nombre):
+    """Sello actual de la caché `nombre` (0 si nunca se invalidó)"""
+    copia = _copias.get(nombre)
+    if _vigente(copia):
+        return copia[1]
+
+    from .models import VersionCache
+
+    # El instante se toma antes de leer la fila: un cambio posterior se verá al vencer
+    leida = time.monotonic()
+    sello = VersionCache.objects.filter(nombre=nombre).values_list('sello', flat=True).first() or 0
+    with _lock:
+        _copias[nombre] = (leida, sello)
+    return sello
+
+
+def nueva_version(nombre):
+    """
+    Cambia el sello de la caché `nombre` para todos los procesos. El sello es el instante
+    actual en nanosegundos (el catálogo lo usa como fecha de su última modificación).
+    """
+    from .models import VersionCache
+
+    sello = time.time_ns()
+    fila = VersionCache.objects.filter(nombre=nombre)
+    if not fila.update(sello=sello):
+        try:
+            with transaction.atomic():
+                VersionCache.objects.create(nombre=nombre, sello=sello)
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            fila.update(sello=sello)
+    with _lock:
+        _copias[nombre] = (time.monotonic(), sello)
+    return sello
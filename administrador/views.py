@@ -1,39 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import F, Q
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 from .models import (
     Cliente, Tecnico, Marca, Proveedor, Producto,
     Equipo, ServicioTecnico, OrdenServicio, Compra, Carrito,
-    Venta, Garantia, Factura, Administrador
+    Venta, Garantia, Factura, Administrador, ReporteJob
 )
 from .forms import (
     ProductoForm, ClienteForm, ProveedorForm, MarcaForm, EquipoForm,
     TecnicoForm, OrdenServicioForm, VentaForm, CompraForm,
     GarantiaForm, ServicioTecnicoForm
 )
+from .metricas import metricas_dashboard, metricas_reportes
+from .paginacion import paginar
+from .busqueda import buscar_productos
+from .facetas import seleccion_desde, aplicar_facetas, calcular_facetas
+from .cache_catalogo import cache_catalogo
+from . import almacen_carrito, dinero, reservas
 
 # ========== DASHBOARD ========== #
 def dashboard(request):
     """Vista principal del dashboard del administrador"""
-    stats = {
-        'total_clientes': Cliente.objects.filter(activo=True).count(),
-        'total_productos': Producto.objects.filter(activo=True).count(),
-        'ordenes_pendientes': OrdenServicio.objects.filter(estado='PENDIENTE').count(),
-        'ventas_mes': Venta.objects.filter(fecha_venta__month=timezone.now().month).count(),
-        'equipos_reparacion': Equipo.objects.filter(estado_fisico='EN_REPARACION').count(),
-        'tecnicos_disponibles': Tecnico.objects.filter(estado_actual='DISPONIBLE').count(),
-    }
-
-    ordenes_recientes = OrdenServicio.objects.select_related('cliente', 'tecnico_asignado')[:5]
-    productos_stock_bajo = Producto.objects.filter(stock_actual__lte=F('stock_minimo'))[:5]
+    metricas = metricas_dashboard()
 
     context = {
-        'stats': stats,
-        'ordenes_recientes': ordenes_recientes,
-        'productos_stock_bajo': productos_stock_bajo,
+        'stats': metricas['stats'],
+        'ordenes_recientes': metricas['ordenes_recientes'],
+        'productos_stock_bajo': metricas['productos_stock_bajo'],
         'titulo': 'Dashboard - DigitSoft'
     }
     return render(request, 'administrador/dashboard.html', context)
@@ -52,10 +51,11 @@ def producto_list(request):
     else:
         form = ProductoForm()
 
-    productos = Producto.objects.select_related('marca', 'proveedor_principal').filter(activo=True)
+    pagina = paginar(request, Producto.objects.select_related('marca', 'proveedor_principal').filter(activo=True))
 
     context = {
-        'productos': productos,
+        'productos': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Productos'
     }
@@ -76,12 +76,15 @@ def producto_edit(request, producto_id):
 
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES, instance=producto)
-        if form.is_valid():
-            form.save()
-            messages.success(request, f'Producto "{producto.nombre}" actualizado correctamente.')
-            return redirect('administrador:producto_list')
-        else:
-            messages.error(request, 'Error al actualizar el producto.')
+        try:
+            if form.is_valid():
+                # El stock editado se guarda como ajuste en el kardex (ver Producto.save)
+                form.save()
+                messages.success(request, f'Producto "{producto.nombre}" actualizado correctamente.')
+                return redirect('administrador:producto_list')
+        except ValidationError as error:
+            form.add_error(None, error)
+        messages.error(request, 'Error al actualizar el producto.')
     else:
         form = ProductoForm(instance=producto)
 
@@ -115,10 +118,11 @@ def cliente_list(request):
     else:
         form = ClienteForm()
 
-    clientes = Cliente.objects.filter(activo=True)
+    pagina = paginar(request, Cliente.objects.filter(activo=True))
 
     context = {
-        'clientes': clientes,
+        'clientes': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Clientes'
     }
@@ -156,10 +160,11 @@ def proveedor_list(request):
     else:
         form = ProveedorForm()
 
-    proveedores = Proveedor.objects.filter(activo=True)
+    pagina = paginar(request, Proveedor.objects.filter(activo=True))
 
     context = {
-        'proveedores': proveedores,
+        'proveedores': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Proveedores'
     }
@@ -197,10 +202,11 @@ def marca_list(request):
     else:
         form = MarcaForm()
 
-    marcas = Marca.objects.filter(activa=True)
+    pagina = paginar(request, Marca.objects.filter(activa=True))
 
     context = {
-        'marcas': marcas,
+        'marcas': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Marcas'
     }
@@ -240,10 +246,11 @@ def equipo_list(request):
     else:
         form = EquipoForm()
 
-    equipos = Equipo.objects.select_related('cliente', 'marca').filter(activo=True)
+    pagina = paginar(request, Equipo.objects.select_related('cliente', 'marca').filter(activo=True))
 
     context = {
-        'equipos': equipos,
+        'equipos': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Equipos'
     }
@@ -281,10 +288,11 @@ def tecnico_list(request):
     else:
         form = TecnicoForm()
 
-    tecnicos = Tecnico.objects.filter(activo=True).order_by('apellidos', 'nombres')
+    pagina = paginar(request, Tecnico.objects.filter(activo=True).order_by('apellidos', 'nombres'))
 
     context = {
-        'tecnicos': tecnicos,
+        'tecnicos': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Técnicos'
     }
@@ -322,10 +330,11 @@ def orden_servicio_list(request):
     else:
         form = OrdenServicioForm()
 
-    ordenes = OrdenServicio.objects.select_related('cliente', 'tecnico_asignado', 'equipo').all()
+    pagina = paginar(request, OrdenServicio.objects.select_related('cliente', 'tecnico_asignado', 'equipo').all())
 
     context = {
-        'ordenes': ordenes,
+        'ordenes': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Gestión de Órdenes de Servicio'
     }
@@ -343,9 +352,10 @@ def orden_servicio_detail(request, orden_id):
 # ========== VENTAS ========== #
 def venta_list(request):
     """Vista para listar ventas"""
-    ventas = Venta.objects.select_related('cliente').all()
+    pagina = paginar(request, Venta.objects.select_related('cliente').all())
     context = {
-        'ventas': ventas,
+        'ventas': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Gestión de Ventas'
     }
     return render(request, 'administrador/venta_list.html', context)
@@ -362,10 +372,11 @@ def venta_detail(request, venta_id):
 # ========== COMPRAS ========== #
 def compra_list(request):
     """Vista para listar compras"""
-    compras = Compra.objects.select_related('proveedor').all()
+    pagina = paginar(request, Compra.objects.select_related('proveedor').all())
     proveedores = Proveedor.objects.filter(activo=True).order_by('razon_social')
     context = {
-        'compras': compras,
+        'compras': pagina.objetos,
+        'pagina': pagina,
         'proveedores': proveedores,
         'titulo': 'Gestión de Compras'
     }
@@ -383,9 +394,10 @@ def compra_detail(request, compra_id):
 def compras_pendientes(request):
     """Vista para compras pendientes"""
     estados_pendientes = ['SOLICITUD', 'COTIZACION', 'APROBADA', 'PEDIDO_ENVIADO']
-    compras = Compra.objects.filter(estado__in=estados_pendientes).select_related('proveedor')
+    pagina = paginar(request, Compra.objects.filter(estado__in=estados_pendientes).select_related('proveedor'))
     context = {
-        'compras': compras,
+        'compras': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Compras Pendientes'
     }
     return render(request, 'administrador/compras_pendientes.html', context)
@@ -393,9 +405,10 @@ def compras_pendientes(request):
 # ========== CARRITOS ========== #
 def carrito_list(request):
     """Vista para listar carritos"""
-    carritos = Carrito.objects.select_related('cliente').all()
+    pagina = paginar(request, Carrito.objects.select_related('cliente').all())
     context = {
-        'carritos': carritos,
+        'carritos': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Gestión de Carritos'
     }
     return render(request, 'administrador/carrito_list.html', context)
@@ -411,9 +424,10 @@ def carrito_detail(request, carrito_id):
 
 def carritos_abandonados(request):
     """Vista para carritos abandonados"""
-    carritos = Carrito.objects.filter(estado='ABANDONADO').select_related('cliente')
+    pagina = paginar(request, Carrito.objects.filter(estado='ABANDONADO').select_related('cliente'))
     context = {
-        'carritos': carritos,
+        'carritos': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Carritos Abandonados'
     }
     return render(request, 'administrador/carritos_abandonados.html', context)
@@ -445,9 +459,11 @@ def garantia_list(request):
 
     # Ordenar por fecha de vencimiento
     garantias = garantias.order_by('-fecha_inicio')
+    pagina = paginar(request, garantias)
 
     context = {
-        'garantias': garantias,
+        'garantias': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Gestión de Garantías'
     }
     return render(request, 'administrador/garantia_list.html', context)
@@ -464,9 +480,10 @@ def garantia_detail(request, garantia_id):
 # ========== FACTURACIÓN ========== #
 def facturacion_list(request):
     """Vista para listar facturas"""
-    facturas = Factura.objects.select_related('cliente').all()
+    pagina = paginar(request, Factura.objects.select_related('cliente').all())
     context = {
-        'facturas': facturas,
+        'facturas': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Gestión de Facturación'
     }
     return render(request, 'administrador/facturacion_list.html', context)
@@ -485,10 +502,11 @@ def servicio_tecnico_list(request):
     else:
         form = ServicioTecnicoForm()
 
-    servicios = ServicioTecnico.objects.filter(activo=True).order_by('categoria', 'nombre')
+    pagina = paginar(request, ServicioTecnico.objects.filter(activo=True).order_by('categoria', 'nombre'))
     
     context = {
-        'servicios': servicios,
+        'servicios': pagina.objetos,
+        'pagina': pagina,
         'form': form,
         'titulo': 'Catálogo de Servicios Técnicos'
     }
@@ -497,9 +515,10 @@ def servicio_tecnico_list(request):
 # ========== ADMINISTRADORES ========== #
 def administrador_list(request):
     """Vista para listar administradores"""
-    administradores = Administrador.objects.select_related('user').all()
+    pagina = paginar(request, Administrador.objects.select_related('user').all())
     context = {
-        'administradores': administradores,
+        'administradores': pagina.objetos,
+        'pagina': pagina,
         'titulo': 'Gestión de Administradores'
     }
     return render(request, 'administrador/administrador_list.html', context)
@@ -509,13 +528,8 @@ def tienda_list(request):
     """Vista para gestionar productos de la tienda online"""
     productos = Producto.objects.filter(activo=True).select_related('marca', 'proveedor_principal')
 
-    # Estadísticas de la tienda
-    stats = {
-        'total_productos': productos.count(),
-        'productos_bajo_stock': productos.filter(stock_actual__lte=models.F('stock_minimo')).count(),
-        'productos_sin_stock': productos.filter(stock_actual=0).count(),
-        'valor_inventario': sum(p.precio_venta * p.stock_actual for p in productos),
-    }
+    # Estadísticas de la tienda (una sola consulta)
+    stats = resumen_inventario(productos)
 
     context = {
         'productos': productos,
@@ -542,36 +556,22 @@ from .reportes import (
     generar_reporte_clientes_csv,
     generar_reporte_servicios_csv,
     generar_reporte_compras_csv,
-    obtener_estadisticas_ventas
+    resumen_inventario,
+    solicitar_reporte,
+    exportar_reporte_tipado,
+    REPORTES_EN_SEGUNDO_PLANO,
+    EXPORTACIONES_TIPADAS,
+    FORMATOS_TIPADOS
 )
 
 def reportes_dashboard(request):
     """Dashboard principal de reportes"""
-    from datetime import datetime, timedelta
-
-    # Fecha por defecto: último mes
-    fecha_fin = timezone.now()
-    fecha_inicio = fecha_fin - timedelta(days=30)
-
-    # Estadísticas generales
-    stats_ventas = obtener_estadisticas_ventas(fecha_inicio, fecha_fin)
-
-    stats = {
-        'total_ventas': stats_ventas.get('total_ventas', 0),
-        'total_ingresos': stats_ventas.get('total_ingresos', 0) or 0,
-        'promedio_venta': stats_ventas.get('promedio_venta', 0) or 0,
-        'total_clientes': Cliente.objects.filter(activo=True).count(),
-        'total_productos': Producto.objects.filter(activo=True).count(),
-        'ordenes_completadas': OrdenServicio.objects.filter(estado='COMPLETADA').count(),
-        'productos_stock_bajo': Producto.objects.filter(
-            stock_actual__lte=models.F('stock_minimo')
-        ).count(),
-    }
+    metricas = metricas_reportes()
 
     context = {
-        'stats': stats,
-        'fecha_inicio': fecha_inicio,
-        'fecha_fin': fecha_fin,
+        'stats': metricas['stats'],
+        'fecha_inicio': metricas['fecha_inicio'],
+        'fecha_fin': metricas['fecha_fin'],
         'titulo': 'Centro de Reportes'
     }
     return render(request, 'administrador/reportes_dashboard.html', context)
@@ -596,6 +596,75 @@ def reporte_compras(request):
     """Vista para generar reporte de compras"""
     return generar_reporte_compras_csv(request)
 
+def reporte_exportar(request, tipo, formato):
+    """Exporta un reporte con columnas tipadas (Arrow, Parquet o XLSX) para análisis"""
+    tipo = tipo.upper()
+    if tipo not in EXPORTACIONES_TIPADAS or formato not in FORMATOS_TIPADOS:
+        messages.error(request, 'Formato de exportación no válido.')
+        return redirect('administrador:reportes_dashboard')
+
+    try:
+        return exportar_reporte_tipado(
+            tipo,
+            formato,
+            request.GET.get('fecha_inicio'),
+            request.GET.get('fecha_fin')
+        )
+    except ImportError:
+        messages.error(request, f'La exportación en {formato.upper()} requiere instalar "pyarrow".')
+        return redirect('administrador:reportes_dashboard')
+
+def _estado_reporte_job(job):
+    """Datos de un reporte en segundo plano para el polling del navegador"""
+    datos = {
+        'id': job.id,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'url_estado': reverse('administrador:reporte_estado', args=[job.id]),
+    }
+    if job.estado == 'COMPLETADO':
+        datos['url_descarga'] = reverse('administrador:reporte_descargar', args=[job.id])
+    elif job.estado == 'ERROR':
+        datos['error'] = job.mensaje_error
+    return datos
+
+def reporte_solicitar(request, tipo):
+    """Encola un reporte para generarse en segundo plano (o reutiliza uno existente)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    tipo = tipo.upper()
+    if tipo not in REPORTES_EN_SEGUNDO_PLANO:
+        return JsonResponse({'error': 'Tipo de reporte no válido'}, status=404)
+
+    try:
+        fecha_inicio = parse_date(request.POST.get('fecha_inicio') or '')
+        fecha_fin = parse_date(request.POST.get('fecha_fin') or '')
+    except ValueError:
+        return JsonResponse({'error': 'Rango de fechas no válido'}, status=400)
+
+    job = solicitar_reporte(
+        tipo,
+        fecha_inicio,
+        fecha_fin,
+        usuario=request.user if request.user.is_authenticated else None
+    )
+    return JsonResponse(_estado_reporte_job(job))
+
+def reporte_estado(request, job_id):
+    """Estado de un reporte en segundo plano"""
+    job = get_object_or_404(ReporteJob, id=job_id)
+    return JsonResponse(_estado_reporte_job(job))
+
+def reporte_descargar(request, job_id):
+    """Descarga el archivo de un reporte generado en segundo plano"""
+    job = get_object_or_404(ReporteJob, id=job_id, estado='COMPLETADO')
+    return FileResponse(
+        job.archivo.open('rb'),
+        as_attachment=True,
+        filename=os.path.basename(job.archivo.name)
+    )
+
 
 # ========== MÓDULO DE AYUDA ========== #
 def ayuda_centro(request):
@@ -771,52 +840,53 @@ def backup_list(request):
 
 # ========== E-COMMERCE - TIENDA ONLINE ========== #
 from .ecommerce import (
-    calcular_totales_carrito,
+    leer_carrito,
     verificar_stock_disponible,
     reducir_stock_producto,
+    reducir_stock_items,
+    StockInsuficiente,
     generar_numero_venta,
     generar_numero_factura,
-    generar_numero_garantia
+    generar_numero_garantia,
+    emitir_garantias
 )
 from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
 
+@cache_catalogo
 def tienda_publica(request):
     """Tienda pública accesible para todos los usuarios"""
     # Obtener parámetros de búsqueda y filtros
     busqueda = request.GET.get('q', '')
-    categoria = request.GET.get('categoria', '')
-    marca_id = request.GET.get('marca', '')
+    seleccion = seleccion_desde(request.GET)
 
-    # Filtrar productos activos y con stock
+    # Filtrar productos activos
     productos = Producto.objects.filter(activo=True).select_related('marca')
 
     if busqueda:
-        productos = productos.filter(
-            Q(nombre__icontains=busqueda) |
-            Q(descripcion__icontains=busqueda) |
-            Q(codigo_producto__icontains=busqueda)
-        )
-
-    if categoria:
-        productos = productos.filter(categoria=categoria)
+        productos = buscar_productos(productos, busqueda)
 
-    if marca_id:
-        productos = productos.filter(marca_id=marca_id)
-
-    # Obtener categorías y marcas para filtros
-    categorias = Producto.CATEGORIA_CHOICES
-    marcas = Marca.objects.filter(activa=True)
+    # Conteos de cada faceta sobre la búsqueda, antes de aplicar los filtros elegidos
+    facetas = calcular_facetas(productos, seleccion)
+    productos = aplicar_facetas(productos, seleccion)
 
     context = {
         'productos': productos,
-        'categorias': categorias,
-        'marcas': marcas,
+        'facetas': facetas,
+        'total_productos': facetas['total'],
         'busqueda': busqueda,
-        'categoria_actual': categoria,
+        'categoria_actual': seleccion.get('categoria', ''),
         'titulo': 'Tienda Online - Digit Soft'
     }
     return render(request, 'administrador/tienda_publica.html', context)
 
+def tienda_sugerencias(request):
+    """API de autocompletado de la tienda: responde desde memoria, sin consultar la base de datos"""
+    from .sugerencias import sugerir
+    return JsonResponse({'sugerencias': sugerir(request.GET.get('q', ''))})
+
+@cache_catalogo
 def producto_detalle_tienda(request, producto_id):
     """Vista detallada de un producto en la tienda"""
     producto = get_object_or_404(Producto, id=producto_id, activo=True)
@@ -850,28 +920,23 @@ def agregar_al_carrito(request, producto_id):
             except Cliente.DoesNotExist:
                 messages.error(request, 'Debes tener un perfil de cliente para comprar.')
                 return redirect('administrador:tienda_publica')
-
-            carrito, created = Carrito.objects.get_or_create(
-                cliente=cliente,
-                estado='ACTIVO'
-            )
         else:
             messages.error(request, 'Debes iniciar sesión para agregar productos al carrito.')
             return redirect('autenticacion:login')
 
-        # Agregar o actualizar item en el carrito
-        from administrador.models import ItemCarrito
-        item, created = ItemCarrito.objects.get_or_create(
-            carrito=carrito,
-            producto=producto,
-            defaults={'cantidad': cantidad, 'precio_unitario': producto.precio_venta}
-        )
+        # El carrito se modifica en el almacén; la tabla se actualiza por lotes
+        carrito_id = almacen_carrito.carrito_de_cliente(cliente)
+        nueva_cantidad = almacen_carrito.almacen().sumar(carrito_id, producto.pk, cantidad)
 
-        if not created:
-            item.cantidad += cantidad
-            item.save()
+        # La línea aparta su stock; si otros carritos ya reservaron el resto, se ajusta
+        reservada = reservas.reservar(carrito_id, producto.pk, nueva_cantidad)
+        if reservada < nueva_cantidad:
+            almacen_carrito.almacen().fijar(carrito_id, producto.pk, reservada)
+        almacen_carrito.registrar_cambio(carrito_id)
 
-        carrito.actualizar_totales()
+        if reservada < nueva_cantidad:
+            messages.warning(request, f'Solo quedan {reservada} unidades de {producto.nombre} disponibles para tu carrito.')
+            return redirect('administrador:ver_carrito')
         messages.success(request, f'{producto.nombre} agregado al carrito correctamente.')
         return redirect('administrador:ver_carrito')
 
@@ -885,9 +950,10 @@ def ver_carrito(request):
 
     try:
         cliente = Cliente.objects.get(user=request.user)
-        carrito = Carrito.objects.get(cliente=cliente, estado='ACTIVO')
-        items = carrito.items.all()
-        totales = calcular_totales_carrito(items)
+        carrito = almacen_carrito.sincronizar(almacen_carrito.carrito_de_cliente(cliente))
+        if carrito is None:
+            raise Carrito.DoesNotExist
+        items, totales = leer_carrito(carrito)
     except (Cliente.DoesNotExist, Carrito.DoesNotExist):
         items = []
         totales = {'subtotal': 0, 'iva': 0, 'total': 0, 'cantidad_items': 0}
@@ -897,6 +963,7 @@ def ver_carrito(request):
         'carrito': carrito,
         'items': items,
         'totales': totales,
+        'iva_porcentaje': dinero.porcentaje_iva(),
         'titulo': 'Mi Carrito'
     }
     return render(request, 'administrador/ver_carrito.html', context)
@@ -912,86 +979,71 @@ def procesar_compra(request):
 
     try:
         cliente = Cliente.objects.get(user=request.user)
-        carrito = Carrito.objects.get(cliente=cliente, estado='ACTIVO')
-        items = carrito.items.all()
+        carrito_id = almacen_carrito.carrito_de_cliente(cliente)
+        almacen_carrito.sincronizar(carrito_id)
+
+        # Toda la compra es una sola transacción: o se crean venta, factura,
+        # garantías y descuento de stock, o no se crea nada
+        with transaction.atomic():
+            # Bloquear el carrito evita que un doble envío lo convierta dos veces
+            carrito = Carrito.objects.select_for_update().get(cliente=cliente, estado='ACTIVO')
+            items, totales = leer_carrito(carrito)
+
+            if not items:
+                messages.error(request, 'Tu carrito está vacío.')
+                return redirect('administrador:ver_carrito')
 
-        if not items.exists():
-            messages.error(request, 'Tu carrito está vacío.')
-            return redirect('administrador:ver_carrito')
+            metodo_pago = request.POST.get('metodo_pago', 'EFECTIVO')
 
-        # Verificar stock de todos los productos
-        for item in items:
-            if not verificar_stock_disponible(item.producto, item.cantidad):
-                messages.error(request, f'No hay suficiente stock de {item.producto.nombre}')
-                return redirect('administrador:ver_carrito')
+            # 1. CREAR VENTA
+            venta = Venta.objects.create(
+                numero_venta=generar_numero_venta(),
+                cliente=cliente,
+                vendedor=None,  # Venta online
+                subtotal=totales['subtotal'],
+                descuento=Decimal('0.00'),
+                impuestos=totales['iva'],
+                total=totales['total'],
+                metodo_pago=metodo_pago,
+                estado='PAGADA' if metodo_pago != 'CREDITO' else 'CREDITO'
+            )
 
-        # Calcular totales
-        totales = calcular_totales_carrito(items)
-        metodo_pago = request.POST.get('metodo_pago', 'EFECTIVO')
-
-        # 1. CREAR VENTA
-        venta = Venta.objects.create(
-            numero_venta=generar_numero_venta(),
-            cliente=cliente,
-            vendedor=None,  # Venta online
-            subtotal=totales['subtotal'],
-            descuento=Decimal('0.00'),
-            impuestos=totales['iva'],
-            total=totales['total'],
-            metodo_pago=metodo_pago,
-            estado='PAGADA' if metodo_pago != 'CREDITO' else 'CREDITO'
-        )
+            # 2. DESCONTAR STOCK DE TODOS LOS PRODUCTOS (UPDATE condicional), con sus salidas
+            # en el kardex a nombre de la venta. Las reservas del carrito se devuelven en la
+            # misma transacción y pasan a ser la venta; si falta stock se revierte todo
+            reservas.liberar(carrito_id)
+            reducir_stock_items(items, venta=venta)
 
-        # 2. CREAR DETALLES DE VENTA Y REDUCIR STOCK
-        for item in items:
-            # Crear detalle de venta (si tienes el modelo DetalleVenta)
-            # DetalleVenta.objects.create(...)
-
-            # Reducir stock
-            reducir_stock_producto(item.producto, item.cantidad)
-
-        # 3. CREAR FACTURA
-        factura = Factura.objects.create(
-            numero_factura=generar_numero_factura(),
-            cliente=cliente,
-            venta=venta,
-            tipo_factura='VENTA',
-            estado='EMITIDA',
-            subtotal=totales['subtotal'],
-            descuento=Decimal('0.00'),
-            impuestos=totales['iva'],
-            total=totales['total'],
-            fecha_vencimiento=(timezone.now() + timedelta(days=30)).date()
-        )
+            # 3. CREAR FACTURA
+            factura = Factura.objects.create(
+                numero_factura=generar_numero_factura(),
+                cliente=cliente,
+                venta=venta,
+                tipo_factura='VENTA',
+                estado='EMITIDA',
+                subtotal=totales['subtotal'],
+                descuento=Decimal('0.00'),
+                impuestos=totales['iva'],
+                total=totales['total'],
+                fecha_vencimiento=(timezone.now() + timedelta(days=30)).date()
+            )
+
+            # 4. CREAR GARANTÍAS PARA CADA PRODUCTO (un solo INSERT)
+            emitir_garantias(venta, items)
 
-        # 4. CREAR GARANTÍAS PARA CADA PRODUCTO
-        garantias_creadas = []
-        for item in items:
-            if item.producto.garantia_meses > 0:
-                garantia = Garantia.objects.create(
-                    numero_garantia=generar_numero_garantia(),
-                    producto=item.producto,
-                    cliente=cliente,
-                    venta=venta,
-                    tipo_garantia='FABRICANTE',
-                    fecha_inicio=timezone.now().date(),
-                    fecha_vencimiento=(timezone.now() + timedelta(days=item.producto.garantia_meses * 30)).date(),
-                    duracion_meses=item.producto.garantia_meses,
-                    estado='VIGENTE',
-                    condiciones=f'Garantía del fabricante para {item.producto.nombre}',
-                    cobertura='Defectos de fabricación',
-                    exclusiones='Daños por mal uso o accidentes'
-                )
-                garantias_creadas.append(garantia)
-
-        # 5. MARCAR CARRITO COMO CONVERTIDO
-        carrito.estado = 'CONVERTIDO'
-        carrito.venta_generada = venta
-        carrito.save()
+            # 5. MARCAR CARRITO COMO CONVERTIDO
+            carrito.estado = 'CONVERTIDO'
+            carrito.venta_generada = venta
+            carrito.save()
+            transaction.on_commit(lambda: almacen_carrito.descartar(carrito_id))
 
         messages.success(request, '¡Compra realizada exitosamente!')
         return redirect('administrador:compra_exitosa', venta_id=venta.id)
 
+    except StockInsuficiente as e:
+        messages.error(request, f'No hay suficiente stock de {e}')
+        return redirect('administrador:ver_carrito')
+
     except Exception as e:
         messages.error(request, f'Error al procesar la compra: {str(e)}')
         return redirect('administrador:ver_carrito')
@@ -1012,12 +1064,13 @@ def compra_exitosa(request, venta_id):
             return redirect('administrador:tienda_publica')
 
     factura = Factura.objects.filter(venta=venta).first()
-    garantias = Garantia.objects.filter(venta=venta)
+    garantias = Garantia.objects.filter(venta=venta).select_related('producto')
 
     context = {
         'venta': venta,
         'factura': factura,
         'garantias': garantias,
+        'iva_porcentaje': dinero.porcentaje_iva(),
         'titulo': 'Compra Exitosa'
     }
     return render(request, 'administrador/compra_exitosa.html', context)
@@ -1043,6 +1096,7 @@ def mis_compras(request):
     context = {
         'ventas': ventas,
         'total_gastado': total_gastado,
+        'iva_porcentaje': dinero.porcentaje_iva(),
         'titulo': 'Mis Compras'
     }
     return render(request, 'administrador/mis_compras.html', context)
@@ -43,12 +43,23 @@ class Carrito(models.Model):
             self.fecha_expiracion = timezone.now() + timedelta(days=7)
         super().save(*args, **kwargs)
 
+    def aplicar_delta(self, items, subtotal):
+        """Suma a los totales el cambio de una línea con un UPDATE atómico, sin recorrer los items"""
+        if not items and not subtotal:
+            return
+        Carrito.objects.filter(pk=self.pk).update(
+            total_items=models.F('total_items') + items,
+            subtotal=models.F('subtotal') + subtotal,
+            fecha_actualizacion=timezone.now()
+        )
+        self.refresh_from_db(fields=['total_items', 'subtotal', 'fecha_actualizacion'])
+
     def actualizar_totales(self):
-        """Actualizar totales del carrito basado en los items"""
-        items = self.items.all()
-        self.total_items = sum(item.cantidad for item in items)
-        self.subtotal = sum(item.subtotal for item in items)
-        self.save()
+        """Recalcula los totales desde los items en la base de datos (repara diferencias)"""
+        totales = self.items.aggregate(total_items=models.Sum('cantidad'), subtotal=models.Sum('subtotal'))
+        self.total_items = totales['total_items'] or 0
+        self.subtotal = totales['subtotal'] or 0
+        Carrito.objects.filter(pk=self.pk).update(total_items=self.total_items, subtotal=self.subtotal)
 
     @property
     def esta_expirado(self):
@@ -79,17 +90,33 @@ class ItemCarrito(models.Model):
         db_table = 'items_carrito'
         unique_together = ['carrito', 'equipo']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        item._guardado = (item.__dict__.get('cantidad'), item.__dict__.get('subtotal'))
+        return item
+
     def save(self, *args, **kwargs):
+        anterior = getattr(self, '_guardado', None)
+        if anterior is None or None in anterior:
+            anterior = self.pk and ItemCarrito.objects.filter(pk=self.pk).values_list(
+                'cantidad', 'subtotal'
+            ).first()
+        cantidad_anterior, subtotal_anterior = anterior or (0, 0)
+
         self.subtotal = self.cantidad * self.precio_unitario
         super().save(*args, **kwargs)
-        # Actualizar totales del carrito padre
-        self.carrito.actualizar_totales()
+        # Actualizar totales del carrito padre con la diferencia de esta línea
+        self.carrito.aplicar_delta(self.cantidad - cantidad_anterior, self.subtotal - subtotal_anterior)
+        self._guardado = (self.cantidad, self.subtotal)
 
     def delete(self, *args, **kwargs):
         carrito = self.carrito
-        super().delete(*args, **kwargs)
-        # Actualizar totales del carrito padre después de eliminar
-        carrito.actualizar_totales()
+        cantidad, subtotal = getattr(self, '_guardado', (self.cantidad, self.subtotal))
+        resultado = super().delete(*args, **kwargs)
+        # Descontar la línea eliminada de los totales del carrito padre
+        carrito.aplicar_delta(-cantidad, -subtotal)
+        return resultado
 
     def __str__(self):
         return f"{self.carrito} - {self.equipo} (x{self.cantidad})"